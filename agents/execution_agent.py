@@ -43,7 +43,7 @@ def execution_agent(state: AgentState) -> AgentState:
 - Patient: {state.get("user_id", "PAT001")}
 
 Determine the final response to return to the user."""
-        trace_result = invoke_with_trace(trace_prompt, agent_name="execution")
+        trace_result = invoke_with_trace(trace_prompt, agent_name="execution", priority="background")
         trace_entry["llm_trace"] = trace_result
         print(f"[Execution Agent] Trace result: {trace_result}")
     
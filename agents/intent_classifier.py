@@ -0,0 +1,260 @@
+"""
+Intent Classifier - Small local model that predicts the router intent.
+
+A hashing vectorizer feeds a multinomial logistic regression trained on the
+INTENT_KEYWORDS seeds plus logged traffic (messages the LLM router labelled).
+Weights are stored as a NumPy .npz file, so the model loads in milliseconds and
+predicts without any network call. The router only escalates to Gemini when
+the classifier's confidence is below INTENT_CONFIDENCE_THRESHOLD.
+
+Logging traffic stores raw user messages (which may contain names or health
+details), so it is off unless INTENT_TRAFFIC_LOGGING=true, and the log is
+trimmed to the MAX_TRAFFIC_EXAMPLES most recent messages that training reads.
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from agents.intent_matcher import INTENT_KEYWORDS
+from backend.services.text_vectorizer import HashingVectorizer
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+# Weight file and traffic log locations
+CLASSIFIER_PATH = os.getenv("INTENT_CLASSIFIER_PATH", os.path.join(DATA_DIR, "intent_classifier.npz"))
+TRAFFIC_LOG_PATH = os.getenv("INTENT_TRAFFIC_LOG", os.path.join(DATA_DIR, "intent_traffic.jsonl"))
+# Opt-in: the traffic log holds raw user chat text
+INTENT_TRAFFIC_LOGGING = os.getenv("INTENT_TRAFFIC_LOGGING", "false").lower() == "true"
+
+# Minimum softmax probability for answering without the LLM
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.7"))
+
+# Feature space and training set size (dense training matrix stays small)
+CLASSIFIER_FEATURES = 1 << 12
+MAX_TRAFFIC_EXAMPLES = 2000
+# The log is trimmed back to MAX_TRAFFIC_EXAMPLES lines once it is this much larger
+TRAFFIC_LOG_SLACK = 500
+
+INTENT_LABELS = list(INTENT_KEYWORDS.keys())
+
+
+class IntentClassifier:
+    """Multinomial logistic regression over hashed n-gram features."""
+
+    def __init__(self, labels: List[str] = None, n_features: int = CLASSIFIER_FEATURES):
+        self.labels = list(labels or INTENT_LABELS)
+        self.vectorizer = HashingVectorizer(n_features=n_features)
+        self.weights = np.zeros((n_features, len(self.labels)), dtype=np.float32)
+        self.bias = np.zeros(len(self.labels), dtype=np.float32)
+        self.fingerprint = ""
+
+    def fit(self, texts: List[str], labels: List[str], epochs: int = 300,
+            learning_rate: float = 2.0, l2: float = 1e-4) -> "IntentClassifier":
+        """
+        Train with full-batch gradient descent on class-balanced cross-entropy.
+
+        Args:
+            texts: Training messages
+            labels: Intent label per message
+            epochs: Gradient steps
+            learning_rate: Step size
+            l2: Weight decay
+        """
+        X = self.vectorizer.transform(texts)
+        y = np.array([self.labels.index(label) for label in labels])
+        Y = np.eye(len(self.labels), dtype=np.float32)[y]
+
+        # Balance classes so the many MEDICINE_ORDER seeds do not dominate
+        counts = np.bincount(y, minlength=len(self.labels)).astype(np.float32)
+        sample_weight = (len(y) / (len(self.labels) * np.maximum(counts, 1)))[y][:, None]
+
+        for _ in range(epochs):
+            probs = self._softmax(X @ self.weights + self.bias)
+            grad = (probs - Y) * sample_weight / len(y)
+            self.weights -= learning_rate * (X.T @ grad + l2 * self.weights)
+            self.bias -= learning_rate * grad.sum(axis=0)
+        return self
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        logits = logits - logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        """Class probabilities, shape (n_texts, n_labels)."""
+        X = self.vectorizer.transform(texts)
+        return self._softmax(X @ self.weights + self.bias)
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Most likely intent and its probability."""
+        probs = self.predict_proba([text])[0]
+        best = int(np.argmax(probs))
+        return self.labels[best], float(probs[best])
+
+    def save(self, path: str = CLASSIFIER_PATH):
+        """Store weights as a NumPy .npz file."""
+        np.savez_compressed(
+            path,
+            weights=self.weights,
+            bias=self.bias,
+            labels=np.array(self.labels),
+            n_features=np.array(self.vectorizer.n_features),
+            fingerprint=np.array(self.fingerprint)
+        )
+
+    @classmethod
+    def load(cls, path: str = CLASSIFIER_PATH) -> "IntentClassifier":
+        """Load weights saved by save()."""
+        with np.load(path) as data:
+            model = cls(labels=[str(label) for label in data["labels"]], n_features=int(data["n_features"]))
+            model.weights = data["weights"].astype(np.float32)
+            model.bias = data["bias"].astype(np.float32)
+            model.fingerprint = str(data["fingerprint"])
+        return model
+
+
+def seed_examples() -> Tuple[List[str], List[str]]:
+    """Training examples derived from the router keyword tables."""
+    texts, labels = [], []
+    for intent, keywords in INTENT_KEYWORDS.items():
+        for keyword in keywords:
+            texts.append(keyword.strip())
+            labels.append(intent)
+    return texts, labels
+
+
+def load_traffic(path: str = TRAFFIC_LOG_PATH, limit: int = MAX_TRAFFIC_EXAMPLES) -> Tuple[List[str], List[str]]:
+    """Most recent labelled messages from the traffic log."""
+    texts, labels = [], []
+    if not os.path.exists(path):
+        return texts, labels
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("intent") in INTENT_LABELS and record.get("text"):
+                    texts.append(record["text"])
+                    labels.append(record["intent"])
+    except Exception as e:
+        print(f"[Intent Classifier] Could not read traffic log: {e}")
+    return texts[-limit:], labels[-limit:]
+
+
+_traffic_lock = threading.Lock()
+_traffic_lines: Optional[int] = None
+
+
+def _trim_traffic_log(path: str, keep: int) -> int:
+    """Keep the last `keep` lines of the log (atomic rewrite); returns the line count."""
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.readlines()[-keep:]
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+    os.replace(tmp_path, path)
+    return len(lines)
+
+
+def log_intent_example(text: str, intent: str, source: str = "llm"):
+    """Append a labelled message to the traffic log for the next retraining (if INTENT_TRAFFIC_LOGGING)."""
+    global _traffic_lines
+    if not INTENT_TRAFFIC_LOGGING:
+        return
+    try:
+        with _traffic_lock:
+            if _traffic_lines is None:
+                _traffic_lines = _trim_traffic_log(TRAFFIC_LOG_PATH, MAX_TRAFFIC_EXAMPLES) \
+                    if os.path.exists(TRAFFIC_LOG_PATH) else 0
+            with open(TRAFFIC_LOG_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps({
+                    "text": text,
+                    "intent": intent,
+                    "source": source,
+                    "timestamp": datetime.now().isoformat()
+                }, ensure_ascii=False) + "\n")
+            _traffic_lines += 1
+            # Only the most recent examples are ever trained on
+            if _traffic_lines > MAX_TRAFFIC_EXAMPLES + TRAFFIC_LOG_SLACK:
+                _traffic_lines = _trim_traffic_log(TRAFFIC_LOG_PATH, MAX_TRAFFIC_EXAMPLES)
+    except Exception as e:
+        print(f"[Intent Classifier] Could not log example: {e}")
+
+
+def _fingerprint(texts: List[str], labels: List[str]) -> str:
+    digest = hashlib.sha1()
+    for text, label in zip(texts, labels):
+        digest.update(f"{label}\t{text}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def train_intent_classifier(include_traffic: bool = True, save: bool = True) -> IntentClassifier:
+    """
+    Train the classifier from seeds (and logged traffic) and optionally save it.
+
+    Returns:
+        Trained IntentClassifier
+    """
+    texts, labels = seed_examples()
+    if include_traffic:
+        traffic_texts, traffic_labels = load_traffic()
+        texts += traffic_texts
+        labels += traffic_labels
+
+    model = IntentClassifier().fit(texts, labels)
+    model.fingerprint = _fingerprint(texts, labels)
+    print(f"[Intent Classifier] Trained on {len(texts)} examples")
+
+    if save:
+        try:
+            model.save()
+        except Exception as e:
+            print(f"[Intent Classifier] Could not save weights: {e}")
+    return model
+
+
+# Global instance
+_classifier: Optional[IntentClassifier] = None
+
+
+def get_intent_classifier() -> Optional[IntentClassifier]:
+    """Load the saved classifier, training one on first use if none exists."""
+    global _classifier
+    if _classifier is not None:
+        return _classifier
+    try:
+        if os.path.exists(CLASSIFIER_PATH):
+            _classifier = IntentClassifier.load()
+        else:
+            _classifier = train_intent_classifier()
+    except Exception as e:
+        print(f"[Intent Classifier] Unavailable: {e}")
+        return None
+    return _classifier
+
+
+def classify_intent(text: str) -> Tuple[Optional[str], float]:
+    """
+    Predict the intent of a message locally.
+
+    Returns:
+        (intent, confidence), or (None, 0.0) when the classifier is unavailable
+    """
+    model = get_intent_classifier()
+    if model is None or not text:
+        return None, 0.0
+    return model.predict(text)
+
+
+def reset_intent_classifier():
+    """Drop the cached classifier (e.g. after retraining)."""
+    global _classifier
+    _classifier = None
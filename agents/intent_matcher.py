@@ -0,0 +1,238 @@
+"""
+Intent Matcher - Shared single-pass keyword matcher for intent detection.
+
+All keyword tables used for rule-based intent detection (router, router LLM
+override, pharmacist order/info check, chat fallback) are compiled at import
+time into one regex. A single scan over the message returns every keyword hit
+tagged with its table, label and priority, so callers only pick the hits they
+care about instead of looping over their own keyword lists.
+
+Matching keeps plain substring semantics (`keyword in text.lower()`).
+"""
+import re
+from typing import Dict, List, NamedTuple, Optional, Set
+
+
+# Intent keywords for rule-based detection (router)
+INTENT_KEYWORDS = {
+    "SHOW_MEDICINES": [
+        "show medicines", "list medicines", "available medicines", "what medicines",
+        "browse medicines", "medicine catalog", "all medicines", "medicine list",
+        "medicines available", "show available", "what do you have",
+        " catalogue", "catalog of medicines", "medicine inventory"
+    ],
+    "UPLOAD_PRESCRIPTION": [
+        "upload prescription", "prescription upload", "upload rx", "prescribe",
+        "prescription image", "doctor prescription", "medical prescription",
+        "attach prescription", "send prescription", "share prescription"
+    ],
+    "ORDER_HISTORY": [
+        "order history", "my orders", "past orders", "previous orders",
+        "order list", "my purchases", "order details", "order status",
+        "ordered medicines", "what i ordered", "order records"
+    ],
+    "REFILL_REMINDERS": [
+        "refill reminder", "refill alerts", "medicine reminder", "reminder",
+        " refill", "when to refill", "next refill", "refill due",
+        "renew medicine", "medicine renewal", "refill needed"
+    ],
+    "SHOW_PROFILE": [
+        "my profile", "show profile", "my account", "my details",
+        "profile", "account details", "my information", "my info",
+        "personal details", "patient profile"
+    ],
+    "MEDICINE_ORDER": [
+        "order", "buy", "purchase", "get", "want", "need", "place order",
+        "order now", "buy now", "can i get", "i want to order", "i want to buy",
+        "please order", "i need", "can i have", "give me", "arrange",
+        "order medicine", "buy medicine", "purchase medicine"
+    ],
+    "GENERAL_CHAT": [
+        "hello", "hi", "hey", "how are you", "thank", "thanks", "help",
+        "what can you do", "who are you", "good morning", "good evening"
+    ]
+}
+
+# Router priority order - more specific intents first
+ROUTER_PRIORITY = [
+    "UPLOAD_PRESCRIPTION",  # Check prescription first (most specific)
+    "SHOW_MEDICINES",
+    "ORDER_HISTORY",
+    "REFILL_REMINDERS",
+    "SHOW_PROFILE",
+    "GENERAL_CHAT",
+    "MEDICINE_ORDER"  # Default fallback
+]
+
+# Keywords that always bypass the LLM router (checked in this order)
+EXPLICIT_INTENTS = {
+    "prescription": "UPLOAD_PRESCRIPTION",
+    "refill": "REFILL_REMINDERS",
+    "reminder": "REFILL_REMINDERS",
+    "order history": "ORDER_HISTORY",
+    "my orders": "ORDER_HISTORY",
+    "my profile": "SHOW_PROFILE",
+    "show medicines": "SHOW_MEDICINES",
+    "available medicines": "SHOW_MEDICINES",
+    "list medicines": "SHOW_MEDICINES",
+}
+
+# Pharmacist: order vs information request
+PHARMACIST_KEYWORDS = {
+    "ORDER": [
+        "order", "buy", "purchase", "get", "want", "need",
+        "place order", "order now", "buy now", "can i get",
+        "i want to order", "i want to buy", "please order",
+        "i need", "can i have", "give me", "arrange"
+    ],
+    "INFO": [
+        "information", "info", "details", "tell me about",
+        "what is", "what are", "how does", "explain",
+        "price", "cost", "availability", "in stock",
+        "do you have", "do you have any", "available",
+        "prescription", "side effects", "uses", "benefits"
+    ],
+    # Combined with an INFO keyword these mark a pure information request
+    "INFO_ONLY": ["just", "only", "know"]
+}
+
+# Chat fallback intents, in the order they are checked
+FALLBACK_KEYWORDS = {
+    "SHOW_MEDICINES": ["show medicines", "list medicines", "available medicines", "what medicines",
+                       "browse medicines", "medicine catalog", "all medicines", "medicine list",
+                       "medicines available", "what do you have"],
+    "ORDER_HISTORY": ["order history", "my orders", "past orders", "previous orders",
+                      "order list", "my purchases", "order details"],
+    "REFILL_REMINDERS": ["refill reminder", "refill alerts", "medicine reminder", "reminder",
+                         "refill", "when to refill", "next refill", "refill due", "renew medicine"],
+    "SHOW_PROFILE": ["my profile", "show profile", "my account", "my details",
+                     "profile", "account details", "my information", "my info"],
+    "UPLOAD_PRESCRIPTION": ["upload prescription", "prescription upload", "upload rx", "prescribe",
+                            "prescription image", "doctor prescription", "medical prescription"],
+    "GREETING": ["hello", "hi", "hey", "good morning", "good evening", "good night"],
+    "HELP": ["help", "what can you do", "who are you"],
+    "THANKS": ["thank", "thanks", "thankyou"],
+}
+
+
+class IntentHit(NamedTuple):
+    """A keyword found in a message."""
+    table: str
+    label: str
+    priority: int
+    keyword: str
+    start: int
+
+
+def _trie_pattern(keywords: List[str]) -> str:
+    """Build a regex matching the longest of the keywords, factored as a prefix trie."""
+    trie: Dict = {}
+    for keyword in keywords:
+        node = trie
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[""] = True  # end of keyword
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # Keyword ends here; try the longer continuation first
+            return body + "?" if len(branches) == 1 and len(body) == 1 else "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class IntentMatcher:
+    """
+    Compiled multi-table keyword matcher.
+
+    Keywords are compiled into one lookahead regex shaped like a prefix trie
+    ("order(?: history| list)?"), so the regex engine reports the longest
+    keyword starting at every position without retrying shared prefixes. Shorter
+    keywords that are prefixes of it ("order" in "order history") are recovered
+    from a precomputed prefix table, so every substring occurrence is found in
+    a single scan.
+    """
+
+    def __init__(self, tables: Dict[str, List[tuple]]):
+        """
+        Args:
+            tables: table name -> [(label, priority, [keywords])]
+        """
+        self._tags: Dict[str, List[tuple]] = {}
+        for table, entries in tables.items():
+            for label, priority, keywords in entries:
+                for keyword in keywords:
+                    self._tags.setdefault(keyword.lower(), []).append((table, label, priority))
+
+        keywords = sorted(self._tags, key=len, reverse=True)
+        self._pattern = re.compile("(?=(" + _trie_pattern(keywords) + "))")
+        # Longest keyword at a position -> (table, label, priority, keyword) of
+        # every keyword that also starts there, grouped by table
+        self._expansions: Dict[str, Dict[Optional[str], List[tuple]]] = {}
+        for keyword in keywords:
+            by_table: Dict[Optional[str], List[tuple]] = {None: []}
+            for other in keywords:
+                if keyword.startswith(other):
+                    for table, label, priority in self._tags[other]:
+                        entry = (table, label, priority, other)
+                        by_table[None].append(entry)
+                        by_table.setdefault(table, []).append(entry)
+            self._expansions[keyword] = by_table
+
+    def match(self, text: str, table: Optional[str] = None) -> List[IntentHit]:
+        """
+        Find all keyword hits in a message.
+
+        Args:
+            text: User message (matched case-insensitively)
+            table: Only return hits from this table
+
+        Returns:
+            Hits sorted by priority, then position
+        """
+        hits = []
+        for m in self._pattern.finditer((text or "").lower()):
+            start = m.start()
+            for tag_table, label, priority, keyword in self._expansions[m.group(1)].get(table, ()):
+                hits.append(IntentHit(tag_table, label, priority, keyword, start))
+        hits.sort(key=lambda h: (h.priority, h.start))
+        return hits
+
+    def best(self, text: str, table: str) -> Optional[IntentHit]:
+        """Highest-priority hit from a table, or None."""
+        hits = self.match(text, table)
+        return hits[0] if hits else None
+
+    def labels(self, text: str, table: str) -> Set[str]:
+        """All labels of a table that have at least one hit."""
+        return {hit.label for hit in self.match(text, table)}
+
+
+def _ordered(keyword_table: Dict[str, List[str]], order: List[str] = None) -> List[tuple]:
+    """Turn {label: keywords} into matcher entries, prioritised by order."""
+    order = order or list(keyword_table)
+    return [(label, order.index(label), keyword_table[label]) for label in order]
+
+
+# Built once at import time and shared by every caller
+INTENT_MATCHER = IntentMatcher({
+    "router": _ordered(INTENT_KEYWORDS, ROUTER_PRIORITY),
+    "router_explicit": [(intent, i, [keyword]) for i, (keyword, intent) in enumerate(EXPLICIT_INTENTS.items())],
+    "pharmacist": _ordered(PHARMACIST_KEYWORDS),
+    "fallback": _ordered(FALLBACK_KEYWORDS),
+})
+
+
+def match_intents(text: str, table: Optional[str] = None) -> List[IntentHit]:
+    """Find all keyword hits in a message with the shared matcher."""
+    return INTENT_MATCHER.match(text, table)
+
+
+def best_intent(text: str, table: str) -> Optional[IntentHit]:
+    """Highest-priority hit of a table with the shared matcher."""
+    return INTENT_MATCHER.best(text, table)
@@ -7,39 +7,35 @@ Model Selection:
 - Gemini 1.5 Pro: Complex reasoning, medical advice, prescriptions
 
 When Gemini is unavailable, the system falls back to rule-based responses.
+
+Every call has an async variant (ainvoke_with_trace, agenerate_*) for async
+graph nodes, backed by Gemini's generate_content_async.
 """
-from langchain_core.messages import HumanMessage
-from langchain_core.runnables import RunnableConfig
 from dotenv import load_dotenv
 import os
 import warnings
+from backend.services.observability import configure_langsmith, is_tracing_enabled, trace_config
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 load_dotenv()
 
-LANGSMITH_API_KEY = os.getenv("LANGSMITH_API_KEY")
-LANGSMITH_PROJECT = os.getenv("LANGSMITH_PROJECT", "swasthya-sarthi")
-
 # Check for Gemini configuration
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
-GEMINI_AVAILABLE = bool(GOOGLE_API_KEY)
+# The mock backend (LLM_BACKEND=mock, for offline benchmarks) needs no key
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
+GEMINI_AVAILABLE = bool(GOOGLE_API_KEY) or LLM_BACKEND == "mock"
 
 # Don't raise error - just log warning and use fallback
 if not GEMINI_AVAILABLE:
     print("[LLM Provider] WARNING: GOOGLE_API_KEY not set. Using rule-based fallback.")
     print("[LLM Provider] To enable AI features, add GOOGLE_API_KEY to your .env file")
+elif LLM_BACKEND == "mock":
+    print("[LLM Provider] Mock LLM backend - no Gemini calls are made")
 else:
     print("[LLM Provider] Gemini API key detected - AI features enabled")
 
-# LangSmith configuration
-if LANGSMITH_API_KEY:
-    os.environ["LANGCHAIN_TRACING_V2"] = "true"
-    os.environ["LANGCHAIN_API_KEY"] = LANGSMITH_API_KEY
-    os.environ["LANGCHAIN_PROJECT"] = LANGSMITH_PROJECT
-    print(f"[Observability] LangSmith enabled - Project: {LANGSMITH_PROJECT}")
-else:
-    os.environ["LANGCHAIN_TRACING_V2"] = "false"
-    print("[Observability] LangSmith not configured - set LANGSMITH_API_KEY for tracing")
+# LangSmith configuration (shared with gemini_service, done once)
+configure_langsmith()
 
 # LLM type 
 _llm_type = "gemini" if GEMINI_AVAILABLE else "rule_based"
@@ -48,19 +44,13 @@ print(f"[LLM Provider] Mode: {'Gemini AI' if GEMINI_AVAILABLE else 'Rule-based f
 
 def _get_langsmith_config(model_type: str = "gemini"):
     """Get LangSmith configuration with model type tracking."""
-    if LANGSMITH_API_KEY:
-        return RunnableConfig(
-            configurable={
-                "tags": ["swasthya-sarthi", "pharmacy-agent", model_type],
-                "metadata": {
-                    "project": "swasthya-sarthi",
-                    "environment": "production",
-                    "llm_provider": model_type,
-                    "model": "gemini-1.5-flash" if model_type == "flash" else "gemini-1.5-pro"
-                }
-            }
-        )
-    return RunnableConfig()
+    return trace_config(
+        ["swasthya-sarthi", "pharmacy-agent", model_type],
+        {
+            "llm_provider": model_type,
+            "model": "gemini-1.5-flash" if model_type == "flash" else "gemini-1.5-pro"
+        }
+    )
 
 
 def get_llm():
@@ -87,14 +77,21 @@ def get_llm():
         return None
 
 
-def invoke_with_trace(prompt: str, agent_name: str = "agent", model_type: str = "flash"):
+def invoke_with_trace(prompt: str, agent_name: str = "agent", model_type: str = "flash", cache: bool = False,
+                      semantic_query: str = None, priority: str = "default", response_schema: dict = None):
     """
     Invoke LLM with full LangSmith tracing.
     
     Args:
         prompt: User prompt
-        agent_name: Name of the agent for tracing
+        agent_name: Name of the agent for tracing (and model routing)
         model_type: "flash" or "pro" for Gemini
+        cache: Reuse the response of an identical earlier prompt
+        semantic_query: User question inside the prompt; enables the semantic
+            cache so near-duplicate questions reuse an earlier answer
+        priority: Rate-limiter priority - "order" calls are admitted before
+            "default", "info" and "background" ones when Gemini quota is short
+        response_schema: Return JSON following this schema (Gemini JSON mode)
     
     Returns:
         Generated response or None
@@ -108,7 +105,13 @@ def invoke_with_trace(prompt: str, agent_name: str = "agent", model_type: str =
         response = gemini_service.generate_response_simple(
             prompt=prompt,
             temperature=0.4,
-            model_type=model_type
+            model_type=model_type,
+            cache=cache,
+            semantic_cache=semantic_query is not None,
+            semantic_query=semantic_query,
+            priority=priority,
+            response_schema=response_schema,
+            task=agent_name
         )
         return response
     except Exception as e:
@@ -116,6 +119,32 @@ def invoke_with_trace(prompt: str, agent_name: str = "agent", model_type: str =
         return None
 
 
+async def ainvoke_with_trace(prompt: str, agent_name: str = "agent", model_type: str = "flash",
+                             cache: bool = False, semantic_query: str = None, priority: str = "default",
+                             response_schema: dict = None):
+    """Async variant of invoke_with_trace."""
+    if not GEMINI_AVAILABLE:
+        return None
+    
+    try:
+        from backend.services import gemini_service
+        
+        return await gemini_service.agenerate_response_simple(
+            prompt=prompt,
+            temperature=0.4,
+            model_type=model_type,
+            cache=cache,
+            semantic_cache=semantic_query is not None,
+            semantic_query=semantic_query,
+            priority=priority,
+            response_schema=response_schema,
+            task=agent_name
+        )
+    except Exception as e:
+        print(f"[LLM Provider] ainvoke_with_trace error: {e}")
+        return None
+
+
 def is_llm_available_check():
     """Check if Gemini is available."""
     return GEMINI_AVAILABLE
@@ -126,11 +155,6 @@ def get_llm_type():
     return _llm_type
 
 
-def is_tracing_enabled():
-    """Check if LangSmith tracing is enabled."""
-    return LANGSMITH_API_KEY is not None
-
-
 def reset_llm():
     """Reset the Gemini instance."""
     from backend.services import gemini_service
@@ -222,3 +246,57 @@ def generate_structured_json(prompt: str, model_type: str = "flash", **kwargs):
     except Exception as e:
         print(f"[LLM Provider] generate_structured_json error: {e}")
         return None
+
+
+async def agenerate_response(messages, model_type: str = "flash", **kwargs):
+    """Async variant of generate_response."""
+    if not GEMINI_AVAILABLE:
+        return None
+    
+    try:
+        from backend.services import gemini_service
+        
+        return await gemini_service.agenerate_response(
+            messages=messages,
+            model_type=model_type,
+            **kwargs
+        )
+    except Exception as e:
+        print(f"[LLM Provider] agenerate_response error: {e}")
+        return None
+
+
+async def agenerate_response_simple(prompt: str, model_type: str = "flash", **kwargs):
+    """Async variant of generate_response_simple."""
+    if not GEMINI_AVAILABLE:
+        return None
+    
+    try:
+        from backend.services import gemini_service
+        
+        return await gemini_service.agenerate_response_simple(
+            prompt=prompt,
+            model_type=model_type,
+            **kwargs
+        )
+    except Exception as e:
+        print(f"[LLM Provider] agenerate_response_simple error: {e}")
+        return None
+
+
+async def agenerate_structured_json(prompt: str, model_type: str = "flash", **kwargs):
+    """Async variant of generate_structured_json."""
+    if not GEMINI_AVAILABLE:
+        return None
+    
+    try:
+        from backend.services import gemini_service
+        
+        return await gemini_service.agenerate_structured_json(
+            prompt=prompt,
+            model_type=model_type,
+            **kwargs
+        )
+    except Exception as e:
+        print(f"[LLM Provider] agenerate_structured_json error: {e}")
+        return None
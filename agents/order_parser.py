@@ -0,0 +1,281 @@
+"""
+Order Parser - Local extraction of product and quantity from order messages.
+
+Runs before any LLM call. Quantities come from digits (including Devanagari
+digits) and number words in English, Hindi and Marathi, preferably next to a
+unit word ("2 strips", "दो पत्ते", "don batli"). Strengths ("500 mg") are kept
+as dosage and never taken as quantity, and numbers of a duration or dose
+("for 5 days", "2 times a day") are not quantities either. After removing filler, number, unit
+and strength words, the remaining words are looked up as product spans in the
+catalog phonetic index of the dataset matcher.
+
+A parse is only returned when one catalog product clearly wins, the stated
+quantity is valid and unambiguous and the message names no patient;
+otherwise the caller falls back to Gemini.
+"""
+import re
+from typing import List, Optional, Tuple
+
+from agents.intent_matcher import INTENT_MATCHER
+from backend.services.catalog_preprocessor import parse_strength, strength_spans
+from backend.services.dataset_matcher import get_dataset_matcher, HIGH_CONFIDENCE_THRESHOLD
+
+# Number words (English, Hindi, Marathi; romanized and Devanagari)
+NUMBER_WORDS = {
+    # English
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "fifteen": 15,
+    "twenty": 20, "single": 1, "couple": 2, "pair": 2, "dozen": 12,
+    # Hindi
+    "ek": 1, "do": 2, "teen": 3, "tin": 3, "char": 4, "chaar": 4, "paanch": 5, "panch": 5,
+    "chhe": 6, "chah": 6, "saat": 7, "sat": 7, "aath": 8, "nau": 9, "das": 10,
+    "एक": 1, "दो": 2, "तीन": 3, "चार": 4, "पांच": 5, "पाँच": 5, "छह": 6, "छः": 6,
+    "सात": 7, "आठ": 8, "नौ": 9, "दस": 10, "बीस": 20,
+    # Marathi
+    "don": 2, "pach": 5, "saha": 6, "daha": 10, "vees": 20,
+    "दोन": 2, "पाच": 5, "सहा": 6, "नऊ": 9, "दहा": 10, "वीस": 20,
+}
+
+# Number words that are also common words ("do you have", "das" in German
+# product names) or verbs ("नूरोफेन दो" is "give Nurofen", "saat" is a common
+# spelling of "saath", "chah" of "want") - only counted next to a unit word
+AMBIGUOUS_NUMBER_WORDS = {
+    "do", "don", "tin", "teen", "sat", "saat", "chah", "das", "char", "pair", "single",
+    "दो",
+}
+
+# Duration and frequency words: "for 5 days", "2 times a day", "1 goli roz"
+# give a dose, not the number of packs to order
+DOSING_WORDS = {
+    # English
+    "day", "days", "week", "weeks", "month", "months", "time", "times", "daily",
+    "hour", "hours", "hrs", "night", "nights",
+    # Romanized Hindi / Marathi
+    "din", "dino", "dinon", "hafta", "hafte", "mahina", "mahine", "baar", "bar", "roz",
+    "rozana", "divas", "aathavda", "aathavde", "vela", "veli", "dararoj",
+    # Devanagari
+    "दिन", "दिनों", "हफ्ता", "हफ्ते", "सप्ताह", "महीना", "महीने", "बार", "रोज", "रोज़", "रोजाना",
+    "दिवस", "आठवडा", "आठवडे", "महिना", "महिने", "वेळा", "दररोज",
+}
+
+# "2 times a day", "1 tablet per day", "दिन में 2 बार"
+_PER_WORDS = {"a", "per", "each", "every", "har", "prati", "हर", "प्रति", "दर"}
+
+# Pack / unit words
+UNIT_WORDS = {
+    # English
+    "pack", "packs", "packet", "packets", "box", "boxes", "bottle", "bottles",
+    "strip", "strips", "tube", "tubes", "piece", "pieces", "pcs", "unit", "units",
+    "tablet", "tablets", "tab", "tabs", "capsule", "capsules", "caps", "sachet", "sachets",
+    # Romanized Hindi / Marathi
+    "patta", "patte", "goli", "goliyan", "botal", "batli", "dabba", "dabbe", "dabe",
+    "paket", "pakit", "packat",
+    # Devanagari
+    "पैकेट", "डिब्बा", "डिब्बे", "बोतल", "बोतलें", "स्ट्रिप", "ट्यूब", "गोली", "गोलियां",
+    "गोलियाँ", "पत्ता", "पत्ते", "पाकीट", "पाकिटे", "बाटली", "बाटल्या", "डबा", "डबे", "गोळी", "गोळ्या",
+}
+
+# Words that never belong to a product name
+FILLER_WORDS = {
+    # English
+    "i", "im", "me", "my", "we", "us", "our", "you", "your", "a", "an", "the", "of", "for",
+    "to", "and", "also", "with", "some", "any", "please", "pls", "plz", "kindly",
+    "want", "wanted", "need", "needs", "would", "like", "can", "could", "have", "has",
+    "get", "give", "send", "deliver", "order", "buy", "purchase", "book", "add", "place",
+    "now", "today", "urgent", "urgently", "medicine", "medicines", "medication", "drug",
+    "is", "are", "it", "this", "that", "more", "another", "in", "on",
+    # Romanized Hindi / Marathi
+    "mujhe", "mereko", "hume", "humko", "chahiye", "chahie", "chaiye", "dijiye", "dena",
+    "de", "dedo", "bhejo", "bhej", "mangao", "mangwa", "hai", "hain", "ka", "ki", "ke",
+    "ko", "aur", "kar", "karo", "karna", "dawa", "dawai", "dawaiyan", "mala", "amhala",
+    "pahije", "hava", "havi", "dya", "dyaa", "ani", "aushadh", "aushadhe", "pathva",
+    # Devanagari
+    "मुझे", "हमें", "चाहिए", "चाहिये", "दीजिए", "दीजिये", "दे", "दो", "भेजो", "मंगाओ",
+    "का", "की", "के", "को", "और", "है", "हैं", "कर", "करो", "दवा", "दवाई", "दवाइयां",
+    "मला", "आम्हाला", "पाहिजे", "हवे", "हवी", "हवा", "द्या", "आणि", "औषध", "औषधे", "पाठवा",
+}
+
+# Words showing the order is for someone else ("for my son Rahul"); the local
+# parser cannot fill patient_name, so such messages go to Gemini
+PATIENT_WORDS = {
+    # English
+    "patient", "son", "daughter", "mother", "father", "mom", "mum", "dad", "wife", "husband",
+    "brother", "sister", "child", "kid", "baby", "grandmother", "grandfather", "grandma",
+    "grandpa", "him", "her", "name", "named",
+    # Romanized Hindi / Marathi
+    "beta", "bete", "beti", "maa", "mummy", "papa", "pati", "patni", "bhai", "behen", "bachcha",
+    "bachche", "naam", "mulga", "mulgi", "aai", "baba", "navra", "bayko", "nav",
+    # Devanagari
+    "मरीज", "बेटा", "बेटे", "बेटी", "माँ", "मां", "पापा", "पिता", "पति", "पत्नी", "भाई", "बहन",
+    "बच्चा", "बच्चे", "नाम", "रुग्ण", "मुलगा", "मुलगी", "आई", "बाबा", "नवरा", "बायको", "नाव",
+}
+
+# Largest quantity accepted from free text (larger numbers are codes, not counts)
+MAX_QUANTITY = 100
+
+# Indic vowel signs are not \w, so the script blocks are listed explicitly
+_WORD_RE = re.compile(r"[\w\u0900-\u0d7f]+(?:[.,]\d+)?", re.UNICODE)
+_MULTIPLIER_RE = re.compile(r"^(?:x(\d+)|(\d+)x)$", re.IGNORECASE)
+
+
+def _number(word: str) -> Optional[int]:
+    """Value of a digit string (any script) or number word."""
+    if word.isdecimal():
+        return int(word)
+    return NUMBER_WORDS.get(word)
+
+
+def _tokens(text: str) -> List[Tuple[str, int, int]]:
+    """Lowercased words with their character offsets."""
+    return [(m.group().lower(), m.start(), m.end()) for m in _WORD_RE.finditer(text or "")]
+
+
+def _is_dosing(tokens: List[Tuple[str, int, int]], i: int) -> bool:
+    """Whether the words from token i on give a duration or frequency."""
+    word = tokens[i][0] if i < len(tokens) else ""
+    if word in _PER_WORDS and i + 1 < len(tokens):
+        word = tokens[i + 1][0]
+    return word in DOSING_WORDS
+
+
+def _quantity_candidates(text: str) -> List[Tuple[int, int, int, List[int]]]:
+    """
+    Numbers that may be the quantity as (rank, position, value, token indices), best first.
+
+    Rank 0/1 is a number next to a unit word, 2 a bare number, 3 a number that
+    is probably not the quantity (a duration or dose, or an ambiguous number
+    word such as "दो" right before another word) and leaves it unclear.
+    """
+    tokens = _tokens(text)
+    strengths = strength_spans(text)
+    candidates = []  # (rank, position, value, token indices)
+
+    for i, (word, start, end) in enumerate(tokens):
+        # Strengths and name suffixes such as "Omega-3" are not quantities
+        if any(s <= start < e for s, e in strengths) or text[start - 1:start] == "-":
+            continue
+
+        multiplier = _MULTIPLIER_RE.match(word)
+        if multiplier:
+            candidates.append((0, i, int(multiplier.group(1) or multiplier.group(2)), [i]))
+            continue
+
+        value = _number(word)
+        if value is None:
+            continue
+        next_word = tokens[i + 1][0] if i + 1 < len(tokens) else ""
+        prev_word = tokens[i - 1][0] if i > 0 else ""
+        if next_word in UNIT_WORDS:
+            rank, used, after = 0, [i, i + 1], i + 2
+        elif prev_word in UNIT_WORDS:
+            rank, used, after = 1, [i - 1, i], i + 1
+        elif word in AMBIGUOUS_NUMBER_WORDS:
+            # "मुझे नूरोफेन दो" / "do you have": a verb or a word, but
+            # "मुझे दो नूरोफेन" may be two
+            if next_word and next_word not in FILLER_WORDS:
+                candidates.append((3, i, value, [i]))
+            continue
+        else:
+            rank, used, after = 2, [i], i + 1
+
+        if _is_dosing(tokens, after):
+            rank = 3
+        candidates.append((rank, i, value, used))
+    return sorted(candidates)
+
+
+def parse_quantity(text: str) -> Tuple[int, List[int]]:
+    """
+    Extract the ordered quantity from a message.
+
+    A number next to a unit word ("2 strips", "strips: 2") wins over a bare
+    number; strengths, durations and doses are ignored.
+
+    Returns:
+        (quantity, indices of the tokens used), quantity defaults to 1
+    """
+    for rank, _, value, used in _quantity_candidates(text):
+        if rank < 3 and 0 < value <= MAX_QUANTITY:
+            return value, used
+    return 1, []
+
+
+def is_order_request(user_text: str) -> bool:
+    """Check if the user wants to order medicine or is just asking for information."""
+    # One scan finds order, info and "just/only/know" keywords together
+    labels = INTENT_MATCHER.labels(user_text, "pharmacist")
+    
+    # Check for order intent first (higher priority)
+    if "ORDER" in labels:
+        return True
+    
+    # Info keywords combined with "just", "only", "know", etc. mean info intent
+    if "INFO" in labels and "INFO_ONLY" in labels:
+        return False
+    
+    # If unclear, assume order intent (they might want to buy)
+    return True
+
+
+def parse_order_locally(user_text: str, threshold: float = HIGH_CONFIDENCE_THRESHOLD) -> Optional[dict]:
+    """
+    Parse an order message without an LLM.
+
+    Args:
+        user_text: User message
+        threshold: Minimum catalog match confidence for the product
+
+    Returns:
+        Structured order (product_name, quantity, dosage, patient_name, notes)
+        or None if no single catalog product was found with confidence, the
+        quantity is out of range or unclear, or a patient is mentioned
+    """
+    if not user_text or not user_text.strip():
+        return None
+
+    tokens = _tokens(user_text)
+    if any(word in PATIENT_WORDS for word, _, _ in tokens):
+        return None
+
+    # A number next to a unit word is the quantity; a bare number only when
+    # nothing else could be ("need nurofen for 5 days" leaves it unclear)
+    candidates = _quantity_candidates(user_text)
+    stated = [c for c in candidates if c[0] < 2]
+    if not stated:
+        bare = {c[2] for c in candidates if c[0] == 2}
+        if len(bare) > 1 or any(c[0] == 3 for c in candidates):
+            print("[Order Parser] Quantity unclear, deferring to LLM")
+            return None
+        stated = [c for c in candidates if c[0] == 2]
+    # "need 1000 paracetamol" must not become an order for 1
+    if stated and not 0 < stated[0][2] <= MAX_QUANTITY:
+        print(f"[Order Parser] Quantity {stated[0][2]} out of range, deferring to LLM")
+        return None
+    quantity, quantity_tokens = parse_quantity(user_text)
+    strengths = strength_spans(user_text)
+
+    # Blank out everything that cannot be part of a product name; the
+    # separators keep unrelated words from being merged into one span
+    words = []
+    for i, (word, start, end) in enumerate(tokens):
+        if (i in quantity_tokens or word in FILLER_WORDS or word in UNIT_WORDS
+                or word in NUMBER_WORDS or word in DOSING_WORDS
+                or any(s <= start < e for s, e in strengths)):
+            words.append("|")
+        else:
+            words.append(word)
+
+    match = get_dataset_matcher().find_product_in_text(" ".join(words), threshold)
+    if not match or not match["is_unique"]:
+        return None
+
+    order = {
+        "product_name": match["matched_name"],
+        "quantity": quantity,
+        "dosage": parse_strength(user_text) or "",
+        "patient_name": "",
+        "notes": ""
+    }
+    print(f"[Order Parser] '{match['input_name']}' -> {order['product_name']} "
+          f"x{quantity} ({match['confidence']:.2f})")
+    return order
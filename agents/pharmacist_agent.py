@@ -2,12 +2,14 @@
 Pharmacist Agent - Parses user order requests into structured data and provides medicine information.
 Uses unified LLM provider with LangSmith observability for traceability.
 """
-from agents.llm_provider import get_llm, invoke_with_trace, is_tracing_enabled, _get_langsmith_config
+from agents.llm_provider import get_llm, invoke_with_trace, ainvoke_with_trace, is_tracing_enabled, _get_langsmith_config
 from agents.state_schema import AgentState
 from langchain_core.messages import HumanMessage, SystemMessage
 from tools.inventory_tool import get_medicine
+from agents.order_parser import is_order_request, parse_order_locally, parse_quantity
+from backend.services.dataset_matcher import get_dataset_matcher
+import asyncio
 import json
-import re
 
 # Language mapping for responses
 LANGUAGE_NAMES = {
@@ -38,39 +40,7 @@ def get_language_prompt_suffix(user_language: str) -> str:
 
 def _is_order_intent(user_text: str) -> bool:
     """Check if the user wants to order medicine or just asking for information."""
-    text_lower = user_text.lower()
-    
-    # Order intent keywords
-    order_keywords = [
-        "order", "buy", "purchase", "get", "want", "need",
-        "place order", "order now", "buy now", "can i get",
-        "i want to order", "i want to buy", "please order",
-        "i need", "can i have", "give me", "arrange"
-    ]
-    
-    # Information/query intent keywords  
-    info_keywords = [
-        "information", "info", "details", "tell me about",
-        "what is", "what are", "how does", "explain",
-        "price", "cost", "availability", "in stock",
-        "do you have", "do you have any", "available",
-        "prescription", "side effects", "uses", "benefits"
-    ]
-    
-    # Check for order intent first (higher priority)
-    for keyword in order_keywords:
-        if keyword in text_lower:
-            return True
-    
-    # Check if it's purely informational
-    for keyword in info_keywords:
-        if keyword in text_lower:
-            # If combined with "just", "only", "know", etc. it's info intent
-            if "just" in text_lower or "only" in text_lower or "know" in text_lower:
-                return False
-    
-    # If unclear, assume order intent (they might want to buy)
-    return True
+    return is_order_request(user_text)
 
 def _get_info_response(user_language: str, product_name: str) -> str:
     """Get a friendly informational response in the user's language."""
@@ -88,19 +58,112 @@ def pharmacist_agent(state: AgentState) -> AgentState:
     1. Order requests: "I want to buy X" -> parse into structured order
     2. Information requests: "Tell me about X" -> provide medicine info
     """
+    if _parse_without_llm(state):
+        return state
+
+    user_text = state["user_input"]
+    is_order = state["is_order_request"]
+    prompt = _build_prompt(user_text, state.get("user_language", "en"), is_order)
+
+    try:
+        # Use invoke_with_trace for full LangSmith observability
+        # Information questions repeat in many phrasings - reuse near-duplicate answers
+        # Order parsing outranks informational chat when Gemini quota is short
+        response_content = invoke_with_trace(
+            prompt,
+            agent_name="pharmacist",
+            cache=True,
+            semantic_query=None if is_order else user_text,
+            priority="order" if is_order else "info",
+            response_schema=ORDER_SCHEMA if is_order else INFO_SCHEMA
+        )
+        
+        if response_content is None:
+            llm = get_llm()
+            response = llm.invoke(
+                [SystemMessage(content=prompt)] if 'SystemMessage' in dir() else [HumanMessage(content=prompt)],
+                config=_get_langsmith_config()
+            )
+            response_content = response.content.strip()
+
+        _apply_llm_response(state, response_content, is_order)
+
+    except Exception as e:
+        print(f"Pharmacist agent error: {e}")
+        parsed = _rule_based_parse(user_text, is_order)
+        state["structured_order"] = parsed
+
+    return state
+
+
+async def apharmacist_agent(state: AgentState) -> AgentState:
+    """
+    Async variant of pharmacist_agent for app_graph.ainvoke.
+
+    The local parser and catalog matching (which may load the products file
+    on a cold worker) run in a worker thread, only the Gemini call is awaited.
+    """
+    if await asyncio.to_thread(_parse_without_llm, state):
+        return state
+
+    user_text = state["user_input"]
+    is_order = state["is_order_request"]
+    prompt = _build_prompt(user_text, state.get("user_language", "en"), is_order)
+
+    try:
+        response_content = await ainvoke_with_trace(
+            prompt,
+            agent_name="pharmacist",
+            cache=True,
+            semantic_query=None if is_order else user_text,
+            priority="order" if is_order else "info",
+            response_schema=ORDER_SCHEMA if is_order else INFO_SCHEMA
+        )
+        if response_content is None:
+            raise ValueError("no response from LLM")
+
+        await asyncio.to_thread(_apply_llm_response, state, response_content, is_order)
+
+    except Exception as e:
+        print(f"Pharmacist agent error: {e}")
+        parsed = await asyncio.to_thread(_rule_based_parse, user_text, is_order)
+        state["structured_order"] = parsed
+
+    return state
+
+
+def _parse_without_llm(state: AgentState) -> bool:
+    """
+    Handle the turn without Gemini when possible.
+    
+    Returns:
+        True if the state is complete, False if the LLM has to parse the message
+        (state["is_order_request"] is set either way)
+    """
     user_text = state.get("user_input", "")
     user_language = state.get("user_language", "en")
-    user_id = state.get("user_id")
 
     if not user_text:
         state["structured_order"] = {}
         state["is_info_request"] = False
-        return state
+        return True
+
+    # The router's combined LLM call may already have parsed this turn
+    routed_order = state.get("structured_order") or {}
+    if routed_order.get("product_name"):
+        _apply_routed_order(state, routed_order, user_language)
+        return True
 
     # Determine if user wants to order or just asking for info
     is_order = _is_order_intent(user_text)
     state["is_order_request"] = is_order
 
+    # Local parser first; Gemini is only needed when it finds no clear product
+    local_order = parse_order_locally(user_text)
+    if local_order:
+        _apply_routed_order(state, local_order, user_language)
+        return True
+
     # Try to use LLM for parsing with full observability
     llm = get_llm()
 
@@ -109,11 +172,38 @@ def pharmacist_agent(state: AgentState) -> AgentState:
         print("[Pharmacist Agent] Using rule-based parsing (no LLM)")
         parsed = _rule_based_parse(user_text, is_order)
         state["structured_order"] = parsed
-        return state
+        return True
+
+    return False
+
+
+# Gemini JSON mode schemas for the two prompts of _build_prompt
+ORDER_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "product_name": {"type": "STRING"},
+        "quantity": {"type": "INTEGER"},
+        "dosage": {"type": "STRING"},
+        "patient_name": {"type": "STRING"},
+        "notes": {"type": "STRING"}
+    },
+    "required": ["product_name", "quantity"]
+}
 
+INFO_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "product_name": {"type": "STRING"}
+    },
+    "required": ["product_name"]
+}
+
+
+def _build_prompt(user_text: str, user_language: str, is_order: bool) -> str:
+    """LLM prompt for parsing an order or acknowledging an info request."""
     if is_order:
         # Order intent - parse the order
-        prompt = f'''You are a pharmacy assistant. Parse this customer's order request and extract structured information.
+        return f'''You are a pharmacy assistant. Parse this customer's order request and extract structured information.
 
 Customer said: "{user_text}"
 
@@ -124,76 +214,74 @@ Extract the following information:
 4. patient_name: Any patient name mentioned
 5. notes: Any special instructions
 
-{get_language_prompt_suffix(user_language)}
+{get_language_prompt_suffix(user_language)}'''
 
-Return ONLY a JSON object with these exact keys:
-{{"product_name": "...", "quantity": 1, "dosage": "...", "patient_name": "...", "notes": "..."}}'''
-    else:
-        # Info intent - just acknowledge and let safety agent provide details
-        prompt = f'''The user is asking for information about a medicine.
+    # Info intent - only the product is needed, the safety agent provides details
+    return f'''The user is asking for information about a medicine.
 
 Customer said: "{user_text}"
 
-Simply acknowledge their query in a friendly way. Return ONLY a JSON:
-{{"acknowledgment": "Your friendly acknowledgment message", "product_name": "the medicine name they asked about"}}'''
+Extract product_name: the medicine name they asked about.'''
+
 
+def _apply_llm_response(state: AgentState, response_content: str, is_order: bool) -> AgentState:
+    """Parse the LLM's JSON answer into the order or info fields of the state."""
+    user_text = state.get("user_input", "")
+    user_language = state.get("user_language", "en")
+
+    # JSON mode output; only a truncated response fails to parse
     try:
-        # Use invoke_with_trace for full LangSmith observability
-        response_content = invoke_with_trace(prompt, agent_name="pharmacist")
-        
-        if response_content is None:
-            response = llm.invoke(
-                [SystemMessage(content=prompt)] if 'SystemMessage' in dir() else [HumanMessage(content=prompt)],
-                config=_get_langsmith_config()
-            )
-            response_content = response.content.strip()
+        parsed = json.loads(response_content)
+    except json.JSONDecodeError:
+        parsed = None
+
+    if not isinstance(parsed, dict):
+        # Match the message itself, as the rule-based parser does
+        parsed = {"product_name": user_text, "quantity": parse_quantity(user_text)[0]}
 
-        content = response_content.strip()
-
-        # Try to extract JSON from response
-        try:
-            parsed = json.loads(content)
-        except:
-            json_match = re.search(r'\{[^}]+\}', content, re.DOTALL)
-            if json_match:
-                parsed = json.loads(json_match.group())
-            else:
-                parsed = {"product_name": content, "quantity": 1, "dosage": "", "patient_name": "", "notes": ""}
-
-        if not isinstance(parsed, dict):
-            parsed = {"product_name": str(parsed), "quantity": 1, "dosage": "", "patient_name": "", "notes": ""}
-
-        if is_order:
-            # Clean up the product name
-            if parsed.get("product_name"):
-                product_name = parsed["product_name"].strip()
-                parsed["product_name"] = _match_medicine_name(product_name)
-
-            state["structured_order"] = {
-                "product_name": parsed.get("product_name", ""),
-                "quantity": parsed.get("quantity", 1),
-                "dosage": parsed.get("dosage", ""),
-                "patient_name": parsed.get("patient_name", ""),
-                "notes": parsed.get("notes", "")
-            }
-            print(f"[Pharmacist Agent] Parsed order: {state['structured_order']}")
+    if is_order:
+        # Clean up the product name
+        if parsed.get("product_name"):
+            product_name = parsed["product_name"].strip()
+            parsed["product_name"] = _match_medicine_name(product_name)
+
+        state["structured_order"] = {
+            "product_name": parsed.get("product_name", ""),
+            "quantity": parsed.get("quantity", 1),
+            "dosage": parsed.get("dosage", ""),
+            "patient_name": parsed.get("patient_name", ""),
+            "notes": parsed.get("notes", "")
+        }
+        print(f"[Pharmacist Agent] Parsed order: {state['structured_order']}")
+    else:
+        # Info request - set up response
+        product_name = parsed.get("product_name", "")
+        if product_name:
+            matched_name = _match_medicine_name(product_name)
+            state["info_product"] = matched_name
+            state["info_response"] = _get_info_response(user_language, matched_name)
         else:
-            # Info request - set up response
-            product_name = parsed.get("product_name", "")
-            if product_name:
-                matched_name = _match_medicine_name(product_name)
-                state["info_product"] = matched_name
-                state["info_response"] = _get_info_response(user_language, matched_name)
-            else:
-                state["info_product"] = _rule_based_parse(user_text, True).get("product_name", "")
-                state["info_response"] = _get_info_response(user_language, state["info_product"])
-            print(f"[Pharmacist Agent] Info request for: {state['info_product']}")
+            state["info_product"] = _rule_based_parse(user_text, True).get("product_name", "")
+            state["info_response"] = _get_info_response(user_language, state["info_product"])
+        print(f"[Pharmacist Agent] Info request for: {state['info_product']}")
+
+    return state
 
-    except Exception as e:
-        print(f"Pharmacist agent error: {e}")
-        parsed = _rule_based_parse(user_text, is_order)
-        state["structured_order"] = parsed
 
+def _apply_routed_order(state: AgentState, routed_order: dict, user_language: str) -> AgentState:
+    """Use an order parsed by the router or the local parser instead of calling the LLM."""
+    product_name = routed_order["product_name"]
+    # Exact catalog names (local parser) are kept; free-text names are mapped
+    if product_name.lower().strip() not in get_dataset_matcher().product_lookup:
+        product_name = _match_medicine_name(product_name)
+    state["structured_order"] = {**routed_order, "product_name": product_name}
+
+    if state.get("is_order_request", True):
+        print(f"[Pharmacist Agent] Using parsed order: {state['structured_order']}")
+    else:
+        state["info_product"] = product_name
+        state["info_response"] = _get_info_response(user_language, product_name)
+        print(f"[Pharmacist Agent] Info request for: {product_name} (parsed without LLM)")
     return state
 
 
@@ -201,21 +289,8 @@ def _rule_based_parse(user_text: str, is_order: bool = True) -> dict:
     """Rule-based parsing fallback when no LLM is available."""
     text_lower = user_text.lower()
 
-    # Find quantity
-    quantity = 1
-    quantity_words = {
-        "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
-        "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10
-    }
-
-    for word, num in quantity_words.items():
-        if word in text_lower:
-            quantity = num
-            break
-
-    digit_match = re.search(r'(\d+)', user_text)
-    if digit_match:
-        quantity = int(digit_match.group(1))
+    # Find quantity (number words, units; strengths such as "500 mg" are skipped)
+    quantity, _ = parse_quantity(user_text)
 
     product_name = _match_medicine_name(text_lower)
 
@@ -9,15 +9,17 @@ Workflow:
 3. Match extracted names with dataset products
 4. Return structured order data with confidence scores
 
+For bulk intake, process_prescriptions_batch packs several OCR texts into one
+extraction call (per-document ids in the output) instead of one call each.
+
 LangSmith tracing included for observability.
 """
 
-import json
+import os
 import re
 from typing import List, Dict, Optional
-from agents.llm_provider import get_llm, invoke_with_trace, is_tracing_enabled, _get_langsmith_config
+from agents.llm_provider import get_llm, generate_structured_json
 from agents.state_schema import AgentState
-from langchain_core.messages import HumanMessage, SystemMessage
 from backend.services.dataset_matcher import (
     get_dataset_matcher,
     match_medicine,
@@ -26,42 +28,66 @@ from backend.services.dataset_matcher import (
     HIGH_CONFIDENCE_THRESHOLD
 )
 
-# Language-specific prompts
+# Language-specific prompts (the output format comes from MEDICINE_LIST_SCHEMA)
 EXTRACTION_PROMPTS = {
     "en": """You are a pharmacy assistant. Extract medicine names from the prescription text below.
 
-Return ONLY a JSON array of medicine names. Do NOT invent medicines.
-If no medicines are found, return an empty array [].
-
-Example output:
-["Medicine Name 1", "Medicine Name 2"]
+Do NOT invent medicines. If no medicines are found, return an empty list.
 
 Prescription text:
 """,
     
     "hi": """आप एक फार्मासिस्ट सहायक हैं। नीचे दी गई पर्चे से दवाओं के नाम निकालें।
 
-केवल JSON array में दवाओं के नाम वापस करें। दवाएँ मत बनाइए।
-यदि कोई दवा नहीं मिली, तो खाली array [] वापस करें।
-
-उदाहरण आउटपुट:
-["दवा का नाम 1", "दवा का नाम 2"]
+दवाएँ मत बनाइए। यदि कोई दवा नहीं मिली, तो खाली सूची वापस करें।
 
 पर्चे का टेक्स्ट:
 """,
     
     "mr": """आपण एक फार्मसी असिस्टंट आहात. खाली दिलेल्या पदार्थातून औषधांची नावे काढा.
 
-केवल JSON array मध्ये औषधांची नावे परत करा. औषधे शोधू नका.
-जर कोणतीही औषधे सापडली नाहीत, तर रिकामा array [] परत करा.
-
-उदाहरण आउटपुट:
-["औषध नाव 1", "औषध नाव 2"]
+औषधे शोधू नका. जर कोणतीही औषधे सापडली नाहीत, तर रिकामी यादी परत करा.
 
 पदार्थ टेक्स्ट:
 """
 }
 
+# Gemini JSON mode schema for EXTRACTION_PROMPTS: a list of medicine names
+MEDICINE_LIST_SCHEMA = {
+    "type": "ARRAY",
+    "items": {"type": "STRING"}
+}
+
+# Bulk intake: several OCR texts are packed into one extraction call
+PRESCRIPTION_BATCH_SIZE = int(os.getenv("PRESCRIPTION_BATCH_SIZE", "8"))
+PRESCRIPTION_BATCH_MAX_CHARS = int(os.getenv("PRESCRIPTION_BATCH_MAX_CHARS", "12000"))
+# Output token allowance per document in a batch call
+BATCH_TOKENS_PER_DOCUMENT = 160
+
+BATCH_EXTRACTION_PROMPT = """You are a pharmacy assistant. Below are {count} prescriptions, each starting
+with a line "=== Document <id> ===". Extract the medicine names of every prescription separately.
+
+Return one entry per document with its document_id and its medicines. Do NOT invent medicines
+and do NOT move medicines between documents. If a document has no medicines, return an empty list for it.
+The prescriptions may be written in {language}.
+
+{documents}"""
+
+# Gemini JSON mode schema for BATCH_EXTRACTION_PROMPT: medicines per document id
+BATCH_MEDICINE_LIST_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "document_id": {"type": "STRING"},
+            "medicines": {"type": "ARRAY", "items": {"type": "STRING"}}
+        },
+        "required": ["document_id", "medicines"]
+    }
+}
+
+BATCH_LANGUAGES = {"en": "English", "hi": "Hindi or English", "mr": "Marathi or English"}
+
 # Response templates for different languages
 RESPONSE_TEMPLATES = {
     "en": {
@@ -114,33 +140,19 @@ def extract_medicine_names(ocr_text: str, language: str = "en") -> List[str]:
         return _fallback_extraction(ocr_text)
     
     try:
-        # Use invoke_with_trace for LangSmith observability
-        if is_tracing_enabled():
-            response_content = invoke_with_trace(
-                f"{full_prompt}\n\nExtract medicine names. Return ONLY JSON array.",
-                agent_name="prescription_agent"
-            )
-        else:
-            response = llm.invoke(
-                [HumanMessage(content=full_prompt)],
-                config=_get_langsmith_config()
-            )
-            response_content = response.content.strip()
+        # JSON mode returns the array directly; the same OCR text hits the cache
+        medicines = generate_structured_json(
+            full_prompt,
+            model_type="flash",
+            cache=True,
+            response_schema=MEDICINE_LIST_SCHEMA,
+            task="prescription"
+        )
+        if isinstance(medicines, list):
+            # Clean up medicine names
+            return [m.strip() for m in medicines if isinstance(m, str) and m.strip()]
         
-        # Parse JSON response
-        if response_content:
-            # Try to extract JSON array
-            json_match = re.search(r'\[.*\]', response_content, re.DOTALL)
-            if json_match:
-                try:
-                    medicines = json.loads(json_match.group())
-                    if isinstance(medicines, list):
-                        # Clean up medicine names
-                        return [m.strip() for m in medicines if isinstance(m, str) and m.strip()]
-                except json.JSONDecodeError:
-                    pass
-        
-        # Fallback if LLM response is not valid JSON
+        # Fallback if the LLM call failed
         return _fallback_extraction(ocr_text)
         
     except Exception as e:
@@ -148,6 +160,103 @@ def extract_medicine_names(ocr_text: str, language: str = "en") -> List[str]:
         return _fallback_extraction(ocr_text)
 
 
+def _batch_chunks(documents: List[tuple]) -> List[List[tuple]]:
+    """Split (index, text) pairs into batches within the size and character limits."""
+    chunks, current, chars = [], [], 0
+    for doc in documents:
+        if current and (len(current) >= PRESCRIPTION_BATCH_SIZE or chars + len(doc[1]) > PRESCRIPTION_BATCH_MAX_CHARS):
+            chunks.append(current)
+            current, chars = [], 0
+        current.append(doc)
+        chars += len(doc[1])
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _document_id(value) -> str:
+    """Bare document id of an echoed id ("Document 2", "#2", "=== Document 02 ===" -> "2")."""
+    # Ids are numbers, so the model's decoration ("Document", "#", "===") is ignored
+    match = re.search(r"\d+", str(value))
+    return str(int(match.group())) if match else ""
+
+
+def _extract_batch(chunk: List[tuple], language: str) -> Dict[int, List[str]]:
+    """One extraction call for a batch; medicine names by document index (missing ids left out)."""
+    # Ids are positions within the batch (1..n)
+    documents = "\n\n".join(f"=== Document {n} ===\n{text.strip()}" for n, (_, text) in enumerate(chunk, 1))
+    parsed = generate_structured_json(
+        BATCH_EXTRACTION_PROMPT.format(
+            count=len(chunk),
+            language=BATCH_LANGUAGES.get(language, "English"),
+            documents=documents
+        ),
+        model_type="flash",
+        max_tokens=256 + BATCH_TOKENS_PER_DOCUMENT * len(chunk),
+        cache=True,
+        response_schema=BATCH_MEDICINE_LIST_SCHEMA,
+        task="prescription"
+    )
+    if not isinstance(parsed, list):
+        return {}
+
+    expected = {str(n): i for n, (i, _) in enumerate(chunk, 1)}
+    results = {}
+    for entry in parsed:
+        if not isinstance(entry, dict):
+            continue
+        index = expected.get(_document_id(entry.get("document_id", "")))
+        if index is not None and isinstance(entry.get("medicines"), list):
+            results[index] = [m.strip() for m in entry["medicines"] if isinstance(m, str) and m.strip()]
+    return results
+
+
+def extract_medicine_names_batch(ocr_texts: List[str], language: str = "en") -> List[List[str]]:
+    """
+    Extract medicine names from several prescriptions with one LLM call per batch.
+    
+    Up to PRESCRIPTION_BATCH_SIZE texts (and PRESCRIPTION_BATCH_MAX_CHARS
+    characters) share a call; the output carries a document id per
+    prescription, so results are split back by id. A document missing from
+    the output is extracted on its own.
+    
+    Args:
+        ocr_texts: Raw OCR texts, one per prescription
+        language: Language of the prescriptions (en/hi/mr)
+    
+    Returns:
+        Extracted medicine names per prescription, in input order
+    """
+    results: List[List[str]] = [[] for _ in ocr_texts]
+    documents = [(i, text) for i, text in enumerate(ocr_texts) if text and text.strip()]
+    chunks = _batch_chunks(documents)
+    llm = get_llm() if any(len(chunk) > 1 for chunk in chunks) else None
+    
+    for chunk in chunks:
+        if len(chunk) == 1:
+            i, text = chunk[0]
+            results[i] = extract_medicine_names(text, language)
+            continue
+        if llm is None:
+            for i, text in chunk:
+                results[i] = _fallback_extraction(text)
+            continue
+        try:
+            extracted = _extract_batch(chunk, language)
+        except Exception as e:
+            print(f"[Prescription Agent] Batch extraction error: {e}")
+            extracted = {}
+        for i, text in chunk:
+            if i in extracted:
+                results[i] = extracted[i]
+            else:
+                # Dropped or mislabelled in the batch output
+                results[i] = extract_medicine_names(text, language)
+        print(f"[Prescription Agent] Batch of {len(chunk)}: {len(extracted)} extracted in one call")
+    
+    return results
+
+
 def _fallback_extraction(ocr_text: str) -> List[str]:
     """
     Fallback extraction using simple pattern matching.
@@ -316,6 +425,27 @@ def process_prescription_direct(ocr_text: str, language: str = "en") -> Dict:
     Returns:
         Dictionary with detected medicines and metadata
     """
+    return process_prescriptions_batch([ocr_text], language)[0]
+
+
+def process_prescriptions_batch(ocr_texts: List[str], language: str = "en") -> List[Dict]:
+    """
+    Process a stack of prescriptions (bulk intake), batching the LLM extraction.
+    
+    Args:
+        ocr_texts: Raw OCR texts, one per prescription
+        language: Language code (en/hi/mr)
+    
+    Returns:
+        One process_prescription_direct-style dictionary per prescription, in input order
+    """
+    # Extract medicines
+    extracted_per_doc = extract_medicine_names_batch(ocr_texts, language)
+    return [_prescription_result(text, extracted) for text, extracted in zip(ocr_texts, extracted_per_doc)]
+
+
+def _prescription_result(ocr_text: str, extracted: List[str]) -> Dict:
+    """Match extracted names with the dataset and build the result dictionary."""
     result = {
         "success": False,
         "detected_medicines": [],
@@ -329,8 +459,6 @@ def process_prescription_direct(ocr_text: str, language: str = "en") -> Dict:
         result["message"] = "No text provided for processing"
         return result
     
-    # Extract medicines
-    extracted = extract_medicine_names(ocr_text, language)
     result["raw_extracted"] = extracted
     
     if not extracted:
@@ -368,6 +496,8 @@ __all__ = [
     'extract_medicine_names',
     'match_with_dataset',
     'process_prescription_direct',
+    'extract_medicine_names_batch',
+    'process_prescriptions_batch',
     'EXTRACTION_PROMPTS',
     'RESPONSE_TEMPLATES'
 ]
@@ -3,135 +3,199 @@ Router Agent - Detects user intent and routes to appropriate handlers.
 Handles: medicines list, prescription upload, order history, profile, refill reminders, orders.
 """
 from agents.state_schema import AgentState
-from agents.llm_provider import get_llm, invoke_with_trace, is_tracing_enabled
+from agents.llm_provider import get_llm, is_tracing_enabled, generate_structured_json, agenerate_structured_json
 from tools.inventory_tool import get_all_medicines
 from tools.patient_tool import get_patient, get_patient_orders
+from agents.intent_matcher import INTENT_KEYWORDS, best_intent
+from agents.intent_classifier import classify_intent, log_intent_example, INTENT_CONFIDENCE_THRESHOLD
+from agents.order_parser import is_order_request, parse_order_locally
+from typing import Optional
+import asyncio
 import json
 import re
 
 
-# Intent keywords for rule-based detection
-INTENT_KEYWORDS = {
-    "SHOW_MEDICINES": [
-        "show medicines", "list medicines", "available medicines", "what medicines",
-        "browse medicines", "medicine catalog", "all medicines", "medicine list",
-        "medicines available", "show available", "what do you have",
-        " catalogue", "catalog of medicines", "medicine inventory"
-    ],
-    "UPLOAD_PRESCRIPTION": [
-        "upload prescription", "prescription upload", "upload rx", "prescribe",
-        "prescription image", "doctor prescription", "medical prescription",
-        "attach prescription", "send prescription", "share prescription"
-    ],
-    "ORDER_HISTORY": [
-        "order history", "my orders", "past orders", "previous orders",
-        "order list", "my purchases", "order details", "order status",
-        "ordered medicines", "what i ordered", "order records"
-    ],
-    "REFILL_REMINDERS": [
-        "refill reminder", "refill alerts", "medicine reminder", "reminder",
-        " refill", "when to refill", "next refill", "refill due",
-        "renew medicine", "medicine renewal", "refill needed"
-    ],
-    "SHOW_PROFILE": [
-        "my profile", "show profile", "my account", "my details",
-        "profile", "account details", "my information", "my info",
-        "personal details", "patient profile"
-    ],
-    "MEDICINE_ORDER": [
-        "order", "buy", "purchase", "get", "want", "need", "place order",
-        "order now", "buy now", "can i get", "i want to order", "i want to buy",
-        "please order", "i need", "can i have", "give me", "arrange",
-        "order medicine", "buy medicine", "purchase medicine"
-    ],
-    "GENERAL_CHAT": [
-        "hello", "hi", "hey", "how are you", "thank", "thanks", "help",
-        "what can you do", "who are you", "good morning", "good evening"
-    ]
-}
-
-
 def detect_intent_rule_based(user_input: str) -> str:
     """Detect user intent using keyword matching."""
-    text_lower = user_input.lower()
-    
-    # Define priority order - more specific intents first
-    priority_intents = [
-        "UPLOAD_PRESCRIPTION",  # Check prescription first (most specific)
-        "SHOW_MEDICINES",
-        "ORDER_HISTORY",
-        "REFILL_REMINDERS",
-        "SHOW_PROFILE",
-        "GENERAL_CHAT",
-        "MEDICINE_ORDER"  # Default fallback
-    ]
-    
-    # Check intents in priority order
-    for intent in priority_intents:
-        keywords = INTENT_KEYWORDS.get(intent, [])
-        for keyword in keywords:
-            if keyword in text_lower:
-                return intent
+    # Single pass over the message; hits come back in priority order
+    # (more specific intents first, see intent_matcher.ROUTER_PRIORITY)
+    hit = best_intent(user_input, "router")
+    if hit:
+        return hit.label
     
     # Default to MEDICINE_ORDER if unclear (they might want to buy something)
     return "MEDICINE_ORDER"
 
 
-def detect_intent_llm(user_input: str, user_language: str = "en") -> str:
-    """Detect user intent using LLM with rule-based pre-filtering."""
-    text_lower = user_input.lower()
+# Single structured call: route the message and, for medicine turns, parse the
+# order too so the pharmacist does not need a second LLM round-trip
+ROUTE_AND_PARSE_PROMPT = """You are a pharmacy assistant routing system. Classify the user's intent from this message and, if it is about a medicine, extract the order details.
+
+Message: "{user_input}"
+
+Available intents:
+- SHOW_MEDICINES: User wants to see available medicines list
+- UPLOAD_PRESCRIPTION: User wants to upload a prescription
+- ORDER_HISTORY: User wants to see their order history
+- REFILL_REMINDERS: User wants to check refill reminders
+- SHOW_PROFILE: User wants to see their profile
+- MEDICINE_ORDER: User wants to order/purchase a medicine or asks about a specific medicine
+- GENERAL_CHAT: General greeting or conversation
+
+For MEDICINE_ORDER also fill in:
+- product_name: the medicine/product name mentioned (empty string if none)
+- quantity: how many units/packs they want (1 if not specified)
+- dosage: any dosage instructions mentioned
+- patient_name: any patient name mentioned
+- notes: any special instructions
+- is_order: true if they want to buy it, false if they only ask for information"""
+
+# Gemini JSON mode schema for ROUTE_AND_PARSE_PROMPT (intent limited to known labels)
+ROUTE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "intent": {"type": "STRING", "enum": list(INTENT_KEYWORDS)},
+        "product_name": {"type": "STRING"},
+        "quantity": {"type": "INTEGER"},
+        "dosage": {"type": "STRING"},
+        "patient_name": {"type": "STRING"},
+        "notes": {"type": "STRING"},
+        "is_order": {"type": "BOOLEAN"}
+    },
+    "required": ["intent"]
+}
+
+
+def route_without_llm(user_input: str) -> Optional[dict]:
+    """
+    Routing decision that needs no LLM call.
     
+    Returns:
+        dict with "intent" (plus "order" and "is_order" when the local order
+        parser found a product), or None when the message needs the LLM router
+    """
     # First check for explicit keywords that should always use rule-based
     # This prevents the LLM from misclassifying clear intents
-    explicit_intents = {
-        "prescription": "UPLOAD_PRESCRIPTION",
-        "refill": "REFILL_REMINDERS",
-        "reminder": "REFILL_REMINDERS",
-        "order history": "ORDER_HISTORY",
-        "my orders": "ORDER_HISTORY",
-        "my profile": "SHOW_PROFILE",
-        "show medicines": "SHOW_MEDICINES",
-        "available medicines": "SHOW_MEDICINES",
-        "list medicines": "SHOW_MEDICINES",
-    }
-    
-    for keyword, intent in explicit_intents.items():
-        if keyword in text_lower:
-            print(f"[Router] Rule-based override: '{keyword}' detected as {intent}")
-            return intent
+    hit = best_intent(user_input, "router_explicit")
+    if hit:
+        print(f"[Router] Rule-based override: '{hit.keyword}' detected as {hit.label}")
+        return {"intent": hit.label}
     
     # Now use LLM for more ambiguous cases
     llm = get_llm()
     
     if llm is None:
-        return detect_intent_rule_based(user_input)
+        return {"intent": detect_intent_rule_based(user_input)}
+    
+    # Local classifier answers confident cases without a Gemini round-trip
+    intent, confidence = classify_intent(user_input)
+    if intent and confidence >= INTENT_CONFIDENCE_THRESHOLD:
+        print(f"[Router] Local classifier: {intent} ({confidence:.2f})")
+        return {"intent": intent}
+    
+    # A message naming one catalog product is an order (or info) turn
+    order = parse_order_locally(user_input)
+    if order:
+        print(f"[Router] Local order parser: {order['product_name']}")
+        return {"intent": "MEDICINE_ORDER", "order": order, "is_order": is_order_request(user_input)}
     
-    prompt = f"""You are a pharmacy assistant routing system. Classify the user's intent from this message: "{user_input}"
+    return None
 
-Available intents:
-- SHOW_MEDICINES: User wants to see available medicines list
-- UPLOAD_PRESCRIPTION: User wants to upload a prescription
-- ORDER_HISTORY: User wants to see their order history
-- REFILL_REMINDERS: User wants to check refill reminders
-- SHOW_PROFILE: User wants to see their profile
-- MEDICINE_ORDER: User wants to order/purchase a medicine
-- GENERAL_CHAT: General greeting or conversation
 
-Return ONLY the intent name, nothing else."""
+def route_with_llm(user_input: str, user_language: str = "en", local_routing: Optional[dict] = None) -> dict:
+    """
+    Detect intent and, for medicine turns, parse the order in one LLM call.
+    
+    Args:
+        user_input: User message
+        user_language: Language code
+        local_routing: route_without_llm result already computed for this
+            message ({} when it found nothing), so it is not run twice
+    
+    Returns:
+        dict with "intent" and, when a product was found for MEDICINE_ORDER,
+        "order" (structured order fields) and "is_order"
+    """
+    routing = route_without_llm(user_input) if local_routing is None else local_routing
+    if routing:
+        return routing
+    
+    try:
+        parsed = generate_structured_json(
+            ROUTE_AND_PARSE_PROMPT.format(user_input=user_input),
+            model_type="flash",
+            cache=True,
+            response_schema=ROUTE_SCHEMA,
+            task="routing"
+        )
+        result = _routing_from_llm(user_input, parsed)
+        if result:
+            return result
+    except Exception as e:
+        print(f"[Router] LLM detection failed: {e}")
+    
+    # Fallback to rule-based
+    return {"intent": detect_intent_rule_based(user_input)}
+
 
+async def aroute_with_llm(user_input: str, user_language: str = "en", local_routing: Optional[dict] = None) -> dict:
+    """Async variant of route_with_llm (the Gemini call does not block the event loop)."""
+    routing = local_routing
+    if routing is None:
+        # Classifier loading and catalog parsing block; keep them off the event loop
+        routing = await asyncio.to_thread(route_without_llm, user_input)
+    if routing:
+        return routing
+    
     try:
-        response = invoke_with_trace(prompt, agent_name="router", model_type="flash")
-        if response:
-            response = response.strip().upper()
-            # Validate response is a known intent
-            for intent in INTENT_KEYWORDS.keys():
-                if intent in response:
-                    return intent
+        parsed = await agenerate_structured_json(
+            ROUTE_AND_PARSE_PROMPT.format(user_input=user_input),
+            model_type="flash",
+            cache=True,
+            response_schema=ROUTE_SCHEMA,
+            task="routing"
+        )
+        result = _routing_from_llm(user_input, parsed)
+        if result:
+            return result
     except Exception as e:
         print(f"[Router] LLM detection failed: {e}")
     
     # Fallback to rule-based
-    return detect_intent_rule_based(user_input)
+    return {"intent": detect_intent_rule_based(user_input)}
+
+
+def _routing_from_llm(user_input: str, parsed: Optional[dict]) -> Optional[dict]:
+    """Turn the route-and-parse JSON into a routing dict (None if the intent is unknown)."""
+    intent = str((parsed or {}).get("intent", "")).strip().upper()
+    # Validate response is a known intent
+    if intent not in INTENT_KEYWORDS:
+        return None
+    
+    # Keep the LLM's label as training data for the local classifier
+    log_intent_example(user_input, intent, source="llm")
+    result = {"intent": intent}
+    
+    product_name = str(parsed.get("product_name") or "").strip()
+    if intent == "MEDICINE_ORDER" and product_name:
+        try:
+            quantity = int(parsed.get("quantity") or 1)
+        except (TypeError, ValueError):
+            quantity = 1
+        result["order"] = {
+            "product_name": product_name,
+            "quantity": quantity,
+            "dosage": parsed.get("dosage") or "",
+            "patient_name": parsed.get("patient_name") or "",
+            "notes": parsed.get("notes") or ""
+        }
+        result["is_order"] = parsed.get("is_order") is not False
+    return result
+
+
+def detect_intent_llm(user_input: str, user_language: str = "en") -> str:
+    """Detect user intent using LLM with rule-based pre-filtering."""
+    return route_with_llm(user_input, user_language)["intent"]
 
 
 def router_agent(state: AgentState) -> AgentState:
@@ -140,8 +204,6 @@ def router_agent(state: AgentState) -> AgentState:
     """
     user_input = state.get("user_input", "")
     user_language = state.get("user_language", "en")
-    user_id = state.get("user_id", "default")
-    user_email = state.get("user_email", "")
     
     if not user_input:
         state["current_intent"] = "GENERAL_CHAT"
@@ -149,13 +211,61 @@ def router_agent(state: AgentState) -> AgentState:
         state["final_response"] = "Hello! How can I help you today?"
         return state
     
-    # Detect intent
-    intent = detect_intent_llm(user_input, user_language)
+    # Detect intent (and parse the order when the LLM was needed anyway)
+    routing = route_with_llm(user_input, user_language, _take_local_routing(state))
+    intent = _apply_routing(state, routing)
+    
+    return dispatch_intent(state, intent)
+
+
+async def arouter_agent(state: AgentState) -> AgentState:
+    """
+    Async variant of router_agent for app_graph.ainvoke.
+    
+    The handlers call the inventory/patient APIs with blocking requests,
+    so they run in a worker thread.
+    """
+    user_input = state.get("user_input", "")
+    user_language = state.get("user_language", "en")
+    
+    if not user_input:
+        return router_agent(state)
+    
+    routing = await aroute_with_llm(user_input, user_language, _take_local_routing(state))
+    intent = _apply_routing(state, routing)
+    
+    return await asyncio.to_thread(dispatch_intent, state, intent)
+
+
+def _take_local_routing(state: AgentState) -> Optional[dict]:
+    """Routing decision the fast path made for this turn; cleared so it is never reused."""
+    routing = state.get("local_routing")
+    state["local_routing"] = None
+    return routing
+
+
+def _apply_routing(state: AgentState, routing: dict) -> str:
+    """Store a routing decision in the state and return the intent."""
+    intent = routing["intent"]
     
     state["current_intent"] = intent
     state["intent_type"] = intent
     
-    print(f"[Router] Detected intent: {intent} for input: {user_input}")
+    # Always reset so a checkpointed order from an earlier turn is never reused;
+    # the pharmacist skips its own LLM call when this is populated
+    state["structured_order"] = routing.get("order", {})
+    if "order" in routing:
+        state["is_order_request"] = routing["is_order"]
+    
+    print(f"[Router] Detected intent: {intent} for input: {state.get('user_input', '')}")
+    return intent
+
+
+def dispatch_intent(state: AgentState, intent: str) -> AgentState:
+    """Run the router handler for an intent (MEDICINE_ORDER is left to the graph)."""
+    user_language = state.get("user_language", "en")
+    user_id = state.get("user_id", "default")
+    user_email = state.get("user_email", "")
     
     # Route to appropriate handler
     if intent == "SHOW_MEDICINES":
@@ -14,6 +14,8 @@ class AgentState(TypedDict):
     intent_type: str
     current_intent: str
     detected_language: str
+    # Local routing decision made before the graph (fast path), consumed by the router
+    local_routing: Optional[dict]
     
     # Session tracking
     session_id: str
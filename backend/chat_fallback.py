@@ -4,6 +4,7 @@ without relying on the LangGraph agent workflow.
 """
 import requests
 from datetime import datetime, timedelta
+from agents.intent_matcher import best_intent
 
 API_URL = "http://localhost:8000"
 
@@ -370,52 +371,27 @@ def process_message(message: str, user_id: str = "default", language: str = "Eng
     Process a chat message and return a response.
     Uses rule-based intent detection and direct API calls.
     """
-    message_lower = message.lower().strip()
+    # Single pass over the shared keyword tables; the highest-priority
+    # hit follows the original check order (medicines, orders, refills,
+    # profile, prescription, greeting, help, thanks)
+    hit = best_intent(message.strip(), "fallback")
+    intent = hit.label if hit else None
     
-    # Show medicines intent
-    medicine_keywords = ["show medicines", "list medicines", "available medicines", "what medicines", 
-                       "browse medicines", "medicine catalog", "all medicines", "medicine list",
-                       "medicines available", "what do you have"]
-    if any(kw in message_lower for kw in medicine_keywords):
+    if intent == "SHOW_MEDICINES":
         return handle_show_medicines(language)
-    
-    # Order history intent
-    order_keywords = ["order history", "my orders", "past orders", "previous orders", 
-                     "order list", "my purchases", "order details"]
-    if any(kw in message_lower for kw in order_keywords):
+    if intent == "ORDER_HISTORY":
         return handle_order_history(user_id, language)
-    
-    # Refill reminders intent
-    refill_keywords = ["refill reminder", "refill alerts", "medicine reminder", "reminder",
-                     "refill", "when to refill", "next refill", "refill due", "renew medicine"]
-    if any(kw in message_lower for kw in refill_keywords):
+    if intent == "REFILL_REMINDERS":
         return handle_refill_reminders(user_id, language)
-    
-    # Profile intent
-    profile_keywords = ["my profile", "show profile", "my account", "my details",
-                      "profile", "account details", "my information", "my info"]
-    if any(kw in message_lower for kw in profile_keywords):
+    if intent == "SHOW_PROFILE":
         return handle_show_profile(user_id, language)
-    
-    # Prescription upload intent
-    prescription_keywords = ["upload prescription", "prescription upload", "upload rx", "prescribe",
-                          "prescription image", "doctor prescription", "medical prescription"]
-    if any(kw in message_lower for kw in prescription_keywords):
+    if intent == "UPLOAD_PRESCRIPTION":
         return handle_prescription_upload(language)
-    
-    # Greeting intent
-    greeting_keywords = ["hello", "hi", "hey", "good morning", "good evening", "good night"]
-    if any(kw in message_lower for kw in greeting_keywords):
+    if intent == "GREETING":
         return handle_greeting(language)
-    
-    # Help intent
-    help_keywords = ["help", "what can you do", "who are you"]
-    if any(kw in message_lower for kw in help_keywords):
+    if intent == "HELP":
         return handle_help(language)
-    
-    # Thanks intent
-    thanks_keywords = ["thank", "thanks", "thankyou"]
-    if any(kw in message_lower for kw in thanks_keywords):
+    if intent == "THANKS":
         return handle_thanks(language)
     
     # Default to unknown
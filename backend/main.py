@@ -1,18 +1,22 @@
-from fastapi import FastAPI, Depends, Query, HTTPException, status
+from fastapi import FastAPI, Depends, Query, HTTPException, status, BackgroundTasks
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from contextlib import asynccontextmanager
 from sqlalchemy.orm import Session
 from passlib.context import CryptContext
 from .database import Base, engine, SessionLocal
 from .models import Medicine, Order, Patient, RefillAlert, User, ProcurementLog
-from .seed_loader import seed_data
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional
 from jose import JWTError, jwt
 import sys
 import os
+import re
+import json
+import asyncio
 import tempfile
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from tools.webhook_tool import send_order_confirmation_email
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -51,10 +55,22 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 # Initialize DB and seed data
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm the slow components in the background; /ready reports when they are."""
+    from backend.services.warmup import get_warmup
+    warmup_task = asyncio.create_task(get_warmup().run())
+    yield
+    if not warmup_task.done():
+        warmup_task.cancel()
 
-# Seed data disabled - uncomment if needed
+
+app = FastAPI(lifespan=lifespan)
+
+# Seed data disabled - uncomment if needed (seed_loader pulls in pandas,
+# so it is not imported at startup otherwise)
 # try:
+#     from .seed_loader import seed_data
 #     seed_data()
 # except Exception as e:
 #     print(f"Warning: Could not seed data: {e}")
@@ -99,6 +115,15 @@ async def get_admin_user(current_user: User = Depends(get_current_user)):
 def get_medicine(name: str = None, db: Session = Depends(get_db)):
     """Return medicine info by name or all medicines."""
     if name:
+        # Names typed in Devanagari/Bengali/Gujarati/Malayalam are resolved to
+        # the catalog spelling through the transliteration index
+        from backend.services.transliteration import contains_indic_script
+        if contains_indic_script(name):
+            from backend.services.dataset_matcher import match_medicine
+            match = match_medicine(name)
+            if not match:
+                return None
+            name = match["matched_name"]
         med = db.query(Medicine).filter(Medicine.name.ilike(f"%{name}%")).first()
         if med:
             return {"id": med.id, "product_id": med.product_id, "name": med.name, "price": med.price, 
@@ -168,6 +193,7 @@ def create_order(patient_id: str, product_name: str, quantity: int, db: Session
             "address": patient.address or "N/A",
             "customer_email": patient.email
         }
+        from tools.webhook_tool import send_order_confirmation_email
         send_order_confirmation_email(patient.email, order_details)
     
     return {
@@ -542,6 +568,86 @@ async def analyze_prescription(
         })
 
 
+# Most prescriptions accepted by one bulk intake request
+MAX_BATCH_PRESCRIPTIONS = 50
+
+
+@app.post("/analyze-prescriptions")
+async def analyze_prescriptions_batch(
+    files: List[UploadFile] = File(...),
+    language: str = Query("en", description="Language code: en, hi, mr")
+):
+    """
+    Bulk intake: analyze a stack of prescription images.
+    
+    Each file is OCR'd on its own; medicine extraction packs several
+    prescriptions into one LLM call (see process_prescriptions_batch).
+    
+    Returns:
+        JSON with one /analyze-prescription style result per file, in upload order
+    """
+    if len(files) > MAX_BATCH_PRESCRIPTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many files. Maximum is {MAX_BATCH_PRESCRIPTIONS} per request"
+        )
+    
+    allowed_types = {"image/jpeg", "image/png", "image/jpg", "application/pdf"}
+    from backend.services.ocr_service import extract_prescription_text
+    from agents.prescription_agent import process_prescriptions_batch
+    
+    # OCR every readable upload; the others get an error entry
+    entries = []
+    for file in files:
+        entry = {"filename": file.filename}
+        entries.append(entry)
+        if file.content_type not in allowed_types:
+            entry["error"] = "Invalid file type. Allowed: jpg, jpeg, png, pdf"
+            continue
+        image_data = await file.read()
+        if len(image_data) > 10 * 1024 * 1024:
+            entry["error"] = "File too large. Maximum size is 10MB"
+            continue
+        
+        file_ext = {"image/jpeg": ".jpg", "application/pdf": ".pdf"}.get(file.content_type, ".png")
+        entry["prescription_image"] = f"prescription_{uuid_module.uuid4().hex}{file_ext}"
+        with open(os.path.join(PRESCRIPTION_DIR, entry["prescription_image"]), "wb") as f:
+            f.write(image_data)
+        
+        try:
+            entry["ocr"] = await run_in_threadpool(extract_prescription_text, image_data)
+        except Exception as e:
+            entry["error"] = f"Error processing prescription: {e}"
+    
+    readable = [e for e in entries if e.get("ocr", {}).get("success") and e["ocr"].get("text")]
+    processed = await run_in_threadpool(
+        process_prescriptions_batch, [e["ocr"]["text"] for e in readable], language
+    )
+    for entry, result in zip(readable, processed):
+        entry["result"] = result
+    
+    results = []
+    for entry in entries:
+        ocr = entry.get("ocr", {})
+        result = entry.get("result") or {
+            "success": False,
+            "message": entry.get("error") or "Could not read prescription clearly. Please upload a clearer image.",
+            "detected_medicines": []
+        }
+        result.update({
+            "filename": entry["filename"],
+            "prescription_image": entry.get("prescription_image"),
+            "ocr_method": ocr.get("method", "none"),
+            "ocr_confidence": ocr.get("confidence", 0)
+        })
+        if "result" in entry:
+            result["ocr_text"] = ocr.get("text", "")[:500]
+        results.append(result)
+    
+    print(f"[Prescription API] Batch of {len(files)}: {sum(r['success'] for r in results)} with medicines")
+    return {"count": len(results), "results": results}
+
+
 @app.get("/prescriptions/{filename}")
 async def get_prescription_image(filename: str):
     """Serve prescription images."""
@@ -601,6 +707,65 @@ def update_procurement_log(log_id: int, status: str, notes: str = None):
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+@app.get("/llm/cache-stats")
+def llm_cache_stats():
+    """Get LLM response cache hit/miss and request coalescing statistics."""
+    from backend.services.llm_cache import get_cache_stats
+    from backend.services.semantic_cache import get_semantic_cache
+    from backend.services.llm_singleflight import get_singleflight
+    return {
+        "exact": get_cache_stats(),
+        "semantic": get_semantic_cache().stats(),
+        "singleflight": get_singleflight().stats()
+    }
+
+
+@app.get("/llm/resilience-stats")
+def llm_resilience_stats():
+    """Get LLM retry/hedge counters, circuit breaker state and latency percentiles."""
+    from backend.services.llm_resilience import get_resilience_stats
+    return get_resilience_stats()
+
+
+@app.get("/llm/limiter-stats")
+def llm_limiter_stats():
+    """Get LLM rate-limiter queue depth, in-flight calls and wait times per priority."""
+    from backend.services.llm_limiter import get_limiter_stats
+    return get_limiter_stats()
+
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 200 once the warm-up has settled, 503 while components are still loading."""
+    from backend.services.warmup import get_warmup
+    readiness = get_warmup().status()
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
+
+@app.get("/llm/context-stats")
+def llm_context_stats():
+    """Get prompt token percentiles and conversation-history budgeting counters."""
+    from backend.services.context_budget import get_context_builder
+    return get_context_builder().stats()
+
+
+@app.get("/llm/routing-stats")
+def llm_routing_stats():
+    """Get per-model latency / failure rate by task and the model routing decisions taken."""
+    from backend.services.model_router import get_routing_stats
+    return get_routing_stats()
+
+
+# ==================== RECOMMENDATION ENDPOINTS ====================
+
+@app.post("/refresh-alternatives")
+def refresh_alternatives(background_tasks: BackgroundTasks,
+                         full: bool = Query(default=False, description="Recompute alternatives for every product")):
+    """Schedule a refresh of the precomputed product alternatives table."""
+    from tools.recommendation_tool import run_alternatives_refresh
+    background_tasks.add_task(run_alternatives_refresh, full=full)
+    return {"status": "scheduled", "full": full}
+
 
 # ==================== CHAT API ENDPOINTS ====================
 
@@ -650,8 +815,50 @@ def get_language_code(language: str) -> str:
     return code_map.get(language, "en")
 
 
+def _graph_input(message: str, user_id: str, user_email: str, lang_code: str,
+                 language: str, session_id: str, mode: str, routing: Optional[dict] = None) -> dict:
+    """Initial LangGraph state for a chat or voice message (with the fast path's routing decision)."""
+    return {
+        "user_input": message,
+        "user_id": user_id,
+        "user_email": user_email,
+        "user_phone": None,
+        "user_address": None,
+        "user_language": lang_code,
+        "detected_language": language,
+        "session_id": session_id,
+        "intent_type": "GENERAL_CHAT",
+        "current_intent": "GENERAL_CHAT",
+        "local_routing": routing,
+        "identified_symptoms": [],
+        "possible_conditions": [],
+        "medical_advice": "",
+        "recommended_medicines": [],
+        "structured_order": {},
+        "safety_result": {},
+        "final_response": "",
+        "is_proactive": False,
+        "refill_alerts": [],
+        "requires_confirmation": False,
+        "confirmation_message": "",
+        "user_confirmed": None,
+        "pending_order_details": None,
+        "agent_trace": [],
+        "is_order_request": True,
+        "info_product": "",
+        "info_response": "",
+        "metadata": {
+            "agent_name": f"{mode}_interface",
+            "action": f"process_{mode}_input",
+            "language": language,
+            "interaction_mode": mode,
+            "source": "frontend"
+        }
+    }
+
+
 @app.post("/chat")
-def chat_message(
+async def chat_message(
     message: str = Query(..., description="User message"),
     user_id: str = Query("default"),
     user_email: str = Query("default@example.com"),
@@ -661,6 +868,9 @@ def chat_message(
     """
     Chat API endpoint for text-based conversation.
     Uses fallback handler when LangGraph workflow fails.
+    
+    Async so in-flight Gemini calls do not hold a threadpool thread; blocking
+    work (tools calling this API, TTS) is pushed to the threadpool.
     """
     print(f"[Chat API] Received message: {message}")
     
@@ -677,48 +887,20 @@ def chat_message(
         if not session_id:
             session_id = f"{user_id}:{datetime.now().timestamp()}"
         
-        # Import and run the agent graph
-        from orchestration.graph import app_graph
-        
-        result = app_graph.invoke(
-            {
-                "user_input": message,
-                "user_id": user_id,
-                "user_email": user_email,
-                "user_phone": None,
-                "user_address": None,
-                "user_language": lang_code,
-                "detected_language": language,
-                "session_id": session_id,
-                "intent_type": "GENERAL_CHAT",
-                "current_intent": "GENERAL_CHAT",
-                "identified_symptoms": [],
-                "possible_conditions": [],
-                "medical_advice": "",
-                "recommended_medicines": [],
-                "structured_order": {},
-                "safety_result": {},
-                "final_response": "",
-                "is_proactive": False,
-                "refill_alerts": [],
-                "requires_confirmation": False,
-                "confirmation_message": "",
-                "user_confirmed": None,
-                "pending_order_details": None,
-                "agent_trace": [],
-                "is_order_request": True,
-                "info_product": "",
-                "info_response": "",
-                "metadata": {
-                    "agent_name": "chat_interface",
-                    "action": "process_chat_input",
-                    "language": language,
-                    "interaction_mode": "chat",
-                    "source": "frontend"
-                }
-            },
-            config={"configurable": {"thread_id": session_id}}
-        )
+        # Simple intents are answered without entering the graph
+        from orchestration.fast_path import try_fast_path
+        result, routing = await run_in_threadpool(try_fast_path, message, user_id, user_email, lang_code)
+        path = "fast"
+        
+        if result is None:
+            # Import and run the agent graph
+            from orchestration.graph import app_graph
+            path = "graph"
+            
+            result = await app_graph.ainvoke(
+                _graph_input(message, user_id, user_email, lang_code, language, session_id, "chat", routing),
+                config={"configurable": {"thread_id": session_id}}
+            )
         
         response_text = result.get("final_response", "")
         
@@ -737,7 +919,8 @@ def chat_message(
                     "language": language,
                     "source": "frontend",
                     "intent": result.get("intent_type", "GENERAL_CHAT"),
-                    "agent_trace": result.get("agent_trace", [])
+                    "agent_trace": result.get("agent_trace", []),
+                    "path": path
                 }
             }
         
@@ -747,7 +930,7 @@ def chat_message(
     # Fallback to rule-based handler when LangGraph fails or returns empty
     try:
         from chat_fallback import process_message
-        fallback_result = process_message(message, user_id, language)
+        fallback_result = await run_in_threadpool(process_message, message, user_id, language)
         
         return {
             "text": fallback_result["text"],
@@ -779,8 +962,141 @@ def chat_message(
         }
 
 
+# Characters per token event when streaming a finished response
+STREAM_CHUNK_CHARS = 24
+
+# Progress labels for the graph nodes, shown while a message is processed
+STREAM_NODE_LABELS = {
+    "router": "Understanding your request",
+    "prescription": "Reading the prescription",
+    "pharmacist": "Finding the medicine",
+    "safety": "Checking stock and prescription rules",
+    "execution": "Placing the order",
+    "refill": "Checking refill reminders",
+}
+
+
+def _sse(event: str, data: dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def _sse_text_chunks(text: str):
+    """Split a response into token events on word boundaries."""
+    chunk = ""
+    for word in re.split(r"(\s+)", text):
+        chunk += word
+        if len(chunk) >= STREAM_CHUNK_CHARS:
+            yield _sse("token", {"text": chunk})
+            chunk = ""
+    if chunk:
+        yield _sse("token", {"text": chunk})
+
+
+@app.post("/chat/stream")
+async def chat_message_stream(
+    message: str = Query(..., description="User message"),
+    user_id: str = Query("default"),
+    user_email: str = Query("default@example.com"),
+    language: str = Query(None),
+    session_id: str = Query(None)
+):
+    """
+    Streaming variant of /chat (server-sent events).
+    
+    Events:
+        start:    sent immediately (language, session_id)
+        progress: one per finished graph node (node, label, intent)
+        token:    response text, in order
+        done:     same fields as the /chat response, without "text"
+        error:    the graph failed; the rule-based reply follows as tokens
+    """
+    print(f"[Chat Stream] Received message: {message}")
+    
+    if not language:
+        language = detect_language_from_text(message)
+    lang_code = get_language_code(language)
+    if not session_id:
+        session_id = f"{user_id}:{datetime.now().timestamp()}"
+    
+    async def events():
+        yield _sse("start", {"language": language, "session_id": session_id})
+        
+        result, path = None, "fast"
+        try:
+            from orchestration.fast_path import try_fast_path
+            result, routing = await run_in_threadpool(try_fast_path, message, user_id, user_email, lang_code)
+            
+            if result is None:
+                from orchestration.graph import app_graph
+                path = "graph"
+                config = {"configurable": {"thread_id": session_id}}
+                
+                async for update in app_graph.astream(
+                    _graph_input(message, user_id, user_email, lang_code, language, session_id, "chat", routing),
+                    config=config,
+                    stream_mode="updates"
+                ):
+                    for node, node_state in update.items():
+                        yield _sse("progress", {
+                            "node": node,
+                            "label": STREAM_NODE_LABELS.get(node, node),
+                            "intent": (node_state or {}).get("intent_type")
+                        })
+                
+                result = (await app_graph.aget_state(config)).values
+        except Exception as e:
+            print(f"[Chat Stream] LangGraph error: {e}")
+            yield _sse("error", {"message": "workflow_failed"})
+            result = None
+        
+        response_text = (result or {}).get("final_response", "")
+        if response_text and response_text.strip():
+            for event in _sse_text_chunks(response_text):
+                yield event
+            yield _sse("done", {
+                "language": language,
+                "requires_confirmation": result.get("requires_confirmation", False),
+                "pending_order": result.get("pending_order_details"),
+                "metadata": {
+                    "mode": "chat",
+                    "language": language,
+                    "source": "frontend",
+                    "intent": result.get("intent_type", "GENERAL_CHAT"),
+                    "agent_trace": result.get("agent_trace", []),
+                    "path": path
+                }
+            })
+            return
+        
+        # Same fallbacks as /chat
+        try:
+            from chat_fallback import process_message
+            fallback_result = await run_in_threadpool(process_message, message, user_id, language)
+            text, source, intent = fallback_result["text"], "fallback", fallback_result.get("intent", "UNKNOWN")
+        except Exception as fallback_error:
+            print(f"[Chat Stream] Fallback error: {fallback_error}")
+            text = "I didn't quite get that. Would you like to:\n\n🛒 Order medicines\n📋 Upload prescription\n📦 View your orders\n🔔 Check refill reminders\n\nPlease let me know how I can help!"
+            source, intent = "final_fallback", "FALLBACK"
+        
+        for event in _sse_text_chunks(text):
+            yield event
+        yield _sse("done", {
+            "language": language,
+            "requires_confirmation": False,
+            "pending_order": None,
+            "metadata": {"mode": "chat", "language": language, "source": source, "intent": intent}
+        })
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post("/voice")
-def voice_message(
+async def voice_message(
     transcript: str = Query(..., description="Voice transcript"),
     user_id: str = Query("default"),
     user_email: str = Query("default@example.com"),
@@ -803,48 +1119,20 @@ def voice_message(
         if not session_id:
             session_id = f"{user_id}:{datetime.now().timestamp()}"
         
-        # Import and run the agent graph
-        from orchestration.graph import app_graph
-        
-        result = app_graph.invoke(
-            {
-                "user_input": transcript,
-                "user_id": user_id,
-                "user_email": user_email,
-                "user_phone": None,
-                "user_address": None,
-                "user_language": lang_code,
-                "detected_language": language,
-                "session_id": session_id,
-                "intent_type": "GENERAL_CHAT",
-                "current_intent": "GENERAL_CHAT",
-                "identified_symptoms": [],
-                "possible_conditions": [],
-                "medical_advice": "",
-                "recommended_medicines": [],
-                "structured_order": {},
-                "safety_result": {},
-                "final_response": "",
-                "is_proactive": False,
-                "refill_alerts": [],
-                "requires_confirmation": False,
-                "confirmation_message": "",
-                "user_confirmed": None,
-                "pending_order_details": None,
-                "agent_trace": [],
-                "is_order_request": True,
-                "info_product": "",
-                "info_response": "",
-                "metadata": {
-                    "agent_name": "voice_interface",
-                    "action": "process_voice_input",
-                    "language": language,
-                    "interaction_mode": "voice",
-                    "source": "frontend"
-                }
-            },
-            config={"configurable": {"thread_id": session_id}}
-        )
+        # Simple intents are answered without entering the graph
+        from orchestration.fast_path import try_fast_path
+        result, routing = await run_in_threadpool(try_fast_path, transcript, user_id, user_email, lang_code)
+        path = "fast"
+        
+        if result is None:
+            # Import and run the agent graph
+            from orchestration.graph import app_graph
+            path = "graph"
+            
+            result = await app_graph.ainvoke(
+                _graph_input(transcript, user_id, user_email, lang_code, language, session_id, "voice", routing),
+                config={"configurable": {"thread_id": session_id}}
+            )
         
         response_text = result.get("final_response", "")
         
@@ -854,7 +1142,7 @@ def voice_message(
             from backend.services.elevenlabs_service import generate_voice
             
             # Generate audio for the response
-            audio_data = generate_voice(response_text, language)
+            audio_data = await run_in_threadpool(generate_voice, response_text, language)
             
             if audio_data:
                 # Save audio to cache directory
@@ -883,7 +1171,8 @@ def voice_message(
                 "language": language,
                 "source": "frontend",
                 "intent": result.get("intent_type", "GENERAL_CHAT"),
-                "agent_trace": result.get("agent_trace", [])
+                "agent_trace": result.get("agent_trace", []),
+                "path": path
             }
         }
         
@@ -893,14 +1182,14 @@ def voice_message(
     # Fallback to rule-based handler when LangGraph fails or returns empty
     try:
         from chat_fallback import process_message
-        fallback_result = process_message(transcript, user_id, language)
+        fallback_result = await run_in_threadpool(process_message, transcript, user_id, language)
         
         # Generate audio using ElevenLabs
         audio_url = None
         try:
             from backend.services.elevenlabs_service import generate_voice
             
-            audio_data = generate_voice(fallback_result["text"], language)
+            audio_data = await run_in_threadpool(generate_voice, fallback_result["text"], language)
             
             if audio_data:
                 audio_filename = f"{uuid.uuid4().hex}.mp3"
@@ -59,6 +59,17 @@ class ProcurementLog(Base):
     order_date = Column(DateTime, default=datetime.now)
     notes = Column(String)
 
+class ProductAlternative(Base):
+    __tablename__ = "product_alternatives"
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, index=True)
+    product_name = Column(String, index=True)
+    alternative_product_id = Column(Integer, index=True)
+    alternative_name = Column(String)
+    rank = Column(Integer)  # 1 = most similar
+    similarity_score = Column(Float)
+    computed_at = Column(DateTime, default=datetime.now)
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -35,6 +35,13 @@ def seed_data():
             continue
     db.commit()
 
+    # Precompute alternatives for newly added products
+    try:
+        from tools.recommendation_tool import refresh_product_alternatives
+        refresh_product_alternatives()
+    except Exception as e:
+        print(f"Warning: Could not refresh product alternatives: {e}")
+
 
     # Load Consumer Order History (skip header rows)
     history = pd.read_excel("data/Consumer Order History 1.xlsx", skiprows=4)
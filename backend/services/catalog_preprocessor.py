@@ -0,0 +1,203 @@
+"""
+Catalog Preprocessor for SwasthyaSarthi.
+Parses active ingredient, strength and dosage form out of product names and
+descriptions, and groups products into therapeutic equivalence clusters.
+
+A cluster is the set of SKUs sharing the same active ingredient(s) and the same
+dosage form. Strength is kept as a separate column so substitutes with the same
+strength can be ranked first.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Cluster id for products whose active ingredient could not be parsed
+UNCLUSTERED = -1
+
+# Canonical active ingredient -> patterns seen in names/descriptions (German and English)
+INGREDIENT_PATTERNS = {
+    "paracetamol": [r"paracetamol", r"acetaminophen"],
+    "ibuprofen": [r"ibuprofen", r"nurofen"],
+    "diclofenac": [r"diclofenac", r"diclo\b", r"diclo-"],
+    "cetirizine": [r"cetirizin"],
+    "loratadine": [r"loratadin"],
+    "levocabastine": [r"levocabastin", r"livocab"],
+    "cromoglicic acid": [r"cromoglicin", r"cromo-", r"vividrin"],
+    "hyaluronic acid": [r"hyaluron"],
+    "dexpanthenol": [r"panthenol", r"bepanthen"],
+    "hydrocortisone": [r"hydrocort"],
+    "minoxidil": [r"minoxidil"],
+    "loperamide": [r"loperamid"],
+    "bisacodyl": [r"bisacodyl", r"dulcolax"],
+    "ambroxol": [r"ambroxol", r"mucosolvan"],
+    "ramipril": [r"ramipril"],
+    "urea": [r"\burea"],
+    "salicylic acid": [r"salicyl"],
+    "saw palmetto": [r"saw palmet", r"sägepalme"],
+    "omega-3": [r"omega-3", r"omega 3", r"fish oil"],
+    "vitamin d3": [r"vitamin d3", r"vitamin-d", r"vigantol"],
+    "vitamin b12": [r"\bb12\b", r"vitamin-b12"],
+    "vitamin b complex": [r"b-komplex", r"b-vitamin", r"b vitamin"],
+    "multivitamin": [r"multivitamin"],
+    "magnesium": [r"magnesium"],
+    "calcium": [r"calcium"],
+    "probiotics": [r"probiot", r"synbiot", r"(?<!anti)biotic"],
+}
+
+# Dosage form -> keywords, checked in order so specific forms win (eye drops before drops).
+# Keywords match at the end of a word so German compounds ("Schmerzgel") count
+# but unrelated words ("Gelenke") do not.
+DOSAGE_FORMS: List[Tuple[str, List[str]]] = [
+    ("eye_drops", ["augentropfen", "eye drops"]),
+    ("tablet", ["filmtabletten", "schmelztabletten", "tabletten", "tablette", "tablets", "tablet", "dragées", "dragees"]),
+    ("capsule", ["hartkapseln", "retardkapseln", "kapseln", "capsules", "capsule"]),
+    ("drops", ["tropfen", "drops"]),
+    ("spray", ["spray", "schaum"]),
+    ("gel", ["gel"]),
+    ("ointment", ["salbe", "ointment"]),
+    ("cream", ["creme", "cream"]),
+    ("lotion", ["lotion"]),
+    ("liquid", ["saft", "flüssigkeit", "lösung", "syrup", "liquid"]),
+    ("gummies", ["gummibärchen", "fruchtgummi", "gummies"]),
+]
+
+# Strength like "500 mg", "46,3 mg/g", "2000 I.E.", "0,05 %"
+_STRENGTH_RE = re.compile(
+    r"(\d+(?:[.,]\d+)?)\s*(mg/ml|mg/g|mg|µg|mcg|g|ml|i\.\s?e\.|%)(?![a-zäöü])",
+    re.IGNORECASE
+)
+
+_FORM_RES = [
+    (form, re.compile("|".join(f"{re.escape(k)}(?![a-zäöüß])" for k in keywords), re.IGNORECASE))
+    for form, keywords in DOSAGE_FORMS
+]
+
+_INGREDIENT_RES = {
+    ingredient: re.compile("|".join(patterns), re.IGNORECASE)
+    for ingredient, patterns in INGREDIENT_PATTERNS.items()
+}
+
+
+def parse_strength(text: str) -> Optional[str]:
+    """
+    Parse the strength(s) from a product name.
+
+    Combination products keep all strengths, e.g. "80 mg/90 mg/180 mg".
+    Package sizes ("50 ml" bottles) are not in names, so ml/g values there
+    are concentrations or fill volumes that still distinguish SKUs.
+    """
+    parts = []
+    for value, unit in _STRENGTH_RE.findall(text or ""):
+        unit = unit.lower().replace(" ", "")
+        value = value.replace(",", ".")
+        parts.append(f"{value} {unit}")
+    return "/".join(parts) if parts else None
+
+
+def strength_spans(text: str) -> List[Tuple[int, int]]:
+    """Character ranges of the strengths in a text ("500 mg", "0,05 %")."""
+    return [m.span() for m in _STRENGTH_RE.finditer(text or "")]
+
+
+def parse_dosage_form(text: str) -> Optional[str]:
+    """Parse the dosage form from a product name or description."""
+    for form, pattern in _FORM_RES:
+        if pattern.search(text or ""):
+            return form
+    return None
+
+
+def parse_active_ingredients(name: str, description: str = "") -> List[str]:
+    """
+    Parse active ingredients, preferring the product name over the description.
+
+    Returns:
+        Sorted list of canonical ingredient names (empty if unknown)
+    """
+    for text in (name, description):
+        found = sorted(
+            ingredient for ingredient, pattern in _INGREDIENT_RES.items()
+            if pattern.search(text or "")
+        )
+        if found:
+            return found
+    return []
+
+
+def parse_product(name: str, description: str = "") -> Dict:
+    """
+    Parse structured attributes for a single product.
+
+    Args:
+        name: Product name
+        description: Product description (optional)
+
+    Returns:
+        Dictionary with active_ingredient, strength and dosage_form
+    """
+    ingredients = parse_active_ingredients(name, description)
+    return {
+        "active_ingredient": "+".join(ingredients) if ingredients else None,
+        "strength": parse_strength(name),
+        "dosage_form": parse_dosage_form(name) or parse_dosage_form(description),
+    }
+
+
+def cluster_key(parsed: Dict) -> Optional[Tuple[str, str]]:
+    """Equivalence key of a parsed product, or None if it cannot be clustered."""
+    if not parsed.get("active_ingredient"):
+        return None
+    return parsed["active_ingredient"], parsed.get("dosage_form") or "unknown"
+
+
+def preprocess_catalog(products_df: pd.DataFrame, name_column: str = "name",
+                       description_column: str = "description") -> pd.DataFrame:
+    """
+    Add structured columns and equivalence cluster ids to a products DataFrame.
+
+    Adds: active_ingredient, strength, dosage_form, cluster_id
+    (cluster_id is UNCLUSTERED when no active ingredient was recognised).
+    """
+    df = products_df.copy()
+    names = df.get(name_column, pd.Series([""] * len(df), index=df.index)).fillna("").astype(str)
+    descriptions = df.get(description_column, pd.Series([""] * len(df), index=df.index)).fillna("").astype(str)
+
+    parsed = [parse_product(n, d) for n, d in zip(names, descriptions)]
+    df["active_ingredient"] = [p["active_ingredient"] for p in parsed]
+    df["strength"] = [p["strength"] for p in parsed]
+    df["dosage_form"] = [p["dosage_form"] for p in parsed]
+
+    cluster_ids: Dict[Tuple[str, str], int] = {}
+    ids = []
+    for p in parsed:
+        key = cluster_key(p)
+        if key is None:
+            ids.append(UNCLUSTERED)
+        else:
+            ids.append(cluster_ids.setdefault(key, len(cluster_ids)))
+    df["cluster_id"] = ids
+
+    clustered = sum(1 for i in ids if i != UNCLUSTERED)
+    logger.info(f"[Catalog Preprocessor] Parsed {len(df)} products into {len(cluster_ids)} clusters ({clustered} clustered)")
+    return df
+
+
+# Export
+__all__ = [
+    'parse_product',
+    'parse_strength',
+    'strength_spans',
+    'parse_dosage_form',
+    'parse_active_ingredients',
+    'cluster_key',
+    'preprocess_catalog',
+    'UNCLUSTERED',
+    'INGREDIENT_PATTERNS',
+    'DOSAGE_FORMS'
+]
@@ -0,0 +1,219 @@
+"""
+Conversation Context Budget for SwasthyaSarthi.
+Keeps the prompt of multi-turn Gemini calls within a token budget instead of
+letting it grow with the session.
+
+- The last CONTEXT_RECENT_TURNS messages are sent verbatim
+- Older messages are folded into a rolling summary, cached per session; each
+  call only summarizes the messages that dropped out of the recent window
+  since the previous call (the summarizer gets the old summary + new turns)
+- If the result is still over CONTEXT_TOKEN_BUDGET, the oldest recent
+  messages are dropped (the current message is always kept)
+
+Also records the prompt token count of every Gemini call (estimated before
+the call, billed count from the response) for GET /llm/context-stats.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Configuration
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+CONTEXT_RECENT_TURNS = int(os.getenv("CONTEXT_RECENT_TURNS", "6"))
+CONTEXT_SUMMARY_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "256"))
+CONTEXT_MAX_SESSIONS = int(os.getenv("CONTEXT_MAX_SESSIONS", "1000"))
+
+# Characters per token for estimates (Gemini averages ~4 for English,
+# fewer for Devanagari, so estimates err on the high side for Indic text)
+CHARS_PER_TOKEN = 4
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+# (previous summary, [(role, text), ...]) -> new summary or None
+Summarizer = Callable[[str, List[Tuple[str, str]]], Optional[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a text."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN if text else 0
+
+
+def _text(message: dict) -> str:
+    return " ".join(p if isinstance(p, str) else p.get("text", "") for p in message.get("parts", []))
+
+
+def message_tokens(messages: List[dict]) -> int:
+    """Approximate token count of Gemini-format messages (role + parts)."""
+    return sum(estimate_tokens(_text(m)) + 2 for m in messages)
+
+
+def _fingerprint(messages: List[dict]) -> str:
+    digest = hashlib.sha256()
+    for m in messages:
+        digest.update(m.get("role", "").encode("utf-8"))
+        digest.update(_text(m).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def extractive_summary(previous: str, turns: List[Tuple[str, str]],
+                       max_tokens: int = CONTEXT_SUMMARY_TOKENS) -> str:
+    """Summary without an LLM: the start of each turn, newest kept when over budget."""
+    lines = [previous] if previous else []
+    lines += [f"{role}: {text[:200]}" for role, text in turns]
+    summary = "\n".join(lines)
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    return summary[-max_chars:] if len(summary) > max_chars else summary
+
+
+class ContextBuilder:
+    """Token-budgeted context with a rolling per-session summary."""
+
+    def __init__(self, budget: int = CONTEXT_TOKEN_BUDGET, recent_turns: int = CONTEXT_RECENT_TURNS,
+                 max_sessions: int = CONTEXT_MAX_SESSIONS):
+        """
+        Initialize the builder.
+
+        Args:
+            budget: Maximum prompt tokens of the history (system prompt excluded)
+            recent_turns: Messages always sent verbatim (including the current one)
+            max_sessions: Sessions whose summary is kept (least recently used dropped)
+        """
+        self.budget = budget
+        self.recent_turns = max(1, recent_turns)
+        self.max_sessions = max_sessions
+        # session_id -> (summary, folded message count, fingerprint of folded messages)
+        self._summaries: "OrderedDict[str, Tuple[str, int, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._prompt_tokens = deque(maxlen=1000)
+        self._stats = {"calls": 0, "budgeted": 0, "summaries": 0, "dropped_messages": 0,
+                       "tokens_before": 0, "tokens_after": 0}
+
+    def build(self, session_id: str, messages: List[dict], summarizer: Optional[Summarizer] = None,
+              prefix_count: int = 0) -> List[dict]:
+        """
+        Budget the history of a multi-turn request.
+
+        Args:
+            session_id: Conversation the messages belong to
+            messages: Gemini-format messages, oldest first; the last one is the current turn
+            summarizer: Produces the rolling summary (extractive summary if None or failing)
+            prefix_count: Leading messages (system prompt) kept untouched and not counted
+
+        Returns:
+            Messages to send
+        """
+        prefix, history = messages[:prefix_count], messages[prefix_count:]
+        before = message_tokens(history)
+        if len(history) <= self.recent_turns and before <= self.budget:
+            return messages
+
+        split = max(0, len(history) - self.recent_turns)
+        # The recent window starts with a user turn, after the summary exchange
+        while split < len(history) - 1 and history[split].get("role") == "model":
+            split += 1
+        older, recent = history[:split], history[split:]
+
+        context = []
+        if older:
+            summary = self._summary(session_id, older, summarizer)
+            context = [
+                {"role": "user", "parts": [SUMMARY_PREFIX + summary]},
+                {"role": "model", "parts": ["Noted."]},
+            ]
+
+        dropped = 0
+        while len(recent) > 1 and message_tokens(context + recent) > self.budget:
+            recent = recent[1:]
+            dropped += 1
+
+        result = context + recent
+        with self._lock:
+            self._stats["budgeted"] += 1
+            self._stats["dropped_messages"] += dropped
+            self._stats["tokens_before"] += before
+            self._stats["tokens_after"] += message_tokens(result)
+        return prefix + result
+
+    def _summary(self, session_id: str, older: List[dict], summarizer: Optional[Summarizer]) -> str:
+        """Rolling summary of `older`, folding in only messages not summarized yet."""
+        with self._lock:
+            summary, folded, fingerprint = self._summaries.get(session_id, ("", 0, ""))
+        # A different history (edited or another conversation) starts over
+        if folded > len(older) or _fingerprint(older[:folded]) != fingerprint:
+            summary, folded = "", 0
+        if folded == len(older):
+            return summary
+
+        new_turns = [(m.get("role", "user"), _text(m)) for m in older[folded:]]
+        updated = None
+        if summarizer is not None:
+            try:
+                updated = summarizer(summary, new_turns)
+            except Exception as e:
+                print(f"[Context] Summarizer error: {e}")
+        if not updated:
+            updated = extractive_summary(summary, new_turns)
+
+        with self._lock:
+            self._summaries[session_id] = (updated, len(older), _fingerprint(older))
+            self._summaries.move_to_end(session_id)
+            while len(self._summaries) > self.max_sessions:
+                self._summaries.popitem(last=False)
+            self._stats["summaries"] += 1
+        return updated
+
+    def forget(self, session_id: str):
+        """Drop the summary of a session."""
+        with self._lock:
+            self._summaries.pop(session_id, None)
+
+    def record_prompt_tokens(self, estimated: int, billed: Optional[int] = None):
+        """Record the prompt size of one Gemini call."""
+        with self._lock:
+            self._stats["calls"] += 1
+            self._prompt_tokens.append(billed if billed else estimated)
+
+    def stats(self) -> Dict[str, Any]:
+        """Prompt token percentiles and budgeting counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            samples = list(self._prompt_tokens)
+            stats["sessions"] = len(self._summaries)
+        if samples:
+            stats["prompt_tokens"] = {
+                "p50": float(np.percentile(samples, 50)),
+                "p95": float(np.percentile(samples, 95)),
+                "max": int(max(samples)),
+            }
+        stats["budget"] = self.budget
+        stats["recent_turns"] = self.recent_turns
+        return stats
+
+
+# Global instance
+_builder: Optional[ContextBuilder] = None
+
+
+def get_context_builder() -> ContextBuilder:
+    """Get or create the context builder instance."""
+    global _builder
+    if _builder is None:
+        _builder = ContextBuilder()
+    return _builder
+
+
+# Export
+__all__ = [
+    'ContextBuilder',
+    'get_context_builder',
+    'estimate_tokens',
+    'message_tokens',
+    'extractive_summary',
+    'CONTEXT_TOKEN_BUDGET',
+    'CONTEXT_RECENT_TURNS'
+]
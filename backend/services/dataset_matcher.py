@@ -3,14 +3,20 @@ Dataset Matcher Service for SwasthyaSarthi.
 Matches extracted medicine names with products from the dataset.
 
 Uses fuzzy string matching with cosine similarity for best matching.
+Native-script (Devanagari, Bengali, Gujarati, Malayalam) queries are resolved
+through a precomputed phonetic index over the romanized catalog names.
 """
 
 import os
+import re
 import pandas as pd
 import numpy as np
 from typing import List, Dict, Tuple, Optional
 from difflib import SequenceMatcher
+from collections import defaultdict
 import logging
+import threading
+from backend.services.transliteration import contains_indic_script, transliterate, phonetic_key, phonetic_tokens
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -24,6 +30,13 @@ PRODUCTS_FILE = os.path.join(DATA_DIR, "products-export.xlsx")
 DEFAULT_THRESHOLD = 0.6
 HIGH_CONFIDENCE_THRESHOLD = 0.75
 
+# Phonetic index: credit for a key that is a prefix of a catalog key ("dkl" / "dklfnk")
+# and minimum similarity for the fuzzy fallback between keys
+PHONETIC_PREFIX_SCORE = 0.8
+PHONETIC_FUZZY_MIN = 0.75
+# Shorter query keys only match exactly - partial matches on them are noise
+PHONETIC_PARTIAL_MIN_LENGTH = 4
+
 
 class DatasetMatcher:
     """
@@ -42,6 +55,8 @@ class DatasetMatcher:
         self.products_df = None
         self.product_names = []
         self.product_lookup = {}
+        self.phonetic_index: Dict[str, set] = {}
+        self._phonetic_idf: Dict[str, float] = {}
         self._load_products()
     
     def _load_products(self):
@@ -66,6 +81,8 @@ class DatasetMatcher:
                             "original_name": name
                         }
                     
+                    self._build_phonetic_index()
+                    
                     logger.info(f"[Dataset Matcher] Loaded {len(self.product_names)} products from {self.products_file}")
                 else:
                     logger.warning(f"[Dataset Matcher] Could not find product name column in {self.products_file}")
@@ -83,7 +100,7 @@ class DatasetMatcher:
         
         # Common column names for product names
         name_columns = [
-            'product_name', 'Product Name', 'name', 'Name',
+            'product_name', 'product name', 'Product Name', 'name', 'Name',
             'product', 'Product', 'item_name', 'Item Name',
             'medicine_name', 'Medicine Name', 'title', 'Title'
         ]
@@ -100,6 +117,157 @@ class DatasetMatcher:
         
         return None
     
+    def _build_phonetic_index(self):
+        """Precompute phonetic key -> product indices for native-script lookups."""
+        index = defaultdict(set)
+        for idx, name in enumerate(self.product_names):
+            for key in phonetic_tokens(name):
+                index[key].add(idx)
+        
+        self.phonetic_index = dict(index)
+        n_products = max(len(self.product_names), 1)
+        self._phonetic_idf = {
+            key: float(np.log((1 + n_products) / (1 + len(rows))) + 1.0)
+            for key, rows in self.phonetic_index.items()
+        }
+        logger.info(f"[Dataset Matcher] Built phonetic index with {len(self.phonetic_index)} keys")
+    
+    def _phonetic_candidates(self, key: str, fuzzy: bool = True) -> List[Tuple[str, float]]:
+        """Catalog keys matching a query key, with a match strength (0-1)."""
+        if key in self.phonetic_index:
+            return [(key, 1.0)]
+        if len(key) < PHONETIC_PARTIAL_MIN_LENGTH:
+            return []
+        
+        candidates = [
+            (other, PHONETIC_PREFIX_SCORE) for other in self.phonetic_index
+            if other.startswith(key) or key.startswith(other)
+        ]
+        if candidates or not fuzzy:
+            return candidates
+        
+        best_key, best_ratio = None, 0.0
+        for other in self.phonetic_index:
+            ratio = SequenceMatcher(None, key, other).ratio()
+            if ratio > best_ratio:
+                best_key, best_ratio = other, ratio
+        return [(best_key, best_ratio)] if best_ratio >= PHONETIC_FUZZY_MIN else []
+    
+    def _phonetic_scores(self, query: str) -> List[Tuple[int, float]]:
+        """
+        Score products against a (native-script or Latin) query via the phonetic index.
+        
+        Returns:
+            (product index, score) pairs, best first. The score is the
+            IDF-weighted share of query words found in the product name.
+        """
+        query_keys = phonetic_tokens(query)
+        if not query_keys or not self.phonetic_index:
+            return []
+        
+        max_idf = max(self._phonetic_idf.values())
+        scores = defaultdict(float)
+        total = 0.0
+        for key in query_keys:
+            candidates = self._phonetic_candidates(key)
+            # Generic words ("tablet" -> Tabletten, Filmtabletten) carry little weight
+            weight = min((self._phonetic_idf[k] for k, _ in candidates), default=max_idf)
+            total += weight
+            best_per_product = {}
+            for catalog_key, strength in candidates:
+                for idx in self.phonetic_index[catalog_key]:
+                    best_per_product[idx] = max(best_per_product.get(idx, 0.0), strength)
+            for idx, strength in best_per_product.items():
+                scores[idx] += strength * weight
+        
+        ranked = sorted(((idx, score / total) for idx, score in scores.items()), key=lambda x: x[1], reverse=True)
+        return ranked
+    
+    def find_transliterated_match(self, medicine_name: str, threshold: float = DEFAULT_THRESHOLD) -> Optional[Dict]:
+        """
+        Find the best match for a medicine name written in an Indic script.
+        
+        Args:
+            medicine_name: Medicine name, e.g. "पैरासिटामोल"
+            threshold: Minimum similarity threshold (0-1)
+            
+        Returns:
+            Dictionary with match information or None if no match found
+        """
+        ranked = self._phonetic_scores(medicine_name)
+        if not ranked or ranked[0][1] < threshold:
+            return None
+        
+        idx, score = ranked[0]
+        best_match = self.product_names[idx]
+        return {
+            "input_name": medicine_name,
+            "transliterated_name": transliterate(medicine_name),
+            "matched_name": best_match,
+            "confidence": score,
+            "is_high_confidence": score >= HIGH_CONFIDENCE_THRESHOLD,
+            "product_info": self._get_product_info(best_match)
+        }
+    
+    def find_product_in_text(self, text: str, threshold: float = HIGH_CONFIDENCE_THRESHOLD) -> Optional[Dict]:
+        """
+        Find a catalog product mentioned somewhere in a free-text message.
+        
+        Runs of consecutive words found in the phonetic index form candidate
+        spans ("i want nurofen lemon" -> "nurofen lemon"); words that are not
+        in the index end a span. Each span is scored like a product-name query
+        and the best span wins.
+        
+        Args:
+            text: Message, ideally with filler words already removed
+            threshold: Minimum span score (0-1)
+            
+        Returns:
+            Match dictionary (as find_match, plus "is_unique" - False when
+            several products share the top score or other spans name other
+            products, e.g. "2 nurofen and 3 paracetamol") or None
+        """
+        if not text or not self.phonetic_index:
+            return None
+        
+        spans, current = [], []
+        for word in re.split(r"[\s,;/()\-]+", text):
+            key = phonetic_key(word)
+            if len(key) >= 3 and self._phonetic_candidates(key, fuzzy=False):
+                current.append(word)
+            elif current:
+                spans.append(" ".join(current))
+                current = []
+        if current:
+            spans.append(" ".join(current))
+        
+        best, products = None, set()
+        for span in spans:
+            ranked = self._phonetic_scores(span)
+            if not ranked or ranked[0][1] < threshold:
+                continue
+            idx, score = ranked[0]
+            products.add(idx)
+            if best is None or score > best[2]:
+                is_unique = len(ranked) == 1 or ranked[1][1] < score
+                best = (span, idx, score, is_unique)
+        
+        if best is None:
+            return None
+        
+        span, idx, score, is_unique = best
+        # A message naming several products is not a single-product order
+        is_unique = is_unique and len(products) == 1
+        best_match = self.product_names[idx]
+        return {
+            "input_name": span,
+            "matched_name": best_match,
+            "confidence": score,
+            "is_high_confidence": score >= HIGH_CONFIDENCE_THRESHOLD,
+            "is_unique": is_unique,
+            "product_info": self._get_product_info(best_match)
+        }
+    
     def _calculate_similarity(self, str1: str, str2: str) -> float:
         """
         Calculate similarity between two strings using multiple methods.
@@ -154,6 +322,9 @@ class DatasetMatcher:
         if not medicine_name or not self.product_names:
             return None
         
+        if contains_indic_script(medicine_name):
+            return self.find_transliterated_match(medicine_name, threshold)
+        
         best_match = None
         best_score = 0.0
         
@@ -264,10 +435,15 @@ class DatasetMatcher:
         
         # Find matches with their scores
         matches = []
-        for product_name in self.product_names:
-            score = self._calculate_similarity(query_lower, product_name)
-            if score > 0.3:  # Lower threshold for search
-                matches.append((product_name, score))
+        if contains_indic_script(query):
+            for idx, score in self._phonetic_scores(query):
+                if score > 0.3:
+                    matches.append((self.product_names[idx], score))
+        else:
+            for product_name in self.product_names:
+                score = self._calculate_similarity(query_lower, product_name)
+                if score > 0.3:  # Lower threshold for search
+                    matches.append((product_name, score))
         
         # Sort by score descending
         matches.sort(key=lambda x: x[1], reverse=True)
@@ -285,13 +461,16 @@ class DatasetMatcher:
 
 # Global instance
 _matcher: Optional[DatasetMatcher] = None
+_matcher_lock = threading.Lock()
 
 
 def get_dataset_matcher() -> DatasetMatcher:
-    """Get or create dataset matcher instance."""
+    """Get or create dataset matcher instance (loaded once, also when warm-up and a request race)."""
     global _matcher
     if _matcher is None:
-        _matcher = DatasetMatcher()
+        with _matcher_lock:
+            if _matcher is None:
+                _matcher = DatasetMatcher()
     return _matcher
 
 
@@ -7,20 +7,41 @@ Models:
 - Gemini 1.5 Pro: Complex reasoning, medical advice, prescription analysis, multimodal
 
 Key Features:
-- Automatic model selection based on task complexity
+- Automatic model selection based on task complexity and observed model health
 - Multilingual support (English, Hindi, Marathi)
-- Vision multimodal for prescription images
+- Vision multimodal for prescription images (downscaled before upload, see image_preprocess)
 - Full observability with LangSmith tracing
+- Opt-in response cache for repeated deterministic prompts
+- Opt-in semantic cache for near-duplicate informational queries
+- Deadlines, retries, hedging and a circuit breaker on every request
+  (see llm_resilience); while the circuit is open is_gemini_available()
+  is False and agents use their rule-based paths
+- Process-wide rate limiter with a priority queue (see llm_limiter);
+  order calls are admitted before informational chat
+- Concurrent identical requests share one in-flight call (see llm_singleflight)
+- Native JSON mode (response_mime_type / response_schema) for structured output
+- Token-budgeted history with a rolling per-session summary (see context_budget)
+- Pluggable backend: LLM_BACKEND=mock swaps in an offline stand-in with
+  configurable latency and error rates (see mock_llm)
+- Adaptive flash/pro routing from observed latency and failures per task
+  (see model_router); a call may be downgraded to flash or skipped (None)
 """
-import google.generativeai as genai
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
-from langchain_core.runnables import RunnableConfig
 from dotenv import load_dotenv
 import os
 import json
-import base64
+import asyncio
+import time
 import warnings
 from typing import Optional, List, Dict, Any, Union
+from backend.services.llm_cache import get_llm_cache, get_cache_stats, make_cache_key
+from backend.services.semantic_cache import get_semantic_cache
+from backend.services.llm_resilience import get_resilient_caller, get_resilience_stats, LLM_DEADLINE, CircuitOpenError
+from backend.services.llm_limiter import get_llm_limiter, get_limiter_stats
+from backend.services.llm_singleflight import get_singleflight
+from backend.services.context_budget import get_context_builder, estimate_tokens, CONTEXT_SUMMARY_TOKENS
+from backend.services.model_router import get_routing_policy, get_routing_stats
+from backend.services.observability import configure_langsmith, trace_config
 
 warnings.filterwarnings("ignore")
 load_dotenv()
@@ -29,19 +50,11 @@ load_dotenv()
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
 GEMINI_FLASH_MODEL = os.getenv("GEMINI_FLASH_MODEL", "gemini-1.5-flash")
 GEMINI_PRO_MODEL = os.getenv("GEMINI_PRO_MODEL", "gemini-1.5-pro")
+# "gemini", or "mock" for the offline stand-in (see mock_llm; no API key needed)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
 
-LANGSMITH_API_KEY = os.getenv("LANGSMITH_API_KEY")
-LANGSMITH_PROJECT = os.getenv("LANGSMITH_PROJECT", "swasthya-sarthi")
-
-# LangSmith configuration
-if LANGSMITH_API_KEY:
-    os.environ["LANGCHAIN_TRACING_V2"] = "true"
-    os.environ["LANGCHAIN_API_KEY"] = LANGSMITH_API_KEY
-    os.environ["LANGCHAIN_PROJECT"] = LANGSMITH_PROJECT
-    print(f"[Gemini] LangSmith enabled - Project: {LANGSMITH_PROJECT}")
-else:
-    os.environ["LANGCHAIN_TRACING_V2"] = "false"
-    print("[Gemini] LangSmith not configured")
+# LangSmith configuration (shared with llm_provider, done once)
+configure_langsmith()
 
 # Initialize Gemini client
 _genai_configured = False
@@ -50,17 +63,29 @@ _pro_model = None
 
 
 def _configure_genai():
-    """Configure Google Generative AI with API key."""
+    """Configure Google Generative AI with API key (or the mock backend)."""
     global _genai_configured, _flash_model, _pro_model
     
     if _genai_configured:
         return
     
+    if LLM_BACKEND == "mock":
+        from backend.services.mock_llm import MockGenerativeModel, MOCK_LLM_LATENCY, MOCK_LLM_ERROR_RATE
+        _flash_model = MockGenerativeModel(GEMINI_FLASH_MODEL)
+        _pro_model = MockGenerativeModel(GEMINI_PRO_MODEL)
+        _genai_configured = True
+        print(f"[Gemini] Mock backend - latency {MOCK_LLM_LATENCY}, error rate {MOCK_LLM_ERROR_RATE:.0%}")
+        return
+    
     if not GOOGLE_API_KEY:
         print("[Gemini] WARNING: GOOGLE_API_KEY not set in environment")
         return
     
     try:
+        # Imported on first use: the client library (grpc, protobuf) is the
+        # slowest import of the service and not needed by the mock backend
+        import google.generativeai as genai
+        
         genai.configure(api_key=GOOGLE_API_KEY)
         _flash_model = genai.GenerativeModel(GEMINI_FLASH_MODEL)
         _pro_model = genai.GenerativeModel(GEMINI_PRO_MODEL)
@@ -73,20 +98,14 @@ def _configure_genai():
 
 def _get_langsmith_config(model_type: str = "flash"):
     """Get LangSmith configuration for tracing."""
-    if LANGSMITH_API_KEY:
-        return RunnableConfig(
-            configurable={
-                "tags": ["swasthya-sarthi", "pharmacy-agent", f"gemini_{model_type}"],
-                "metadata": {
-                    "project": "swasthya-sarthi",
-                    "environment": "production",
-                    "llm_provider": "gemini",
-                    "model_type": model_type,
-                    "model": GEMINI_FLASH_MODEL if model_type == "flash" else GEMINI_PRO_MODEL
-                }
-            }
-        )
-    return RunnableConfig()
+    return trace_config(
+        ["swasthya-sarthi", "pharmacy-agent", f"gemini_{model_type}"],
+        {
+            "llm_provider": "gemini",
+            "model_type": model_type,
+            "model": GEMINI_FLASH_MODEL if model_type == "flash" else GEMINI_PRO_MODEL
+        }
+    )
 
 
 # Language mapping for prompts
@@ -115,7 +134,8 @@ def _add_language_instruction(system_prompt: str, language: Optional[str] = None
 
 def _select_model(task_type: str) -> str:
     """
-    Select appropriate model based on task type.
+    Select the preferred model for a task type (the routing policy may
+    still downgrade it while that model is slow or failing).
     
     Args:
         task_type: Type of task - "simple", "complex", "medical", "prescription", "voice"
@@ -131,13 +151,231 @@ def _select_model(task_type: str) -> str:
     return "flash"
 
 
+def _build_gemini_messages(
+    messages: List[Union[dict, HumanMessage, SystemMessage, AIMessage]],
+    system_prompt: Optional[str] = None,
+    language: Optional[str] = None
+) -> List[dict]:
+    """Convert messages (dicts or LangChain objects) to Gemini contents."""
+    gemini_messages = []
+    
+    # Add system prompt if provided
+    if system_prompt:
+        system_prompt = _add_language_instruction(system_prompt, language)
+        gemini_messages.append({"role": "user", "parts": [system_prompt]})
+        # First message from model acknowledges the system
+        gemini_messages.append({"role": "model", "parts": ["Understood. I will follow these instructions."]})
+    
+    # Add conversation history
+    for msg in messages:
+        if isinstance(msg, dict):
+            role = msg.get("role", "user")
+            content = msg.get("content", "")
+        elif isinstance(msg, HumanMessage):
+            role = "user"
+            content = msg.content
+        elif isinstance(msg, AIMessage):
+            role = "model"
+            content = msg.content
+        elif isinstance(msg, SystemMessage):
+            # Skip system messages as we handle them separately
+            continue
+        else:
+            role = "user"
+            content = str(msg)
+        
+        gemini_messages.append({"role": role, "parts": [content]})
+    
+    return gemini_messages
+
+
+def _response_cache_key(model_type: str, gemini_messages: List[dict], temperature: float, max_tokens: int,
+                        response_format: Optional[dict] = None) -> str:
+    """LLM cache key for a generation request."""
+    model_name = GEMINI_PRO_MODEL if model_type == "pro" else GEMINI_FLASH_MODEL
+    return make_cache_key(model_name, gemini_messages, temperature, max_tokens, response_format)
+
+
+def _response_format(response_mime_type: Optional[str], response_schema: Optional[dict]) -> Optional[dict]:
+    """Structured-output settings of a request (None for plain text)."""
+    if not response_mime_type and not response_schema:
+        return None
+    response_format = {"response_mime_type": response_mime_type or "application/json"}
+    if response_schema:
+        response_format["response_schema"] = response_schema
+    return response_format
+
+
+# Output tokens assumed when a request sets no max_output_tokens
+DEFAULT_OUTPUT_TOKENS = 1024
+# Gemini bills an inline image as a fixed number of tokens
+IMAGE_TOKENS = 258
+
+
+def _prompt_tokens(contents: List[dict]) -> int:
+    """Rough prompt token count of a request."""
+    tokens = 0
+    for msg in contents:
+        for part in msg.get("parts", []):
+            if isinstance(part, str):
+                tokens += estimate_tokens(part)
+            elif "inline_data" in part:
+                tokens += IMAGE_TOKENS
+            else:
+                tokens += estimate_tokens(part.get("text", ""))
+    return tokens
+
+
+def _estimate_tokens(contents: List[dict], generation_config: Optional[dict] = None) -> int:
+    """Rough prompt + output token count of a request."""
+    output = (generation_config or {}).get("max_output_tokens", DEFAULT_OUTPUT_TOKENS)
+    return _prompt_tokens(contents) + output
+
+
+def _used_tokens(response) -> Optional[int]:
+    """Billed tokens of a response, if reported."""
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None) or None
+
+
+def _record_prompt_tokens(contents: List[dict], response):
+    """Report the prompt size of a call (billed count when the response has one)."""
+    estimated = _prompt_tokens(contents)
+    billed = getattr(getattr(response, "usage_metadata", None), "prompt_token_count", None)
+    get_context_builder().record_prompt_tokens(estimated, billed)
+    print(f"[Gemini] Prompt tokens: {billed or estimated}{'' if billed else ' (est.)'}")
+
+
+SUMMARY_PROMPT = """Update the running summary of a pharmacy assistant conversation.
+Keep medicines, quantities, patient details, orders and open questions; drop small talk.
+Reply with the updated summary only, in at most a few sentences.
+
+Current summary:
+{summary}
+
+New messages:
+{turns}"""
+
+
+def _summarize_turns(summary: str, turns: List[tuple]) -> Optional[str]:
+    """Fold turns that left the recent window into the session summary."""
+    transcript = "\n".join(
+        f"{'Assistant' if role == 'model' else 'User'}: {text}" for role, text in turns
+    )
+    return generate_response(
+        [{"role": "user", "content": SUMMARY_PROMPT.format(summary=summary or "(none)", turns=transcript)}],
+        model_type="flash",
+        temperature=0.2,
+        max_tokens=CONTEXT_SUMMARY_TOKENS,
+        priority="background",
+        task="summary"
+    )
+
+
+def _response_text(response) -> Optional[str]:
+    """Text of a response, or None if it is empty."""
+    if response and response.text:
+        return response.text
+    return None
+
+
+def _usable_text(text: Optional[str], model_type: str, task: str, response_format: Optional[dict]) -> Optional[str]:
+    """Pass a response through, reporting empty or malformed output to the routing policy."""
+    usable = bool(text)
+    if usable and response_format and response_format.get("response_mime_type") == "application/json":
+        try:
+            json.loads(text)
+        except json.JSONDecodeError:
+            usable = False
+    if not usable:
+        get_routing_policy().record_invalid(model_type, task)
+    return text
+
+
+def _route(model_type: str, task: str) -> Optional[str]:
+    """Model the routing policy assigns to a call (None = use the rule-based path)."""
+    routed = get_routing_policy().choose(model_type, task)
+    if routed is None:
+        print(f"[Gemini] {model_type} skipped for {task} by routing policy")
+    elif routed != model_type:
+        print(f"[Gemini] {task}: {model_type} downgraded to {routed}")
+    return routed
+
+
+def _model(model_type: str):
+    """Configured model object for "flash" or "pro"."""
+    return _pro_model if model_type == "pro" else _flash_model
+
+
+def _record_call(model_type: str, task: str, started: float, error: Optional[BaseException] = None):
+    """Report a call's latency and outcome to the routing policy."""
+    # A refused call (open circuit) says nothing about the model's latency
+    if not isinstance(error, CircuitOpenError):
+        get_routing_policy().record(model_type, task, time.monotonic() - started, ok=error is None)
+
+
+def _generate(model_type: str, contents, priority: str = "default", task: Optional[str] = None, **kwargs):
+    """
+    model.generate_content behind the rate limiter and under the resilience
+    policy (deadline, retries, hedging, breaker). Latency after admission is
+    reported to the routing policy under `task` (defaults to the priority).
+    """
+    model = _model(model_type)
+    tokens = _estimate_tokens(contents, kwargs.get("generation_config"))
+    limiter = get_llm_limiter()
+    with limiter.slot(priority, tokens) as ticket:
+        # Every request sent (retries and hedges too) is charged to the limiter
+        def attempt(timeout: float):
+            with limiter.attempt(ticket):
+                return model.generate_content(contents, request_options={"timeout": timeout}, **kwargs)
+
+        started = time.monotonic()
+        try:
+            response = get_resilient_caller().call(attempt)
+        except Exception as e:
+            _record_call(model_type, task or priority, started, e)
+            raise
+        _record_call(model_type, task or priority, started)
+        ticket.used_tokens = _used_tokens(response)
+    _record_prompt_tokens(contents, response)
+    return response
+
+
+async def _agenerate(model_type: str, contents, priority: str = "default", task: Optional[str] = None, **kwargs):
+    """Async variant of _generate."""
+    model = _model(model_type)
+    tokens = _estimate_tokens(contents, kwargs.get("generation_config"))
+    limiter = get_llm_limiter()
+    async with limiter.aslot(priority, tokens) as ticket:
+        async def attempt(timeout: float):
+            with limiter.attempt(ticket):
+                return await model.generate_content_async(contents, request_options={"timeout": timeout}, **kwargs)
+
+        started = time.monotonic()
+        try:
+            response = await get_resilient_caller().acall(attempt)
+        except Exception as e:
+            _record_call(model_type, task or priority, started, e)
+            raise
+        _record_call(model_type, task or priority, started)
+        ticket.used_tokens = _used_tokens(response)
+    _record_prompt_tokens(contents, response)
+    return response
+
+
 def generate_response(
     messages: List[Union[dict, HumanMessage, SystemMessage, AIMessage]],
     model_type: str = "flash",
     temperature: float = 0.4,
     max_tokens: int = 512,
     system_prompt: Optional[str] = None,
-    language: Optional[str] = None
+    language: Optional[str] = None,
+    cache: bool = False,
+    priority: str = "default",
+    response_mime_type: Optional[str] = None,
+    response_schema: Optional[dict] = None,
+    session_id: Optional[str] = None,
+    task: Optional[str] = None
 ) -> Optional[str]:
     """
     Generate response using Gemini model.
@@ -149,6 +387,14 @@ def generate_response(
         max_tokens: Maximum tokens to generate
         system_prompt: Optional system prompt
         language: Language code for response (en, hi, mr)
+        cache: Serve/store the response in the LLM cache (for deterministic prompts)
+        priority: Rate-limiter priority ("order", "default", "info", "background")
+        response_mime_type: "application/json" for native JSON output
+        response_schema: Schema the JSON output must follow (implies JSON output)
+        session_id: Conversation of a multi-turn request; its history is kept
+            within CONTEXT_TOKEN_BUDGET (older turns folded into a summary)
+        task: Kind of call the routing policy tracks model health for
+            (defaults to the priority)
     
     Returns:
         Generated text response or None on error
@@ -160,69 +406,170 @@ def generate_response(
         return None
     
     try:
-        # Select model
-        if model_type == "pro":
-            model = _pro_model
-        else:
-            model = _flash_model
-        
-        # Build message list for Gemini
-        gemini_messages = []
+        # Select model (may be downgraded while the requested one is slow or failing)
+        task = task or priority
+        model_type = _route(model_type, task)
+        if model_type is None:
+            return None
         
-        # Add system prompt if provided
-        if system_prompt:
-            system_prompt = _add_language_instruction(system_prompt, language)
-            gemini_messages.append({"role": "user", "parts": [system_prompt]})
-            # First message from model acknowledges the system
-            gemini_messages.append({"role": "model", "parts": ["Understood. I will follow these instructions."]})
+        gemini_messages = _build_gemini_messages(messages, system_prompt, language)
+        if session_id:
+            gemini_messages = get_context_builder().build(
+                session_id, gemini_messages, _summarize_turns, prefix_count=2 if system_prompt else 0
+            )
         
-        # Add conversation history
-        for msg in messages:
-            if isinstance(msg, dict):
-                role = msg.get("role", "user")
-                content = msg.get("content", "")
-            elif isinstance(msg, HumanMessage):
-                role = "user"
-                content = msg.content
-            elif isinstance(msg, AIMessage):
-                role = "model"
-                content = msg.content
-            elif isinstance(msg, SystemMessage):
-                # Skip system messages as we handle them separately
-                continue
-            else:
-                role = "user"
-                content = str(msg)
-            
-            gemini_messages.append({"role": role, "parts": [content]})
+        response_format = _response_format(response_mime_type, response_schema)
+        cache_key = _response_cache_key(model_type, gemini_messages, temperature, max_tokens, response_format)
+        if cache:
+            cached = get_llm_cache().get(cache_key)
+            if cached is not None:
+                return cached
         
         # Generate response
         generation_config = {
             "temperature": temperature,
             "max_output_tokens": max_tokens,
+            **(response_format or {})
         }
         
-        response = model.generate_content(
+        # Identical requests already in flight share that call's result
+        text = get_singleflight().do(cache_key, lambda: _usable_text(_response_text(_generate(
+            model_type,
             gemini_messages,
+            priority=priority,
+            task=task,
             generation_config=generation_config
-        )
+        )), model_type, task, response_format))
         
-        if response and response.text:
-            return response.text
-        return None
+        if text and cache:
+            get_llm_cache().set(cache_key, text)
+        return text
         
     except Exception as e:
         print(f"[Gemini] Generate response error: {e}")
         return None
 
 
+async def agenerate_response(
+    messages: List[Union[dict, HumanMessage, SystemMessage, AIMessage]],
+    model_type: str = "flash",
+    temperature: float = 0.4,
+    max_tokens: int = 512,
+    system_prompt: Optional[str] = None,
+    language: Optional[str] = None,
+    cache: bool = False,
+    priority: str = "default",
+    response_mime_type: Optional[str] = None,
+    response_schema: Optional[dict] = None,
+    session_id: Optional[str] = None,
+    task: Optional[str] = None
+) -> Optional[str]:
+    """
+    Async variant of generate_response.
+    
+    Uses generate_content_async, so the event loop keeps serving other
+    requests while the call is in flight instead of pinning a worker thread.
+    """
+    _configure_genai()
+    
+    if not _genai_configured:
+        print("[Gemini] Not configured - returning None")
+        return None
+    
+    try:
+        # Select model (may be downgraded while the requested one is slow or failing)
+        task = task or priority
+        model_type = _route(model_type, task)
+        if model_type is None:
+            return None
+        
+        gemini_messages = _build_gemini_messages(messages, system_prompt, language)
+        if session_id:
+            # A summary update is a blocking Gemini call
+            gemini_messages = await asyncio.to_thread(
+                get_context_builder().build,
+                session_id, gemini_messages, _summarize_turns, 2 if system_prompt else 0
+            )
+        
+        response_format = _response_format(response_mime_type, response_schema)
+        cache_key = _response_cache_key(model_type, gemini_messages, temperature, max_tokens, response_format)
+        if cache:
+            cached = get_llm_cache().get(cache_key)
+            if cached is not None:
+                return cached
+        
+        generation_config = {
+            "temperature": temperature,
+            "max_output_tokens": max_tokens,
+            **(response_format or {})
+        }
+        
+        async def _call():
+            return _usable_text(_response_text(await _agenerate(
+                model_type,
+                gemini_messages,
+                priority=priority,
+                task=task,
+                generation_config=generation_config
+            )), model_type, task, response_format)
+        
+        # Identical requests already in flight share that call's result
+        text = await get_singleflight().ado(cache_key, _call)
+        
+        if text and cache:
+            get_llm_cache().set(cache_key, text)
+        return text
+        
+    except Exception as e:
+        print(f"[Gemini] Async generate response error: {e}")
+        return None
+
+
+def _simple_messages(prompt: str, system_prompt: Optional[str], language: Optional[str]) -> List[dict]:
+    """System + user messages for a single-prompt request."""
+    # Build system prompt with language instruction
+    full_system = system_prompt or "You are a helpful pharmacy assistant."
+    full_system = _add_language_instruction(full_system, language)
+    
+    return [
+        {"role": "system", "content": full_system},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _semantic_context(messages: List[dict], query: str, model_type: str,
+                      temperature: float, max_tokens: int, response_format: Optional[dict] = None) -> str:
+    """
+    Semantic cache partition for a single-prompt request.
+    
+    Answers are only shared between queries asked under the same
+    instructions: same model, system prompt, template and settings.
+    """
+    system, user = messages
+    template = user["content"].replace(query, "{query}")
+    model_name = GEMINI_PRO_MODEL if model_type == "pro" else GEMINI_FLASH_MODEL
+    return make_cache_key(
+        model_name,
+        [system, {"role": "user", "content": template}],
+        temperature,
+        max_tokens,
+        response_format
+    )
+
+
 def generate_response_simple(
     prompt: str,
     system_prompt: Optional[str] = None,
     temperature: float = 0.5,
     max_tokens: int = 512,
     model_type: str = "flash",
-    language: Optional[str] = None
+    language: Optional[str] = None,
+    cache: bool = False,
+    semantic_cache: bool = False,
+    semantic_query: Optional[str] = None,
+    priority: str = "default",
+    response_schema: Optional[dict] = None,
+    task: Optional[str] = None
 ) -> Optional[str]:
     """
     Simple interface for generating a response from a single prompt.
@@ -234,6 +581,13 @@ def generate_response_simple(
         max_tokens: Maximum tokens
         model_type: "flash" or "pro"
         language: Language code (en, hi, mr)
+        cache: Use the LLM response cache
+        semantic_cache: Reuse the answer of a near-duplicate earlier query
+        semantic_query: Part of the prompt compared for near-duplicates (the
+            user's question inside a prompt template); defaults to the prompt
+        priority: Rate-limiter priority ("order", "default", "info", "background")
+        response_schema: Return JSON following this schema (native JSON mode)
+        task: Kind of call for model routing (defaults to the priority)
     
     Returns:
         Generated text response
@@ -244,22 +598,104 @@ def generate_response_simple(
         print("[Gemini] Not configured - returning None")
         return None
     
-    # Build system prompt with language instruction
-    full_system = system_prompt or "You are a helpful pharmacy assistant."
-    full_system = _add_language_instruction(full_system, language)
+    messages = _simple_messages(prompt, system_prompt, language)
     
-    messages = [
-        {"role": "system", "content": full_system},
-        {"role": "user", "content": prompt}
-    ]
+    context = None
+    if semantic_cache:
+        query = semantic_query or prompt
+        context = _semantic_context(messages, query, model_type, temperature, max_tokens,
+                                    _response_format(None, response_schema))
+        cached = get_semantic_cache().get(context, query)
+        if cached is not None:
+            return cached
     
-    return generate_response(
+    response = generate_response(
+        messages=messages,
+        model_type=model_type,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        language=language,
+        cache=cache,
+        priority=priority,
+        response_schema=response_schema,
+        task=task
+    )
+    
+    if response and context:
+        get_semantic_cache().set(context, query, response)
+    return response
+
+
+async def agenerate_response_simple(
+    prompt: str,
+    system_prompt: Optional[str] = None,
+    temperature: float = 0.5,
+    max_tokens: int = 512,
+    model_type: str = "flash",
+    language: Optional[str] = None,
+    cache: bool = False,
+    semantic_cache: bool = False,
+    semantic_query: Optional[str] = None,
+    priority: str = "default",
+    response_schema: Optional[dict] = None,
+    task: Optional[str] = None
+) -> Optional[str]:
+    """Async variant of generate_response_simple."""
+    _configure_genai()
+    
+    if not _genai_configured:
+        print("[Gemini] Not configured - returning None")
+        return None
+    
+    messages = _simple_messages(prompt, system_prompt, language)
+    
+    context = None
+    if semantic_cache:
+        query = semantic_query or prompt
+        context = _semantic_context(messages, query, model_type, temperature, max_tokens,
+                                    _response_format(None, response_schema))
+        cached = get_semantic_cache().get(context, query)
+        if cached is not None:
+            return cached
+    
+    response = await agenerate_response(
         messages=messages,
         model_type=model_type,
         temperature=temperature,
         max_tokens=max_tokens,
-        language=language
+        language=language,
+        cache=cache,
+        priority=priority,
+        response_schema=response_schema,
+        task=task
     )
+    
+    if response and context:
+        get_semantic_cache().set(context, query, response)
+    return response
+
+
+def _json_messages(prompt: str, system_prompt: Optional[str], language: Optional[str]) -> List[dict]:
+    """System + user messages for a JSON-mode request."""
+    # JSON mode guarantees the format, so no formatting instructions are needed
+    json_system = system_prompt or "You are a structured data generator."
+    json_system = _add_language_instruction(json_system, language)
+    
+    return [
+        {"role": "system", "content": json_system},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _parse_json_response(response: Optional[str]) -> Union[Dict[str, Any], List[Any]]:
+    """Parse a JSON-mode response (only a truncated output can fail)."""
+    if not response:
+        return {"error": "No response from Gemini"}
+    try:
+        return json.loads(response)
+    except json.JSONDecodeError as e:
+        print(f"[Gemini] JSON parse error: {e}")
+        return {"error": "Failed to parse JSON", "raw": response}
 
 
 def generate_structured_json(
@@ -268,10 +704,14 @@ def generate_structured_json(
     temperature: float = 0.3,
     max_tokens: int = 512,
     model_type: str = "flash",
-    language: Optional[str] = None
-) -> Dict[str, Any]:
+    language: Optional[str] = None,
+    cache: bool = False,
+    priority: str = "default",
+    response_schema: Optional[dict] = None,
+    task: Optional[str] = None
+) -> Union[Dict[str, Any], List[Any]]:
     """
-    Generate structured JSON response.
+    Generate structured JSON response using Gemini's native JSON mode.
     
     Args:
         prompt: User prompt
@@ -280,56 +720,66 @@ def generate_structured_json(
         max_tokens: Maximum tokens
         model_type: "flash" or "pro"
         language: Language code
+        cache: Use the LLM response cache
+        priority: Rate-limiter priority ("order", "default", "info", "background")
+        response_schema: Schema of the expected JSON (enforced by Gemini)
+        task: Kind of call for model routing (defaults to the priority)
     
     Returns:
-        Parsed JSON dictionary
+        Parsed JSON (dictionary, or list for an array schema); a dictionary
+        with "error" on failure
     """
     _configure_genai()
     
     if not _genai_configured:
         return {"error": "Gemini not configured"}
     
-    # Build system prompt for JSON output
-    json_system = system_prompt or "You are a structured data generator."
-    json_system += " Return ONLY valid JSON with no additional text. Do not add explanations or markdown code blocks."
-    json_system = _add_language_instruction(json_system, language)
-    
-    messages = [
-        {"role": "system", "content": json_system},
-        {"role": "user", "content": prompt}
-    ]
-    
     response = generate_response(
-        messages=messages,
+        messages=_json_messages(prompt, system_prompt, language),
         model_type=model_type,
         temperature=temperature,
         max_tokens=max_tokens,
-        language=language
+        language=language,
+        cache=cache,
+        priority=priority,
+        response_mime_type="application/json",
+        response_schema=response_schema,
+        task=task
     )
+    return _parse_json_response(response)
+
+
+async def agenerate_structured_json(
+    prompt: str,
+    system_prompt: Optional[str] = None,
+    temperature: float = 0.3,
+    max_tokens: int = 512,
+    model_type: str = "flash",
+    language: Optional[str] = None,
+    cache: bool = False,
+    priority: str = "default",
+    response_schema: Optional[dict] = None,
+    task: Optional[str] = None
+) -> Union[Dict[str, Any], List[Any]]:
+    """Async variant of generate_structured_json."""
+    _configure_genai()
     
-    if response:
-        try:
-            # Try to parse JSON
-            # First, try direct parse
-            try:
-                return json.loads(response)
-            except json.JSONDecodeError:
-                pass
-            
-            # Try to find JSON in response
-            start_idx = response.find("{")
-            end_idx = response.rfind("}")
-            
-            if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-                json_str = response[start_idx:end_idx+1]
-                return json.loads(json_str)
-            
-            return {"error": "No valid JSON found", "raw": response}
-        except json.JSONDecodeError as e:
-            print(f"[Gemini] JSON parse error: {e}")
-            return {"error": "Failed to parse JSON", "raw": response}
+    if not _genai_configured:
+        return {"error": "Gemini not configured"}
     
-    return {"error": "No response from Gemini"}
+    response = await agenerate_response(
+        messages=_json_messages(prompt, system_prompt, language),
+        model_type=model_type,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        language=language,
+        cache=cache,
+        priority=priority,
+        response_mime_type="application/json",
+        response_schema=response_schema,
+        task=task
+    )
+    return _parse_json_response(response)
 
 
 def analyze_image(
@@ -358,23 +808,26 @@ def analyze_image(
         print("[Gemini] Not configured - returning None")
         return None
     
-    # Always use Pro for image analysis
-    model = _pro_model
+    # Pro for image analysis, unless the routing policy downgrades it
+    model_type = _route(model_type, "image")
+    if model_type is None:
+        return None
     
     try:
         # Build system prompt
         full_system = system_prompt or "You are a helpful pharmacy assistant that analyzes prescription images."
         full_system = _add_language_instruction(full_system, language)
         
-        # Prepare image
-        image_parts = [
-            {"mime_type": "image/jpeg", "data": base64.b64encode(image_data).decode("utf-8")}
-        ]
+        # Prepare image (downscaled grayscale JPEG, metadata stripped); Pillow
+        # is only imported once an image is actually sent
+        from backend.services.image_preprocess import prepare_vision_image
+        image_parts = [prepare_vision_image(image_data)]
         
         # Build content with image and text
         content_parts = [prompt]
         
-        response = model.generate_content(
+        response = _generate(
+            model_type,
             [
                 {
                     "role": "user",
@@ -383,18 +836,44 @@ def analyze_image(
                         {"inline_data": image_parts[0]}
                     ]
                 }
-            ]
+            ],
+            task="image"
         )
         
-        if response and response.text:
-            return response.text
-        return None
+        return _usable_text(_response_text(response), model_type, "image", None)
         
     except Exception as e:
         print(f"[Gemini] Image analysis error: {e}")
         return None
 
 
+# JSON schema of analyze_prescription_image output
+PRESCRIPTION_IMAGE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "success": {"type": "BOOLEAN"},
+        "detected_medicines": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "name": {"type": "STRING"},
+                    "dosage": {"type": "STRING"},
+                    "confidence": {"type": "NUMBER"}
+                },
+                "required": ["name"]
+            }
+        },
+        "patient_name": {"type": "STRING"},
+        "doctor_name": {"type": "STRING"},
+        "date": {"type": "STRING"},
+        "raw_text": {"type": "STRING"},
+        "error": {"type": "STRING"}
+    },
+    "required": ["success", "detected_medicines"]
+}
+
+
 def analyze_prescription_image(
     image_data: bytes,
     language: str = "en"
@@ -414,39 +893,34 @@ def analyze_prescription_image(
     if not _genai_configured:
         return {"success": False, "error": "Gemini not configured", "detected_medicines": []}
     
+    model_type = _route("pro", "prescription_image")
+    if model_type is None:
+        return {"success": False, "error": "Gemini temporarily unavailable", "detected_medicines": []}
+    
     # System prompt for prescription analysis
     system_prompt = """You are a pharmacy assistant specialized in reading prescriptions.
 Analyze the prescription image and extract:
 1. All medicines mentioned (with dosage if visible)
 2. Any patient name or date
 3. Doctor's name if visible
+4. Any other readable text (raw_text)
 
-Return ONLY valid JSON in this exact format:
-{
-  "success": true,
-  "detected_medicines": [{"name": "medicine name", "dosage": "dosage if visible", "confidence": 0.9}],
-  "patient_name": "if visible",
-  "doctor_name": "if visible",
-  "date": "if visible",
-  "raw_text": "any readable text from prescription"
-}
-
-If no medicines are clearly visible, return success: false with an explanation."""
+Give a confidence between 0 and 1 for each medicine.
+If no medicines are clearly visible, set success to false and explain why in error."""
 
     # Language instruction
     lang_name = LANGUAGE_MAP.get(language, "English")
     system_prompt += f"\n\nRespond in {lang_name} language."
     
     try:
-        # Prepare image
-        image_parts = {
-            "mime_type": "image/jpeg", 
-            "data": base64.b64encode(image_data).decode("utf-8")
-        }
+        # Prepare image (downscaled grayscale JPEG, metadata stripped)
+        from backend.services.image_preprocess import prepare_vision_image
+        image_parts = prepare_vision_image(image_data)
         
         prompt = "Analyze this prescription and extract all medicines, patient details, and doctor information."
         
-        response = _pro_model.generate_content(
+        response = _generate(
+            model_type,
             [
                 {
                     "role": "user",
@@ -456,30 +930,23 @@ If no medicines are clearly visible, return success: false with an explanation."
                         {"text": prompt}
                     ]
                 }
-            ]
+            ],
+            task="prescription_image",
+            generation_config=_response_format("application/json", PRESCRIPTION_IMAGE_SCHEMA)
         )
         
-        if response and response.text:
-            # Try to parse JSON response
+        text = _usable_text(_response_text(response), model_type, "prescription_image",
+                            _response_format("application/json", None))
+        if text:
             try:
-                # First try direct parse
-                result = json.loads(response.text)
-                return result
+                return json.loads(text)
             except json.JSONDecodeError:
-                # Try to find JSON in response
-                start_idx = response.text.find("{")
-                end_idx = response.text.rfind("}")
-                
-                if start_idx != -1 and end_idx != -1:
-                    json_str = response.text[start_idx:end_idx+1]
-                    try:
-                        return json.loads(json_str)
-                    except:
-                        pass
+                pass
             
+            # Only a truncated output is not valid JSON
             return {
                 "success": True,
-                "raw_response": response.text,
+                "raw_response": text,
                 "detected_medicines": []
             }
         
@@ -491,9 +958,9 @@ If no medicines are clearly visible, return success: false with an explanation."
 
 
 def is_gemini_available() -> bool:
-    """Check if Gemini API is available and configured."""
+    """Check if Gemini API is available and configured (and the circuit is not open)."""
     _configure_genai()
-    return _genai_configured
+    return _genai_configured and not get_resilient_caller().breaker.is_open()
 
 
 def get_gemini_info() -> Dict[str, Any]:
@@ -502,10 +969,18 @@ def get_gemini_info() -> Dict[str, Any]:
     
     return {
         "provider": "gemini",
+        "backend": LLM_BACKEND,
         "configured": _genai_configured,
         "flash_model": GEMINI_FLASH_MODEL,
         "pro_model": GEMINI_PRO_MODEL,
-        "api_key_set": bool(GOOGLE_API_KEY)
+        "api_key_set": bool(GOOGLE_API_KEY),
+        "cache": get_cache_stats(),
+        "semantic_cache": get_semantic_cache().stats(),
+        "singleflight": get_singleflight().stats(),
+        "resilience": get_resilience_stats(),
+        "limiter": get_limiter_stats(),
+        "context": get_context_builder().stats(),
+        "routing": get_routing_stats()
     }
 
 
@@ -562,16 +1037,23 @@ def stream_response(
             "max_output_tokens": max_tokens,
         }
         
-        # Generate streaming response
-        response = model.generate_content(
-            gemini_messages,
-            generation_config=generation_config,
-            stream=True
-        )
+        # Streams are not retried or hedged, but respect the breaker and the deadline
+        if get_resilient_caller().breaker.is_open():
+            yield "Error: Gemini temporarily unavailable"
+            return
         
-        for chunk in response:
-            if chunk.text:
-                yield chunk.text
+        # Generate streaming response; the limiter slot is held until the stream ends
+        with get_llm_limiter().slot("default", _estimate_tokens(gemini_messages, generation_config)):
+            response = model.generate_content(
+                gemini_messages,
+                generation_config=generation_config,
+                stream=True,
+                request_options={"timeout": LLM_DEADLINE}
+            )
+            
+            for chunk in response:
+                if chunk.text:
+                    yield chunk.text
                 
     except Exception as e:
         print(f"[Gemini] Stream error: {e}")
@@ -610,7 +1092,8 @@ def generate_with_routing(
         temperature=temperature,
         max_tokens=max_tokens,
         system_prompt=system_prompt,
-        language=language
+        language=language,
+        task=task_type
     )
 
 
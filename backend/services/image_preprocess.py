@@ -0,0 +1,119 @@
+"""
+Image Preprocessing for Gemini vision calls.
+Uploaded prescription photos are often several MB (12+ MP phone photos),
+while Gemini downsamples images internally and bills them at a fixed token
+count. Sending them as-is only costs upload time and latency, so before a
+vision call the image is:
+
+- rotated upright from its EXIF orientation (phone photos are stored
+  sideways with a rotation tag, which is dropped below)
+- flattened onto white if it has transparency (JPEG has no alpha channel;
+  dropping it turns transparent scans black)
+- downscaled so its longer side is at most VISION_MAX_SIDE (never upscaled)
+- converted to grayscale (VISION_GRAYSCALE; prescriptions are ink on paper)
+- re-encoded as JPEG at VISION_JPEG_QUALITY without EXIF / GPS metadata
+
+scripts/eval_image_preprocessing.py compares sizes, fidelity and (optionally)
+Gemini extraction agreement across settings on sample prescriptions.
+"""
+
+import base64
+import io
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+# Configuration
+VISION_PREPROCESS = os.getenv("VISION_PREPROCESS", "true").lower() == "true"
+VISION_MAX_SIDE = int(os.getenv("VISION_MAX_SIDE", "1536"))
+VISION_JPEG_QUALITY = int(os.getenv("VISION_JPEG_QUALITY", "80"))
+VISION_GRAYSCALE = os.getenv("VISION_GRAYSCALE", "true").lower() == "true"
+
+MIME_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp", "GIF": "image/gif"}
+
+
+def flatten_alpha(image: "Image.Image") -> "Image.Image":
+    """Composite an image with transparency (RGBA, LA, P with a transparent color) onto white."""
+    if "A" in image.getbands() or "transparency" in image.info:
+        return Image.alpha_composite(Image.new("RGBA", image.size, "white"), image.convert("RGBA"))
+    return image
+
+
+def preprocess_image(image_data: bytes, max_side: Optional[int] = None, quality: Optional[int] = None,
+                     grayscale: Optional[bool] = None) -> Tuple[bytes, str, Dict[str, Any]]:
+    """
+    Shrink an image for upload to a vision model.
+
+    Args:
+        image_data: Uploaded image bytes
+        max_side: Longest side in pixels (VISION_MAX_SIDE by default)
+        quality: JPEG quality 1-95 (VISION_JPEG_QUALITY by default)
+        grayscale: Convert to grayscale (VISION_GRAYSCALE by default)
+
+    Returns:
+        (image bytes, MIME type, info with original / final bytes and dimensions);
+        the original bytes when the image cannot be decoded
+    """
+    max_side = max_side or VISION_MAX_SIDE
+    quality = quality or VISION_JPEG_QUALITY
+    grayscale = VISION_GRAYSCALE if grayscale is None else grayscale
+    info: Dict[str, Any] = {"original_bytes": len(image_data)}
+
+    try:
+        image = Image.open(io.BytesIO(image_data))
+        info["original_size"] = image.size
+        image = ImageOps.exif_transpose(image)
+        image = flatten_alpha(image).convert("L" if grayscale else "RGB")
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+        out = io.BytesIO()
+        # No exif= argument: the re-encoded file carries no metadata
+        image.save(out, format="JPEG", quality=quality, optimize=True)
+        processed = out.getvalue()
+    except Exception as e:
+        print(f"[Vision] Preprocessing skipped: {e}")
+        return image_data, detect_mime_type(image_data), info
+
+    info.update({"bytes": len(processed), "size": image.size, "preprocessed": True})
+    return processed, "image/jpeg", info
+
+
+def detect_mime_type(image_data: bytes) -> str:
+    """MIME type of image bytes ("image/jpeg" when unknown)."""
+    try:
+        return MIME_TYPES.get(Image.open(io.BytesIO(image_data)).format, "image/jpeg")
+    except Exception:
+        return "image/jpeg"
+
+
+def prepare_vision_image(image_data: bytes) -> Dict[str, str]:
+    """
+    Gemini inline_data part for an uploaded image (preprocessed unless VISION_PREPROCESS is off).
+
+    Args:
+        image_data: Uploaded image bytes
+
+    Returns:
+        {"mime_type": ..., "data": ...} ready for a content part
+    """
+    if VISION_PREPROCESS:
+        image_data, mime_type, info = preprocess_image(image_data)
+        if info.get("preprocessed"):
+            print(f"[Vision] {info['original_bytes'] / 1024:.0f}KB {info['original_size'][0]}x{info['original_size'][1]}"
+                  f" -> {info['bytes'] / 1024:.0f}KB {info['size'][0]}x{info['size'][1]}")
+    else:
+        mime_type = detect_mime_type(image_data)
+    return {"mime_type": mime_type, "data": base64.b64encode(image_data).decode("utf-8")}
+
+
+# Export
+__all__ = [
+    'preprocess_image',
+    'prepare_vision_image',
+    'detect_mime_type',
+    'flatten_alpha',
+    'VISION_MAX_SIDE',
+    'VISION_JPEG_QUALITY',
+    'VISION_GRAYSCALE'
+]
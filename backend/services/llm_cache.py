@@ -0,0 +1,199 @@
+"""
+LLM Response Cache for SwasthyaSarthi.
+Caches Gemini responses for repeated deterministic prompts (routing, JSON
+extraction from the same OCR text, template-like info answers).
+
+Keys are a SHA-256 of (model, normalized messages, temperature, max_tokens,
+JSON schema if any), so any change to the prompt, system prompt, language
+instruction or generation settings is a different entry. Caching is opt-in per call.
+
+Tiers:
+- Memory: LRU with TTL, answers in microseconds
+- SQLite (optional, LLM_CACHE_DB): survives restarts; hits are promoted to memory
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Configuration
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+# Path of the persistent tier; empty disables it
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", "")
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_messages(messages: List[Dict[str, Any]]) -> List[List[str]]:
+    """Role/text pairs with whitespace collapsed, so formatting noise does not miss the cache."""
+    normalized = []
+    for msg in messages:
+        role = str(msg.get("role", "user")).lower()
+        parts = msg.get("parts")
+        content = " ".join(str(p) for p in parts) if parts is not None else str(msg.get("content", ""))
+        normalized.append([role, _WHITESPACE_RE.sub(" ", content).strip()])
+    return normalized
+
+
+def make_cache_key(model: str, messages: List[Dict[str, Any]], temperature: float, max_tokens: int,
+                   response_format: Optional[Dict[str, Any]] = None) -> str:
+    """Cache key for a generation request (response_format: JSON mode / schema settings)."""
+    key = [model, normalize_messages(messages), round(float(temperature), 4), int(max_tokens)]
+    if response_format:
+        key.append(response_format)
+    payload = json.dumps(key, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier response cache: in-memory LRU+TTL, optionally backed by SQLite.
+    Thread-safe; SQLite errors disable the persistent tier instead of failing calls.
+    """
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES, ttl: float = LLM_CACHE_TTL,
+                 db_path: Optional[str] = LLM_CACHE_DB or None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum entries kept in memory
+            ttl: Seconds an entry stays valid
+            db_path: SQLite file for the persistent tier (None = memory only)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        if db_path:
+            self._open_db()
+
+    def _open_db(self):
+        try:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+            self._db.commit()
+            print(f"[LLM Cache] Persistent tier: {self.db_path}")
+        except sqlite3.Error as e:
+            print(f"[LLM Cache] SQLite tier disabled: {e}")
+            self._db = None
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for a key, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._entries[key]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    print(f"[LLM Cache] SQLite read error: {e}")
+                    row = None
+                if row and row[1] > now:
+                    self._remember(key, row[0], row[1])
+                    self._stats["disk_hits"] += 1
+                    return row[0]
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        """Store a response."""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self._stats["stores"] += 1
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, value, expires_at)
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"[LLM Cache] SQLite write error: {e}")
+
+    def _remember(self, key: str, value: str, expires_at: float):
+        """Insert into the memory tier, evicting the least recently used entry. Caller holds the lock."""
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def clear(self):
+        """Drop all entries from both tiers."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM llm_cache")
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"[LLM Cache] SQLite clear error: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and hit rate."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hits"] = hits
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        stats["persistent"] = self._db is not None
+        return stats
+
+
+# Global instance
+_cache: Optional[ResponseCache] = None
+
+
+def get_llm_cache() -> ResponseCache:
+    """Get or create the response cache instance."""
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache()
+    return _cache
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Convenience function for the cache statistics."""
+    return get_llm_cache().stats()
+
+
+# Export
+__all__ = [
+    'ResponseCache',
+    'get_llm_cache',
+    'get_cache_stats',
+    'make_cache_key',
+    'normalize_messages',
+    'LLM_CACHE_TTL',
+    'LLM_CACHE_MAX_ENTRIES'
+]
@@ -0,0 +1,352 @@
+"""
+LLM Rate Limiter for SwasthyaSarthi.
+Process-wide admission control for Gemini calls, so bursts queue up inside
+the process instead of tripping the provider's rate limits for every agent
+at once.
+
+A call is admitted when all three hold:
+- a request is left in the requests-per-minute bucket (LLM_RPM)
+- its estimated tokens are left in the tokens-per-minute bucket (LLM_TPM)
+- fewer than LLM_MAX_CONCURRENT calls are in flight
+
+Waiting calls form one priority queue shared by threads and coroutines:
+order-placing calls are admitted before routing, routing before
+informational chat, and background work last. A call that waits longer
+than LLM_QUEUE_TIMEOUT fails with LimiterTimeout.
+
+Retries and hedged requests of an admitted call (see llm_resilience) are
+charged as well: each extra attempt takes a request and the token estimate
+from the buckets and a concurrency slot while it runs. They are not queued
+again (the call is already admitted), so the buckets may go into debt and
+the next calls wait that much longer.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+# Configuration (0 disables a limit)
+LLM_RPM = int(os.getenv("LLM_RPM", "60"))
+LLM_TPM = int(os.getenv("LLM_TPM", "250000"))
+LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", "8"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "20"))
+
+# Priorities - lower is admitted first
+PRIORITIES = {
+    "order": 0,       # placing / parsing an order
+    "default": 1,     # routing, prescriptions
+    "info": 2,        # informational chat
+    "background": 3,  # tracing, refresh jobs
+}
+
+
+class LimiterTimeout(Exception):
+    """Raised when a call waited longer than the queue timeout."""
+
+
+class TokenBucket:
+    """Per-minute token bucket; holds at most one minute of budget."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available (0 if it is now)."""
+        if self.capacity <= 0:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def consume(self, amount: float):
+        if self.capacity > 0:
+            self.level -= min(amount, self.capacity)
+
+    def refund(self, amount: float):
+        """Return an over-estimate (negative amounts charge an under-estimate)."""
+        if self.capacity > 0:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class _Ticket:
+    """A queued call."""
+
+    __slots__ = ("priority", "seq", "tokens", "enqueued_at", "granted", "cancelled",
+                 "event", "loop", "future", "used_tokens", "attempts")
+
+    def __init__(self, priority: int, seq: int, tokens: int):
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+        self.cancelled = False
+        self.event: Optional[threading.Event] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.future: Optional[asyncio.Future] = None
+        # Actual token usage, set by the caller after the response
+        self.used_tokens: Optional[int] = None
+        # Provider requests sent under this ticket (see LLMLimiter.attempt)
+        self.attempts = 0
+
+    def __lt__(self, other: "_Ticket") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    def notify(self):
+        if self.event is not None:
+            self.event.set()
+        elif self.future is not None:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(True)
+
+
+class LLMLimiter:
+    """Token-bucket + concurrency limiter with a priority queue."""
+
+    def __init__(self, rpm: int = LLM_RPM, tpm: int = LLM_TPM,
+                 max_concurrent: int = LLM_MAX_CONCURRENT, queue_timeout: float = LLM_QUEUE_TIMEOUT):
+        """
+        Initialize the limiter.
+
+        Args:
+            rpm: Requests per minute (0 = unlimited)
+            tpm: Estimated tokens per minute (0 = unlimited)
+            max_concurrent: Calls in flight at once (0 = unlimited)
+            queue_timeout: Seconds a call may wait for admission
+        """
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm)
+        self._in_flight = 0
+        self._queue: list = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._waits = {name: deque(maxlen=500) for name in PRIORITIES}
+        self._stats = {"admitted": 0, "queued": 0, "timeouts": 0, "extra_attempts": 0, "max_queue_depth": 0}
+
+    def _enqueue(self, priority: str, tokens: int) -> _Ticket:
+        ticket = _Ticket(PRIORITIES.get(priority, PRIORITIES["default"]), next(self._seq), tokens)
+        with self._lock:
+            heapq.heappush(self._queue, ticket)
+            depth = len(self._queue)
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], depth)
+        return ticket
+
+    def _admit_locked(self) -> Optional[float]:
+        """
+        Admit queued calls in priority order while capacity allows. Caller holds the lock.
+
+        Returns:
+            Seconds until the buckets can admit the head of the queue, or None
+            when the queue is empty or waiting on a concurrency slot
+        """
+        now = time.monotonic()
+        while self._queue:
+            head = self._queue[0]
+            if head.cancelled:
+                heapq.heappop(self._queue)
+                continue
+            if self.max_concurrent > 0 and self._in_flight >= self.max_concurrent:
+                return None
+            wait = max(self._requests.wait_time(1, now), self._tokens.wait_time(head.tokens, now))
+            if wait > 0:
+                return wait
+            heapq.heappop(self._queue)
+            self._requests.consume(1)
+            self._tokens.consume(head.tokens)
+            self._in_flight += 1
+            head.granted = True
+            self._record_admission(head, now)
+            head.notify()
+        return None
+
+    def _record_admission(self, ticket: _Ticket, now: float):
+        wait = now - ticket.enqueued_at
+        name = next(n for n, p in PRIORITIES.items() if p == ticket.priority)
+        self._waits[name].append(wait)
+        self._stats["admitted"] += 1
+        if wait > 0.001:
+            self._stats["queued"] += 1
+
+    def _give_up_locked(self, ticket: _Ticket) -> bool:
+        """Cancel a waiting ticket; False if it was admitted in the meantime."""
+        if ticket.granted:
+            return False
+        ticket.cancelled = True
+        self._stats["timeouts"] += 1
+        return True
+
+    def acquire(self, priority: str = "default", tokens: int = 0) -> _Ticket:
+        """
+        Block until the call is admitted.
+
+        Args:
+            priority: Key of PRIORITIES
+            tokens: Estimated prompt + output tokens
+
+        Returns:
+            Ticket to pass to release()
+
+        Raises:
+            LimiterTimeout: Not admitted within the queue timeout
+        """
+        ticket = self._enqueue(priority, tokens)
+        ticket.event = threading.Event()
+        deadline = ticket.enqueued_at + self.queue_timeout
+        while True:
+            with self._lock:
+                refill_in = self._admit_locked()
+                if ticket.granted:
+                    return ticket
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 and self._give_up_locked(ticket):
+                    raise LimiterTimeout(f"LLM call waited more than {self.queue_timeout:.1f}s ({priority})")
+            ticket.event.wait(timeout=max(0.0, min(refill_in or remaining, remaining)))
+            ticket.event.clear()
+
+    async def aacquire(self, priority: str = "default", tokens: int = 0) -> _Ticket:
+        """Async variant of acquire (waits without blocking the event loop)."""
+        ticket = self._enqueue(priority, tokens)
+        ticket.loop = asyncio.get_running_loop()
+        deadline = ticket.enqueued_at + self.queue_timeout
+        while True:
+            ticket.future = ticket.loop.create_future()
+            with self._lock:
+                refill_in = self._admit_locked()
+                if ticket.granted:
+                    return ticket
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 and self._give_up_locked(ticket):
+                    raise LimiterTimeout(f"LLM call waited more than {self.queue_timeout:.1f}s ({priority})")
+            try:
+                await asyncio.wait_for(ticket.future, timeout=max(0.0, min(refill_in or remaining, remaining)))
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                # Caller went away (e.g. an outer deadline); do not leak a slot
+                # or the budget charged at admission
+                with self._lock:
+                    if not self._give_up_locked(ticket):
+                        self._in_flight -= 1
+                        self._requests.refund(1)
+                        self._tokens.refund(ticket.tokens)
+                        self._admit_locked()
+                raise
+
+    def release(self, ticket: _Ticket):
+        """Free the concurrency slot and settle the token estimate against actual usage."""
+        with self._lock:
+            self._in_flight -= 1
+            if ticket.used_tokens is not None:
+                self._tokens.refund(ticket.tokens - ticket.used_tokens)
+            self._admit_locked()
+
+    @contextmanager
+    def attempt(self, ticket: _Ticket):
+        """
+        Wrap one provider request of an admitted call.
+
+        The first attempt was paid for at admission; every later one (retry,
+        hedged request) is charged a request, the token estimate and a
+        concurrency slot for its duration, without waiting.
+        """
+        with self._lock:
+            ticket.attempts += 1
+            extra = ticket.attempts > 1
+            if extra:
+                self._requests.consume(1)
+                self._tokens.consume(ticket.tokens)
+                self._in_flight += 1
+                self._stats["extra_attempts"] += 1
+        try:
+            yield
+        finally:
+            if extra:
+                with self._lock:
+                    self._in_flight -= 1
+                    self._admit_locked()
+
+    @contextmanager
+    def slot(self, priority: str = "default", tokens: int = 0):
+        """Context manager around acquire/release."""
+        ticket = self.acquire(priority, tokens)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    @asynccontextmanager
+    async def aslot(self, priority: str = "default", tokens: int = 0):
+        """Async context manager around aacquire/release."""
+        ticket = await self.aacquire(priority, tokens)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, in-flight calls and wait-time percentiles (ms) per priority."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["queue_depth"] = sum(1 for t in self._queue if not t.cancelled)
+            stats["in_flight"] = self._in_flight
+            waits = {name: list(samples) for name, samples in self._waits.items()}
+        stats["wait_ms"] = {
+            name: {
+                "count": len(samples),
+                "p50": float(np.percentile(samples, 50)) * 1000,
+                "p95": float(np.percentile(samples, 95)) * 1000,
+            }
+            for name, samples in waits.items() if samples
+        }
+        return stats
+
+
+# Global instance
+_limiter: Optional[LLMLimiter] = None
+
+
+def get_llm_limiter() -> LLMLimiter:
+    """Get or create the limiter instance."""
+    global _limiter
+    if _limiter is None:
+        _limiter = LLMLimiter()
+    return _limiter
+
+
+def get_limiter_stats() -> Dict[str, Any]:
+    """Convenience function for the limiter statistics."""
+    return get_llm_limiter().stats()
+
+
+# Export
+__all__ = [
+    'LLMLimiter',
+    'LimiterTimeout',
+    'get_llm_limiter',
+    'get_limiter_stats',
+    'PRIORITIES',
+    'LLM_RPM',
+    'LLM_TPM',
+    'LLM_MAX_CONCURRENT'
+]
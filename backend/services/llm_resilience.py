@@ -0,0 +1,434 @@
+"""
+LLM Resilience Layer for SwasthyaSarthi.
+Wraps every Gemini request with deadlines, retries, optional hedging and a
+circuit breaker, so a slow or failing provider costs a bounded amount of time
+per turn instead of stalling it until the socket gives up.
+
+- Deadline: each attempt gets LLM_ATTEMPT_TIMEOUT seconds, the whole call
+  (retries included) LLM_DEADLINE seconds
+- Retries: only on retryable errors (timeouts, 429, 5xx, connection errors),
+  with full-jitter exponential backoff
+- Hedging (optional, LLM_HEDGE_DELAY): if the first attempt has not answered
+  after the delay (fixed seconds, or "p95" of recent latencies), a second
+  identical request is sent and the first answer wins
+- Circuit breaker: after LLM_BREAKER_FAILURES consecutive failures calls are
+  refused for LLM_BREAKER_COOLDOWN seconds; gemini_service reports itself as
+  unavailable meanwhile, so agents take their rule-based paths at once.
+  After the cooldown one probe call decides whether to close again; a probe
+  that is cancelled or gives no answer within the cooldown does not keep the
+  circuit half-open.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+# Configuration
+LLM_ATTEMPT_TIMEOUT = float(os.getenv("LLM_ATTEMPT_TIMEOUT", "15"))
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "4"))
+# Seconds before a hedged request, "p95" for the observed p95, empty disables
+LLM_HEDGE_DELAY = os.getenv("LLM_HEDGE_DELAY", "")
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+# Latency samples needed before "p95" hedging kicks in
+MIN_LATENCY_SAMPLES = 20
+
+# A retry is not started with less time than this left before the deadline
+MIN_ATTEMPT_TIME = 1.0
+
+# Threads for hedged sync calls; attempts that outlive their timeout keep a
+# thread until the client gives up, so when all are busy calls run unhedged
+HEDGE_MAX_WORKERS = 16
+
+# google.api_core exception classes worth retrying (matched by name so this
+# module does not depend on the client library)
+RETRYABLE_ERROR_NAMES = {
+    "DeadlineExceeded", "ServiceUnavailable", "TooManyRequests", "ResourceExhausted",
+    "InternalServerError", "BadGateway", "GatewayTimeout", "RetryError", "Aborted",
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker refuses a call."""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an error is transient (timeout, rate limit, server or connection error)."""
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    States: closed (calls pass), open (calls refused), half_open (one probe in flight).
+    """
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES, cooldown: float = LLM_BREAKER_COOLDOWN):
+        """
+        Initialize the breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            cooldown: Seconds the circuit stays open before a probe is allowed
+        """
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"opened": 0, "rejected": 0}
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def _probe_due(self, now: float) -> bool:
+        """Cooldown over, or the probe in flight has not answered within a cooldown."""
+        if self._state == "open":
+            return now - self._opened_at >= self.cooldown
+        return self._state == "half_open" and now - self._probe_started >= self.cooldown
+
+    def is_open(self) -> bool:
+        """True while calls would be refused (cooldown running or probe in flight)."""
+        with self._lock:
+            return self._state != "closed" and not self._probe_due(time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a call may proceed; after the cooldown the first caller becomes the probe."""
+        with self._lock:
+            if self._state == "closed":
+                return True
+            now = time.monotonic()
+            if self._probe_due(now):
+                self._state = "half_open"
+                self._probe_started = now
+                print("[LLM Resilience] Circuit half-open - probing provider")
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def abandon_probe(self):
+        """The probe ended without an answer (cancelled); the next call probes again."""
+        with self._lock:
+            if self._state == "half_open":
+                self._state = "open"
+                self._opened_at = time.monotonic() - self.cooldown
+
+    def record_success(self):
+        """The provider answered."""
+        with self._lock:
+            if self._state != "closed":
+                print("[LLM Resilience] Circuit closed - provider recovered")
+            self._state = "closed"
+            self._failures = 0
+
+    def record_failure(self):
+        """A transient failure (timeout, 429, 5xx)."""
+        with self._lock:
+            self._failures += 1
+            if self._state == "half_open" or (
+                    self._state == "closed" and self._failures >= self.failure_threshold):
+                self._state = "open"
+                self._opened_at = time.monotonic()
+                self._stats["opened"] += 1
+                print(f"[LLM Resilience] Circuit open after {self._failures} failures - "
+                      f"using rule-based paths for {self.cooldown:.0f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self._state, "consecutive_failures": self._failures, **self._stats}
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """q-th percentile in seconds, or None with too few samples."""
+        with self._lock:
+            if len(self._samples) < MIN_LATENCY_SAMPLES:
+                return None
+            return float(np.percentile(self._samples, q))
+
+
+class ResilientCaller:
+    """
+    Runs provider calls under the deadline / retry / hedge / breaker policy.
+    The wrapped function receives the per-attempt timeout in seconds and
+    should pass it on to the client (request_options={"timeout": ...}).
+    """
+
+    def __init__(self, attempt_timeout: float = LLM_ATTEMPT_TIMEOUT, deadline: float = LLM_DEADLINE,
+                 max_retries: int = LLM_MAX_RETRIES, hedge_delay: str = LLM_HEDGE_DELAY,
+                 breaker: Optional[CircuitBreaker] = None):
+        """
+        Initialize the caller.
+
+        Args:
+            attempt_timeout: Seconds per attempt
+            deadline: Seconds for the whole call including retries
+            max_retries: Retries after the first attempt
+            hedge_delay: Seconds before a hedged request, "p95", or "" to disable
+            breaker: Circuit breaker (a new one by default)
+        """
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.hedge_delay = (hedge_delay or "").strip().lower()
+        self.breaker = breaker or CircuitBreaker()
+        self.latencies = LatencyTracker()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._hedge_slots = threading.BoundedSemaphore(HEDGE_MAX_WORKERS)
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "failures": 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _hedge_after(self, timeout: float) -> Optional[float]:
+        """Delay before the hedged request, or None when hedging is off or pointless."""
+        if not self.hedge_delay:
+            return None
+        if self.hedge_delay == "p95":
+            delay = self.latencies.percentile(95)
+        else:
+            try:
+                delay = float(self.hedge_delay)
+            except ValueError:
+                return None
+        return delay if delay and delay < timeout else None
+
+    def _backoff(self, retry: int, remaining: float) -> float:
+        """Full-jitter exponential backoff, leaving at least half the remaining time for the attempt."""
+        return min(random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** retry)), remaining / 2)
+
+    def _submit(self, fn: Callable[[float], Any], timeout: float):
+        """Run fn on the hedge pool, or None when every thread is busy (never queued)."""
+        if not self._hedge_slots.acquire(blocking=False):
+            return None
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS,
+                                                        thread_name_prefix="llm-hedge")
+        future = self._executor.submit(fn, timeout)
+        future.add_done_callback(lambda _: self._hedge_slots.release())
+        return future
+
+    def _attempt(self, fn: Callable[[float], Any], timeout: float) -> Any:
+        hedge_after = self._hedge_after(timeout)
+        primary = self._submit(fn, timeout) if hedge_after is not None else None
+        if primary is None:
+            return fn(timeout)
+
+        done, _ = wait([primary], timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        backup = self._submit(fn, timeout - hedge_after)
+        if backup is None:
+            # Pool saturated by hung calls: wait for the primary alone
+            done, _ = wait([primary], timeout=timeout - hedge_after)
+            if not done:
+                raise TimeoutError(f"LLM call exceeded {timeout:.1f}s")
+            return primary.result()
+
+        self._count("hedges")
+        pending, error = {primary, backup}, None
+        while pending:
+            done, pending = wait(pending, timeout=timeout - hedge_after, return_when=FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError(f"LLM call exceeded {timeout:.1f}s")
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def _aattempt(self, afn: Callable[[float], Awaitable[Any]], timeout: float) -> Any:
+        hedge_after = self._hedge_after(timeout)
+        if hedge_after is None:
+            return await asyncio.wait_for(afn(timeout), timeout)
+
+        primary = asyncio.ensure_future(afn(timeout))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_after)
+            if done:
+                return primary.result()
+
+            self._count("hedges")
+            backup = asyncio.ensure_future(afn(timeout - hedge_after))
+            pending, error = {primary, backup}, None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout - hedge_after, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise asyncio.TimeoutError(f"LLM call exceeded {timeout:.1f}s")
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _before_call(self) -> Tuple[float, bool]:
+        """Check the breaker; the absolute deadline and whether this call is the probe."""
+        self._count("calls")
+        if not self.breaker.allow():
+            raise CircuitOpenError("LLM circuit open - provider degraded")
+        return time.monotonic() + self.deadline, self.breaker.state == "half_open"
+
+    def _after_failure(self, error: Exception, retry: int, deadline: float) -> Optional[float]:
+        """Backoff before the next attempt, or None when the error should be raised."""
+        if not is_retryable(error):
+            # The provider answered (bad request, safety block); it is healthy
+            self.breaker.record_success()
+            return None
+        self.breaker.record_failure()
+        remaining = deadline - time.monotonic()
+        if retry >= self.max_retries or self.breaker.is_open() or remaining < MIN_ATTEMPT_TIME:
+            self._count("failures")
+            return None
+        self._count("retries")
+        print(f"[LLM Resilience] Retry {retry + 1}/{self.max_retries} after {type(error).__name__}")
+        return self._backoff(retry, remaining)
+
+    def call(self, fn: Callable[[float], Any]) -> Any:
+        """
+        Run a blocking provider call.
+
+        Args:
+            fn: Function taking the attempt timeout in seconds
+
+        Returns:
+            The function's result
+
+        Raises:
+            CircuitOpenError: The breaker is open
+            Exception: The last error once retries or the deadline are exhausted
+        """
+        deadline, probe = self._before_call()
+        try:
+            return self._call(fn, deadline)
+        except BaseException:
+            # Failures were recorded already; a cancelled probe must not leave
+            # the circuit half-open
+            if probe:
+                self.breaker.abandon_probe()
+            raise
+
+    def _call(self, fn: Callable[[float], Any], deadline: float) -> Any:
+        retry = 0
+        while True:
+            timeout = min(self.attempt_timeout, deadline - time.monotonic())
+            start = time.monotonic()
+            try:
+                result = self._attempt(fn, timeout)
+            except Exception as e:
+                delay = self._after_failure(e, retry, deadline)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                retry += 1
+                continue
+            self.latencies.record(time.monotonic() - start)
+            self.breaker.record_success()
+            return result
+
+    async def acall(self, afn: Callable[[float], Awaitable[Any]]) -> Any:
+        """Async variant of call; afn returns an awaitable."""
+        deadline, probe = self._before_call()
+        try:
+            return await self._acall(afn, deadline)
+        except BaseException:
+            if probe:
+                self.breaker.abandon_probe()
+            raise
+
+    async def _acall(self, afn: Callable[[float], Awaitable[Any]], deadline: float) -> Any:
+        retry = 0
+        while True:
+            timeout = min(self.attempt_timeout, deadline - time.monotonic())
+            start = time.monotonic()
+            try:
+                result = await self._aattempt(afn, timeout)
+            except Exception as e:
+                delay = self._after_failure(e, retry, deadline)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                retry += 1
+                continue
+            self.latencies.record(time.monotonic() - start)
+            self.breaker.record_success()
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Call counters, breaker state and latency percentiles."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["breaker"] = self.breaker.stats()
+        stats["latency_p50"] = self.latencies.percentile(50)
+        stats["latency_p95"] = self.latencies.percentile(95)
+        stats["hedge_delay"] = self.hedge_delay or None
+        return stats
+
+
+# Global instance
+_caller: Optional[ResilientCaller] = None
+
+
+def get_resilient_caller() -> ResilientCaller:
+    """Get or create the resilient caller instance."""
+    global _caller
+    if _caller is None:
+        _caller = ResilientCaller()
+    return _caller
+
+
+def get_resilience_stats() -> Dict[str, Any]:
+    """Convenience function for the resilience statistics."""
+    return get_resilient_caller().stats()
+
+
+# Export
+__all__ = [
+    'ResilientCaller',
+    'CircuitBreaker',
+    'CircuitOpenError',
+    'get_resilient_caller',
+    'get_resilience_stats',
+    'is_retryable',
+    'LLM_ATTEMPT_TIMEOUT',
+    'LLM_DEADLINE'
+]
@@ -0,0 +1,142 @@
+"""
+Singleflight for SwasthyaSarthi LLM calls.
+Concurrent identical requests (same key as the LLM response cache: model,
+normalized messages, generation settings) share one in-flight Gemini call and
+its result. This covers the cold-miss stampede the response cache cannot:
+when a popular question arrives many times at once, before the first answer
+has been cached.
+
+Threads and coroutines are coalesced separately (a blocking call cannot
+await a coroutine result and vice versa). Errors are shared as well, so a
+failing call is not repeated once per waiter.
+"""
+
+import asyncio
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# Configuration
+LLM_SINGLEFLIGHT = os.getenv("LLM_SINGLEFLIGHT", "true").lower() == "true"
+
+
+class _Call:
+    """A blocking call in flight."""
+
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls with the same key."""
+
+    def __init__(self, enabled: bool = LLM_SINGLEFLIGHT):
+        self.enabled = enabled
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "shared": 0}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn, or wait for the identical call already in flight.
+
+        Args:
+            key: Request key
+            fn: Blocking function producing the result
+
+        Returns:
+            The result of the shared call (its exception is raised to every waiter)
+        """
+        if not self.enabled:
+            return fn()
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats["calls"] += 1
+            else:
+                self._stats["shared"] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+    async def ado(self, key: str, afn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async variant of do.
+
+        The shared call runs as its own task, so a waiter being cancelled
+        (client disconnect, outer deadline) does not cancel it for the others.
+        """
+        if not self.enabled:
+            return await afn()
+
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None:
+                task = asyncio.ensure_future(afn())
+                self._tasks[key] = task
+                task.add_done_callback(lambda _: self._forget(key, task))
+                self._stats["calls"] += 1
+            else:
+                self._stats["shared"] += 1
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+        # Nobody may be left to await a failed task; mark its error as retrieved
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls made and calls that joined one already in flight."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls) + len(self._tasks)
+        total = stats["calls"] + stats["shared"]
+        stats["shared_rate"] = stats["shared"] / total if total else 0.0
+        stats["enabled"] = self.enabled
+        return stats
+
+
+# Global instance
+_singleflight: Optional[SingleFlight] = None
+
+
+def get_singleflight() -> SingleFlight:
+    """Get or create the singleflight instance."""
+    global _singleflight
+    if _singleflight is None:
+        _singleflight = SingleFlight()
+    return _singleflight
+
+
+# Export
+__all__ = [
+    'SingleFlight',
+    'get_singleflight',
+    'LLM_SINGLEFLIGHT'
+]
@@ -0,0 +1,226 @@
+"""
+Mock LLM Backend for SwasthyaSarthi.
+In-process stand-in for google.generativeai models, selected with
+LLM_BACKEND=mock. The whole /chat path (limiter, resilience, caches, routing,
+agents) runs unchanged, so it can be load-tested offline without an API key
+or quota.
+
+- Latency is drawn from MOCK_LLM_LATENCY:
+    fixed:<s> | uniform:<min>,<max> | normal:<mean>,<std> | lognormal:<median>,<sigma>
+  A draw longer than the request timeout sleeps for the timeout and raises
+  TimeoutError, like a real deadline would
+- MOCK_LLM_ERROR_RATE of calls fail with a retryable ServiceUnavailable
+- JSON-mode requests get a value following the request's response_schema
+- MOCK_LLM_RESPONSES may point to a JSON file of {"<regex>": <response>}; the
+  first regex found in the prompt decides the response (objects are
+  returned as JSON text)
+- Everything random is seeded (MOCK_LLM_SEED); the content of a response
+  only depends on the prompt, so runs are repeatable
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Configuration
+MOCK_LLM_LATENCY = os.getenv("MOCK_LLM_LATENCY", "lognormal:0.8,0.4")
+MOCK_LLM_ERROR_RATE = float(os.getenv("MOCK_LLM_ERROR_RATE", "0"))
+MOCK_LLM_SEED = int(os.getenv("MOCK_LLM_SEED", "42"))
+MOCK_LLM_RESPONSES = os.getenv("MOCK_LLM_RESPONSES", "")
+
+# Characters per output token (for usage metadata and max_output_tokens)
+CHARS_PER_TOKEN = 4
+
+
+class ServiceUnavailable(Exception):
+    """Injected provider error (same class name as google.api_core's 503, so it is retried)."""
+
+
+class _Usage:
+    __slots__ = ("prompt_token_count", "candidates_token_count", "total_token_count")
+
+    def __init__(self, prompt_tokens: int, output_tokens: int):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+        self.total_token_count = prompt_tokens + output_tokens
+
+
+class MockResponse:
+    """Minimal GenerateContentResponse: text and usage_metadata."""
+
+    def __init__(self, text: str, prompt_tokens: int = 0):
+        self.text = text
+        self.usage_metadata = _Usage(prompt_tokens, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+
+def parse_latency(spec: str):
+    """
+    Latency sampler from a MOCK_LLM_LATENCY spec.
+
+    Args:
+        spec: "fixed:0.5", "uniform:0.2,1.5", "normal:0.8,0.2" or "lognormal:0.8,0.4"
+
+    Returns:
+        Function of a random.Random returning seconds
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()]
+    kind = kind.strip().lower()
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        # Parameterized by the median, which is what latency reports show
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def _load_canned(path: str) -> List[tuple]:
+    if not path:
+        return []
+    try:
+        with open(path, encoding="utf-8") as f:
+            return [(re.compile(pattern, re.IGNORECASE), response) for pattern, response in json.load(f).items()]
+    except Exception as e:
+        print(f"[MockLLM] Could not load canned responses from {path}: {e}")
+        return []
+
+
+def _prompt_text(contents) -> str:
+    if isinstance(contents, str):
+        return contents
+    texts = []
+    for msg in contents:
+        for part in msg.get("parts", []) if isinstance(msg, dict) else [msg]:
+            if isinstance(part, str):
+                texts.append(part)
+            elif isinstance(part, dict) and "text" in part:
+                texts.append(part["text"])
+    return "\n".join(texts)
+
+
+def value_for_schema(schema: Dict[str, Any], rng: random.Random, name: str = "value") -> Any:
+    """A value following a Gemini response schema (OBJECT/ARRAY/STRING/NUMBER/INTEGER/BOOLEAN)."""
+    kind = str(schema.get("type", "STRING")).upper()
+    if kind == "OBJECT":
+        return {key: value_for_schema(sub, rng, key) for key, sub in schema.get("properties", {}).items()}
+    if kind == "ARRAY":
+        return [value_for_schema(schema.get("items", {}), rng, name) for _ in range(rng.randint(1, 3))]
+    if kind == "BOOLEAN":
+        return True
+    if kind == "INTEGER":
+        return rng.randint(1, 3)
+    if kind == "NUMBER":
+        return round(rng.uniform(0.5, 1.0), 2)
+    if schema.get("enum"):
+        return rng.choice(schema["enum"])
+    return f"mock {name}"
+
+
+class MockGenerativeModel:
+    """Drop-in for genai.GenerativeModel (generate_content / generate_content_async)."""
+
+    def __init__(self, model_name: str, latency: str = MOCK_LLM_LATENCY,
+                 error_rate: float = MOCK_LLM_ERROR_RATE, seed: int = MOCK_LLM_SEED,
+                 responses_path: str = MOCK_LLM_RESPONSES):
+        """
+        Initialize the mock model.
+
+        Args:
+            model_name: Name reported in responses and logs
+            latency: Latency distribution spec (see parse_latency)
+            error_rate: Share of calls failing with ServiceUnavailable
+            seed: Seed of the latency / error draws
+            responses_path: JSON file of canned responses by prompt regex
+        """
+        self.model_name = model_name
+        self.error_rate = error_rate
+        self._latency = parse_latency(latency)
+        self._rng = random.Random(f"{seed}:{model_name}")
+        self._lock = threading.Lock()
+        self._canned = _load_canned(responses_path)
+
+    def _draw(self) -> tuple:
+        """Latency and whether this call fails."""
+        with self._lock:
+            return self._latency(self._rng), self._rng.random() < self.error_rate
+
+    def _respond(self, contents, generation_config: Optional[dict]) -> MockResponse:
+        prompt = _prompt_text(contents)
+        config = generation_config or {}
+        # Content depends only on the prompt, so identical requests get identical answers
+        rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+
+        text = None
+        for pattern, response in self._canned:
+            if pattern.search(prompt):
+                text = response if isinstance(response, str) else json.dumps(response)
+                break
+        if text is None:
+            if config.get("response_schema"):
+                text = json.dumps(value_for_schema(config["response_schema"], rng))
+            elif config.get("response_mime_type") == "application/json":
+                text = "{}"
+            else:
+                last_line = prompt.strip().splitlines()[-1] if prompt.strip() else ""
+                text = f"[{self.model_name}] Mock answer to: {last_line[:120]}"
+
+        max_tokens = config.get("max_output_tokens")
+        if max_tokens:
+            text = text[:max_tokens * CHARS_PER_TOKEN]
+        return MockResponse(text, (len(prompt) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+    def _outcome(self, request_options: Optional[dict]) -> tuple:
+        """Seconds to wait and the error to raise after it (or None)."""
+        latency, fails = self._draw()
+        timeout = (request_options or {}).get("timeout")
+        if timeout is not None and latency > timeout:
+            return timeout, TimeoutError(f"Mock {self.model_name} exceeded {timeout:.1f}s")
+        if fails:
+            return latency, ServiceUnavailable(f"Mock {self.model_name} unavailable")
+        return latency, None
+
+    def generate_content(self, contents, generation_config: Optional[dict] = None,
+                         request_options: Optional[dict] = None, stream: bool = False, **kwargs):
+        """Blocking generation (stream=True yields the text in chunks)."""
+        delay, error = self._outcome(request_options)
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        response = self._respond(contents, generation_config)
+        if stream:
+            text = response.text
+            return iter([MockResponse(text[i:i + 32]) for i in range(0, len(text), 32)])
+        return response
+
+    async def generate_content_async(self, contents, generation_config: Optional[dict] = None,
+                                     request_options: Optional[dict] = None, **kwargs):
+        """Async generation (sleeps without blocking the event loop)."""
+        delay, error = self._outcome(request_options)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return self._respond(contents, generation_config)
+
+
+# Export
+__all__ = [
+    'MockGenerativeModel',
+    'MockResponse',
+    'ServiceUnavailable',
+    'parse_latency',
+    'value_for_schema',
+    'MOCK_LLM_LATENCY',
+    'MOCK_LLM_ERROR_RATE'
+]
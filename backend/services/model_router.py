@@ -0,0 +1,190 @@
+"""
+Adaptive Model Routing for SwasthyaSarthi.
+Call sites ask for "flash" or "pro"; this policy decides which model a call
+actually goes to, based on what each model has recently delivered for that
+kind of task.
+
+For every (model, task) pair a rolling window of the last
+LLM_ROUTING_WINDOW seconds is kept: call latencies, failed calls, and
+outputs that were unusable (empty, or invalid JSON in JSON mode). A pair is
+unhealthy when, with enough samples,
+- its p95 latency exceeds the model's budget (LLM_PRO_P95_BUDGET /
+  LLM_FLASH_P95_BUDGET), or
+- its failure rate exceeds LLM_ROUTING_MAX_FAILURE_RATE
+
+Then "pro" requests are downgraded to flash, and requests whose model (or
+downgrade) is unhealthy get no LLM call at all - gemini_service returns
+None and the agents take their rule-based paths. A small share of calls
+(LLM_ROUTING_PROBE_RATE) still goes to an unhealthy model so its window
+keeps receiving fresh samples and it is routed to again once it recovers.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+# Configuration
+LLM_ROUTING = os.getenv("LLM_ROUTING", "true").lower() == "true"
+LLM_PRO_P95_BUDGET = float(os.getenv("LLM_PRO_P95_BUDGET", "8"))
+LLM_FLASH_P95_BUDGET = float(os.getenv("LLM_FLASH_P95_BUDGET", "5"))
+LLM_ROUTING_MAX_FAILURE_RATE = float(os.getenv("LLM_ROUTING_MAX_FAILURE_RATE", "0.3"))
+LLM_ROUTING_WINDOW = float(os.getenv("LLM_ROUTING_WINDOW", "300"))
+LLM_ROUTING_PROBE_RATE = float(os.getenv("LLM_ROUTING_PROBE_RATE", "0.05"))
+
+# Samples needed before a (model, task) pair can be judged unhealthy
+MIN_ROUTING_SAMPLES = 10
+
+# Model tried next when one is unhealthy (None = rule-based)
+DOWNGRADES = {"pro": "flash", "flash": None}
+
+RULE_BASED = "rule_based"
+
+
+class ModelRoutingPolicy:
+    """Latency / failure-rate based model selection per task."""
+
+    def __init__(self, budgets: Optional[Dict[str, float]] = None,
+                 max_failure_rate: float = LLM_ROUTING_MAX_FAILURE_RATE,
+                 window: float = LLM_ROUTING_WINDOW, probe_rate: float = LLM_ROUTING_PROBE_RATE,
+                 enabled: bool = LLM_ROUTING):
+        """
+        Initialize the policy.
+
+        Args:
+            budgets: p95 latency budget in seconds per model
+            max_failure_rate: Share of failed or unusable calls tolerated
+            window: Seconds of history considered
+            probe_rate: Share of calls still sent to an unhealthy model
+            enabled: False routes every call to the requested model
+        """
+        self.budgets = budgets or {"pro": LLM_PRO_P95_BUDGET, "flash": LLM_FLASH_P95_BUDGET}
+        self.max_failure_rate = max_failure_rate
+        self.window = window
+        self.probe_rate = probe_rate
+        self.enabled = enabled
+        # (model, task) -> deque of (timestamp, latency or None, outcome)
+        self._samples: Dict[Tuple[str, str], deque] = {}
+        self._unhealthy: Dict[Tuple[str, str], str] = {}
+        self._decisions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, task: str, latency: float, ok: bool = True):
+        """Record a finished call (ok=False for an error or timeout)."""
+        self._add(model, task, latency, "ok" if ok else "error")
+
+    def record_invalid(self, model: str, task: str):
+        """Record that a call's output was unusable (empty or malformed)."""
+        self._add(model, task, None, "invalid")
+
+    def _add(self, model: str, task: str, latency: Optional[float], outcome: str):
+        with self._lock:
+            samples = self._samples.setdefault((model, task), deque(maxlen=1000))
+            samples.append((time.monotonic(), latency, outcome))
+
+    def _health_locked(self, model: str, task: str) -> Dict[str, Any]:
+        """Window statistics of a (model, task) pair. Caller holds the lock."""
+        samples = self._samples.get((model, task))
+        cutoff = time.monotonic() - self.window
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+
+        latencies = [s[1] for s in samples or () if s[1] is not None]
+        failures = sum(1 for s in samples or () if s[2] != "ok")
+        health = {"calls": len(latencies), "failure_rate": min(1.0, failures / len(latencies)) if latencies else 0.0}
+        if latencies:
+            health["p50"] = float(np.percentile(latencies, 50))
+            health["p95"] = float(np.percentile(latencies, 95))
+
+        reason = None
+        if len(latencies) >= MIN_ROUTING_SAMPLES:
+            budget = self.budgets.get(model)
+            if budget and health["p95"] > budget:
+                reason = f"p95 {health['p95']:.1f}s > {budget:.1f}s"
+            elif health["failure_rate"] > self.max_failure_rate:
+                reason = f"failure rate {health['failure_rate']:.0%}"
+        health["healthy"] = reason is None
+        if reason:
+            health["reason"] = reason
+
+        # Log transitions only, not every routed call
+        key = (model, task)
+        if reason and key not in self._unhealthy:
+            print(f"[Routing] {model} unhealthy for {task}: {reason}")
+        elif not reason and key in self._unhealthy:
+            print(f"[Routing] {model} healthy again for {task}")
+        if reason:
+            self._unhealthy[key] = reason
+        else:
+            self._unhealthy.pop(key, None)
+        return health
+
+    def choose(self, requested: str, task: str) -> Optional[str]:
+        """
+        Model a call should go to.
+
+        Args:
+            requested: Model asked for by the call site ("flash" or "pro")
+            task: Kind of call (agent or purpose), e.g. "routing", "pharmacist"
+
+        Returns:
+            "flash", "pro", or None when the call should be skipped in favor
+            of the rule-based path
+        """
+        if not self.enabled:
+            return requested
+
+        with self._lock:
+            model = requested
+            while model is not None:
+                if self._health_locked(model, task)["healthy"] or random.random() < self.probe_rate:
+                    break
+                model = DOWNGRADES.get(model)
+            decision = f"{task}:{requested}->{model or RULE_BASED}"
+            self._decisions[decision] = self._decisions.get(decision, 0) + 1
+        return model
+
+    def stats(self) -> Dict[str, Any]:
+        """Per (model, task) latency and failure rate, and routing decision counts."""
+        with self._lock:
+            models = {f"{model}:{task}": self._health_locked(model, task) for model, task in list(self._samples)}
+            decisions = dict(self._decisions)
+        return {
+            "enabled": self.enabled,
+            "budgets": self.budgets,
+            "max_failure_rate": self.max_failure_rate,
+            "window": self.window,
+            "models": models,
+            "decisions": decisions,
+        }
+
+
+# Global instance
+_policy: Optional[ModelRoutingPolicy] = None
+
+
+def get_routing_policy() -> ModelRoutingPolicy:
+    """Get or create the routing policy instance."""
+    global _policy
+    if _policy is None:
+        _policy = ModelRoutingPolicy()
+    return _policy
+
+
+def get_routing_stats() -> Dict[str, Any]:
+    """Convenience function for the routing statistics."""
+    return get_routing_policy().stats()
+
+
+# Export
+__all__ = [
+    'ModelRoutingPolicy',
+    'get_routing_policy',
+    'get_routing_stats',
+    'LLM_PRO_P95_BUDGET',
+    'LLM_FLASH_P95_BUDGET'
+]
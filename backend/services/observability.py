@@ -0,0 +1,79 @@
+"""
+LangSmith Observability for SwasthyaSarthi.
+Single place where LangSmith tracing is configured, shared by
+agents/llm_provider.py and gemini_service: the LANGCHAIN_* environment is set
+(and reported) once per process, and langchain_core is only imported when a
+trace config is actually built, not when a module importing this one loads.
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configuration
+LANGSMITH_API_KEY = os.getenv("LANGSMITH_API_KEY")
+LANGSMITH_PROJECT = os.getenv("LANGSMITH_PROJECT", "swasthya-sarthi")
+
+_configured = False
+
+
+def configure_langsmith():
+    """Set the LangChain tracing environment (idempotent)."""
+    global _configured
+    if _configured:
+        return
+    _configured = True
+
+    if LANGSMITH_API_KEY:
+        os.environ["LANGCHAIN_TRACING_V2"] = "true"
+        os.environ["LANGCHAIN_API_KEY"] = LANGSMITH_API_KEY
+        os.environ["LANGCHAIN_PROJECT"] = LANGSMITH_PROJECT
+        print(f"[Observability] LangSmith enabled - Project: {LANGSMITH_PROJECT}")
+    else:
+        os.environ["LANGCHAIN_TRACING_V2"] = "false"
+        print("[Observability] LangSmith not configured - set LANGSMITH_API_KEY for tracing")
+
+
+def is_tracing_enabled() -> bool:
+    """Check if LangSmith tracing is enabled."""
+    return LANGSMITH_API_KEY is not None
+
+
+def trace_config(tags: List[str], metadata: Optional[Dict[str, Any]] = None):
+    """
+    RunnableConfig carrying LangSmith tags and metadata.
+
+    Args:
+        tags: Trace tags
+        metadata: Trace metadata
+
+    Returns:
+        RunnableConfig (empty when tracing is disabled)
+    """
+    from langchain_core.runnables import RunnableConfig
+
+    if not LANGSMITH_API_KEY:
+        return RunnableConfig()
+    return RunnableConfig(
+        configurable={
+            "tags": tags,
+            "metadata": {
+                "project": "swasthya-sarthi",
+                "environment": "production",
+                **(metadata or {})
+            }
+        }
+    )
+
+
+# Export
+__all__ = [
+    'configure_langsmith',
+    'is_tracing_enabled',
+    'trace_config',
+    'LANGSMITH_API_KEY',
+    'LANGSMITH_PROJECT'
+]
@@ -14,6 +14,7 @@ from PIL import Image
 import logging
 import sys
 import os
+import threading
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -247,13 +248,16 @@ class OCRService:
 
 # Global instance
 _ocr_service: Optional[OCRService] = None
+_ocr_lock = threading.Lock()
 
 
 def get_ocr_service() -> OCRService:
-    """Get or create OCR service instance."""
+    """Get or create OCR service instance (loaded once, also when warm-up and a request race)."""
     global _ocr_service
     if _ocr_service is None:
-        _ocr_service = OCRService(languages=['en', 'hi', 'mr'])
+        with _ocr_lock:
+            if _ocr_service is None:
+                _ocr_service = OCRService(languages=['en', 'hi', 'mr'])
     return _ocr_service
 
 
@@ -0,0 +1,217 @@
+"""
+Semantic Cache Service for SwasthyaSarthi.
+Answers near-duplicate informational queries ("what is paracetamol used for",
+"paracetamol used for what?") from earlier LLM answers.
+
+Queries are transliterated to Latin (so Devanagari and romanized spellings
+share n-grams), embedded as hashed character n-gram vectors and stored as rows
+of one NumPy matrix; lookup is a single matrix-vector product (cosine top-1).
+
+Entries are partitioned by a context key (model, system prompt incl. language
+instruction, prompt template, generation settings), so only answers produced
+under the same instructions are reused. Two guards keep similar-looking but
+different questions apart:
+- every content word (compared by phonetic key, so spellings and scripts
+  agree) and every number / strength ("dolo 500" vs "dolo 650") must be the
+  same; only stopwords and word order may differ
+- the question aspect (price, side effects, dosage, ...) must be the same
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+
+from backend.services.text_vectorizer import HashingVectorizer
+from backend.services.transliteration import transliterate, phonetic_key
+
+# Configuration
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.82"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "512"))
+
+# 2^12 float32 features = 16 KB per cached query
+SEMANTIC_FEATURES = 1 << 12
+
+# Words that do not change what is asked; every other word must match exactly
+STOPWORDS = {
+    # English
+    "what", "whats", "which", "who", "how", "why", "when", "is", "are", "was", "be", "does", "do",
+    "the", "a", "an", "of", "for", "to", "in", "on", "with", "and", "or", "about", "it", "its",
+    "this", "that", "i", "me", "my", "you", "your", "can", "could", "please", "pls", "tell",
+    "explain", "info", "information", "details", "use", "used", "uses", "usage", "purpose",
+    # Romanized Hindi / Marathi
+    "kya", "kyaa", "hai", "hain", "ka", "ki", "ke", "kis", "kaise", "liye", "lie", "mein",
+    "se", "batao", "bataiye", "hota", "hoti", "hote", "upyog", "istemal", "kay", "ahe",
+    "aahe", "cha", "chi", "che", "sathi", "kasa", "kashi", "sanga", "vapar",
+    # Devanagari
+    "क्या", "है", "हैं", "का", "की", "के", "किस", "कैसे", "लिए", "में", "से", "बताओ", "बताइए",
+    "होता", "होती", "उपयोग", "इस्तेमाल", "काय", "आहे", "चा", "ची", "चे", "साठी", "कसा", "कशी",
+    "सांगा", "वापर",
+}
+
+# Numbers and strengths ("500", "650mg", "2.5 ml") must match exactly
+_STRENGTH_RE = re.compile(r"(\d+(?:[.,]\d+)?)\s*(mg|ml|mcg|g)?(?![\w\u0900-\u0d7f])", re.UNICODE)
+
+# Question aspects - two queries about different aspects never share an answer
+ASPECT_WORDS = {
+    "price": ["price", "cost", "rate", "mrp", "kimat", "keemat", "daam", "कीमत", "दाम", "किंमत"],
+    "side_effects": ["side", "effect", "effects", "reaction", "nuksan", "नुकसान", "दुष्परिणाम"],
+    "dosage": ["dose", "dosage", "doses", "kitna", "kitni", "kitne", "खुराक", "डोस", "मात्रा"],
+    "availability": ["stock", "available", "availability", "milega", "उपलब्ध"],
+    "safety": ["safe", "pregnancy", "pregnant", "child", "children", "kids", "alcohol", "सुरक्षित"],
+    "alternatives": ["alternative", "alternatives", "substitute", "instead", "similar", "विकल्प", "पर्याय"],
+}
+_ASPECT_BY_WORD = {word: aspect for aspect, words in ASPECT_WORDS.items() for word in words}
+
+# Indic vowel signs are not \w, so the script blocks are listed explicitly
+_WORD_RE = re.compile(r"[\w\u0900-\u0d7f]+", re.UNICODE)
+
+
+def _strength(match: re.Match) -> str:
+    # Devanagari and other script digits compare equal to ASCII ones
+    number = "".join(str(int(c)) if c.isdecimal() else "." for c in match.group(1))
+    return number + (match.group(2) or "")
+
+
+def _signature(query: str) -> Tuple[frozenset, frozenset]:
+    """(content-word keys and strengths, question aspects) of a query."""
+    text = (query or "").lower()
+    strengths = {_strength(m) for m in _STRENGTH_RE.finditer(text)}
+    words = _WORD_RE.findall(_STRENGTH_RE.sub(" ", text))
+    aspects = frozenset(_ASPECT_BY_WORD[w] for w in words if w in _ASPECT_BY_WORD)
+    terms = set(strengths)
+    for word in words:
+        if word in _ASPECT_BY_WORD or word in STOPWORDS:
+            continue
+        romanized = transliterate(word)
+        if romanized not in STOPWORDS:
+            terms.add(phonetic_key(romanized) or romanized)
+    return frozenset(terms), aspects
+
+
+class SemanticCache:
+    """
+    Near-duplicate query cache over hashed character n-gram vectors.
+    Rows live in a fixed-size ring buffer; the oldest entry is overwritten first.
+    """
+
+    def __init__(self, max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+                 threshold: float = SEMANTIC_CACHE_THRESHOLD, ttl: float = SEMANTIC_CACHE_TTL):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Number of cached queries
+            threshold: Minimum cosine similarity for a hit
+            ttl: Seconds an entry stays valid
+        """
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl = ttl
+        self.vectorizer = HashingVectorizer(n_features=SEMANTIC_FEATURES, word_ngrams=(1, 0), char_ngrams=(2, 4))
+        self._matrix = np.zeros((max_entries, SEMANTIC_FEATURES), dtype=np.float32)
+        self._contexts = [None] * max_entries
+        self._signatures = [None] * max_entries
+        self._queries = [None] * max_entries
+        self._responses = [None] * max_entries
+        self._expires = np.zeros(max_entries)
+        self._next = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "guarded": 0, "stores": 0}
+
+    def _embed(self, query: str) -> np.ndarray:
+        return self.vectorizer.transform_one(transliterate(query or ""))
+
+    def get(self, context: str, query: str) -> Optional[str]:
+        """
+        Cached answer for a near-duplicate query under the same context.
+
+        Args:
+            context: Context key (see llm_cache.make_cache_key)
+            query: User query
+
+        Returns:
+            Cached response or None
+        """
+        vector = self._embed(query)
+        signature = _signature(query)
+        now = time.time()
+
+        with self._lock:
+            similarities = self._matrix @ vector
+            # Only live rows of the same context compete
+            for idx in np.argsort(-similarities):
+                if similarities[idx] < self.threshold:
+                    break
+                if self._contexts[idx] != context or self._expires[idx] <= now:
+                    continue
+                if self._signatures[idx] != signature:
+                    self._stats["guarded"] += 1
+                    continue
+                self._stats["hits"] += 1
+                print(f"[Semantic Cache] Hit ({similarities[idx]:.2f}): '{query}' ~ '{self._queries[idx]}'")
+                return self._responses[idx]
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, context: str, query: str, response: str):
+        """Store the answer to a query."""
+        vector = self._embed(query)
+        signature = _signature(query)
+        with self._lock:
+            idx = self._next
+            self._matrix[idx] = vector
+            self._contexts[idx] = context
+            self._signatures[idx] = signature
+            self._queries[idx] = query
+            self._responses[idx] = response
+            self._expires[idx] = time.time() + self.ttl
+            self._next = (idx + 1) % self.max_entries
+            self._stats["stores"] += 1
+
+    def clear(self):
+        """Drop all entries."""
+        with self._lock:
+            self._matrix[:] = 0.0
+            self._contexts = [None] * self.max_entries
+            self._signatures = [None] * self.max_entries
+            self._queries = [None] * self.max_entries
+            self._responses = [None] * self.max_entries
+            self._expires[:] = 0.0
+            self._next = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and hit rate."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = sum(1 for c in self._contexts if c is not None)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["threshold"] = self.threshold
+        return stats
+
+
+# Global instance
+_semantic_cache: Optional[SemanticCache] = None
+
+
+def get_semantic_cache() -> SemanticCache:
+    """Get or create the semantic cache instance."""
+    global _semantic_cache
+    if _semantic_cache is None:
+        _semantic_cache = SemanticCache()
+    return _semantic_cache
+
+
+# Export
+__all__ = [
+    'SemanticCache',
+    'get_semantic_cache',
+    'SEMANTIC_CACHE_THRESHOLD',
+    'ASPECT_WORDS',
+    'STOPWORDS'
+]
@@ -0,0 +1,154 @@
+"""
+Stock Index Service for SwasthyaSarthi.
+Keeps an in-memory set of in-stock product ids so availability checks
+do not need to download the whole inventory over HTTP.
+
+The index is loaded from the medicines table on first use and kept in sync
+through SQLAlchemy events: stock changes are collected while a session
+flushes and applied once the transaction commits.
+"""
+
+import threading
+from typing import Callable, Dict, List, Optional, Set
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from backend.database import SessionLocal
+from backend.models import Medicine
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Session.info key holding stock changes pending commit
+_PENDING_KEY = "stock_index_changes"
+
+
+class StockIndex:
+    """
+    In-memory set of product ids with stock > 0.
+    Subscribers are notified with {product_id: in_stock} for every committed change.
+    """
+
+    def __init__(self):
+        self._in_stock: Set[int] = set()
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._subscribers: List[Callable[[Dict[int, bool]], None]] = []
+
+    def load(self):
+        """(Re)load the in-stock set from the database."""
+        db = SessionLocal()
+        try:
+            rows = db.query(Medicine.product_id, Medicine.stock).filter(
+                Medicine.product_id.isnot(None)
+            ).all()
+        finally:
+            db.close()
+
+        in_stock = {pid for pid, stock in rows if (stock or 0) > 0}
+        with self._lock:
+            self._in_stock = in_stock
+            self._loaded = True
+        logger.info(f"[Stock Index] Loaded {len(in_stock)} in-stock products")
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def is_in_stock(self, product_id: int) -> bool:
+        """Check if a product currently has stock."""
+        self._ensure_loaded()
+        return product_id in self._in_stock
+
+    def snapshot(self) -> frozenset:
+        """Get an immutable copy of the in-stock product ids."""
+        self._ensure_loaded()
+        with self._lock:
+            return frozenset(self._in_stock)
+
+    def apply(self, stock_levels: Dict[int, Optional[int]]):
+        """
+        Apply committed stock levels.
+
+        Args:
+            stock_levels: product_id -> new stock (None when the product was deleted)
+        """
+        if not self._loaded:
+            # Nothing to keep in sync yet - the first reader loads fresh data
+            return
+
+        changes = {}
+        with self._lock:
+            for pid, stock in stock_levels.items():
+                if pid is None:
+                    continue
+                in_stock = (stock or 0) > 0
+                if in_stock != (pid in self._in_stock):
+                    if in_stock:
+                        self._in_stock.add(pid)
+                    else:
+                        self._in_stock.discard(pid)
+                    changes[pid] = in_stock
+            subscribers = list(self._subscribers)
+
+        if changes:
+            for callback in subscribers:
+                try:
+                    callback(changes)
+                except Exception as e:
+                    logger.warning(f"[Stock Index] Subscriber error: {e}")
+
+    def subscribe(self, callback: Callable[[Dict[int, bool]], None]):
+        """Register a callback for committed in-stock changes."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+
+# Global instance
+_stock_index: Optional[StockIndex] = None
+
+
+def get_stock_index() -> StockIndex:
+    """Get or create stock index instance."""
+    global _stock_index
+    if _stock_index is None:
+        _stock_index = StockIndex()
+    return _stock_index
+
+
+# ==================== SQLALCHEMY SYNC HOOKS ====================
+
+@event.listens_for(Medicine, "after_insert")
+@event.listens_for(Medicine, "after_update")
+def _track_stock_change(mapper, connection, target):
+    """Remember the new stock level until the transaction commits."""
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, {})[target.product_id] = target.stock
+
+
+@event.listens_for(Medicine, "after_delete")
+def _track_medicine_delete(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, {})[target.product_id] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_stock_changes(session):
+    changes = session.info.pop(_PENDING_KEY, None)
+    if changes:
+        get_stock_index().apply(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_stock_changes(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+# Export
+__all__ = [
+    'StockIndex',
+    'get_stock_index'
+]
@@ -0,0 +1,78 @@
+"""
+Text Vectorizer Service for SwasthyaSarthi.
+Stateless hashing vectorizer that turns short user messages into fixed-size
+NumPy vectors (word n-grams + character n-grams), so small local models can
+work on text without a fitted vocabulary.
+
+Features are hashed with CRC32 (stable across processes, unlike hash()), and a
+second hash bit picks the sign to keep collisions unbiased.
+"""
+
+import re
+import zlib
+from typing import Iterable, List, Tuple
+import numpy as np
+
+# Default dimensionality (2^14 buckets)
+DEFAULT_N_FEATURES = 1 << 14
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingVectorizer:
+    """
+    Hashing vectorizer over word and character n-grams.
+    Rows are L2-normalised so dot products are cosine similarities.
+    """
+
+    def __init__(self, n_features: int = DEFAULT_N_FEATURES,
+                 word_ngrams: Tuple[int, int] = (1, 2),
+                 char_ngrams: Tuple[int, int] = (3, 5)):
+        self.n_features = n_features
+        self.word_ngrams = word_ngrams
+        self.char_ngrams = char_ngrams
+
+    def features(self, text: str) -> List[str]:
+        """List the raw n-gram features of a text."""
+        tokens = _TOKEN_RE.findall((text or "").lower())
+        feats = []
+
+        lo, hi = self.word_ngrams
+        for n in range(lo, hi + 1):
+            for i in range(len(tokens) - n + 1):
+                feats.append("w:" + " ".join(tokens[i:i + n]))
+
+        lo, hi = self.char_ngrams
+        if hi > 0:
+            for token in tokens:
+                padded = f" {token} "
+                for n in range(lo, hi + 1):
+                    for i in range(len(padded) - n + 1):
+                        feats.append("c:" + padded[i:i + n])
+        return feats
+
+    def transform_one(self, text: str) -> np.ndarray:
+        """Vectorize a single text."""
+        vec = np.zeros(self.n_features, dtype=np.float32)
+        for feat in self.features(text):
+            h = zlib.crc32(feat.encode("utf-8"))
+            vec[h % self.n_features] += 1.0 if (h >> 31) & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec /= norm
+        return vec
+
+    def transform(self, texts: Iterable[str]) -> np.ndarray:
+        """Vectorize texts into a (n_texts, n_features) matrix."""
+        texts = list(texts)
+        matrix = np.zeros((len(texts), self.n_features), dtype=np.float32)
+        for i, text in enumerate(texts):
+            matrix[i] = self.transform_one(text)
+        return matrix
+
+
+# Export
+__all__ = [
+    'HashingVectorizer',
+    'DEFAULT_N_FEATURES'
+]
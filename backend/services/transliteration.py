@@ -0,0 +1,220 @@
+"""
+Transliteration Service for SwasthyaSarthi.
+Romanizes Indic-script text (Devanagari, Bengali, Gujarati, Malayalam) so that
+medicine names typed or spoken in Hindi/Marathi/Bengali/Gujarati/Malayalam can be
+matched against the Latin-script product catalog without an LLM round-trip.
+
+The supported Unicode blocks share the ISCII-derived layout, so one table of
+offsets covers all four scripts. Matching uses a phonetic consonant skeleton
+("पैरासिटामोल" -> "pairasitamol" -> "prstml") which is computed the same way for
+catalog names and romanized queries.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Unicode block start for each supported script
+SCRIPT_BLOCKS = {
+    "devanagari": 0x0900,
+    "bengali": 0x0980,
+    "gujarati": 0x0A80,
+    "malayalam": 0x0D00,
+}
+
+# Offsets within a block (shared by all supported scripts)
+_VOWELS = {
+    0x05: "a", 0x06: "aa", 0x07: "i", 0x08: "ii", 0x09: "u", 0x0A: "uu",
+    0x0B: "ri", 0x0D: "e", 0x0E: "e", 0x0F: "e", 0x10: "ai",
+    0x11: "o", 0x12: "o", 0x13: "o", 0x14: "au",
+}
+
+_CONSONANTS = {
+    0x15: "k", 0x16: "kh", 0x17: "g", 0x18: "gh", 0x19: "ng",
+    0x1A: "ch", 0x1B: "chh", 0x1C: "j", 0x1D: "jh", 0x1E: "ny",
+    0x1F: "t", 0x20: "th", 0x21: "d", 0x22: "dh", 0x23: "n",
+    0x24: "t", 0x25: "th", 0x26: "d", 0x27: "dh", 0x28: "n", 0x29: "n",
+    0x2A: "p", 0x2B: "ph", 0x2C: "b", 0x2D: "bh", 0x2E: "m",
+    0x2F: "y", 0x30: "r", 0x31: "r", 0x32: "l", 0x33: "l", 0x34: "l",
+    0x35: "v", 0x36: "sh", 0x37: "sh", 0x38: "s", 0x39: "h",
+    # Nukta forms (क़ ख़ ग़ ज़ ड़ ढ़ फ़ य़)
+    0x58: "q", 0x59: "kh", 0x5A: "gh", 0x5B: "z", 0x5C: "r", 0x5D: "rh", 0x5E: "f", 0x5F: "y",
+}
+
+_MATRAS = {
+    0x3E: "aa", 0x3F: "i", 0x40: "ii", 0x41: "u", 0x42: "uu", 0x43: "ri", 0x44: "rri",
+    0x45: "e", 0x46: "e", 0x47: "e", 0x48: "ai", 0x49: "o", 0x4A: "o", 0x4B: "o", 0x4C: "au",
+}
+
+_SIGNS = {
+    0x01: "n",  # candrabindu
+    0x02: "n",  # anusvara
+    0x03: "h",  # visarga
+}
+
+_VIRAMA = 0x4D
+_NUKTA = 0x3C
+
+# Consonant + nukta -> sound (ph + nukta = f, j + nukta = z, ...)
+_NUKTA_FORMS = {"ph": "f", "j": "z", "k": "q", "d": "r", "dh": "rh"}
+
+# Script-specific letters outside the shared layout
+_EXTRA_FINALS = {
+    0x09CE: "t",  # Bengali khanda ta
+    0x0D7A: "n", 0x0D7B: "n", 0x0D7C: "r", 0x0D7D: "l", 0x0D7E: "l", 0x0D7F: "k",  # Malayalam chillu
+}
+
+# Conjuncts whose sound differs from their parts (Malayalam റ്റ is "tt")
+_CONJUNCTS = {"\u0d31\u0d4d\u0d31": "\u0d1f\u0d4d\u0d1f"}
+
+# Scripts where a word-final inherent vowel is not pronounced
+_SCHWA_DELETION = {"devanagari", "bengali", "gujarati"}
+
+
+def _build_table() -> Dict[int, Tuple[str, str, str]]:
+    """Precompute codepoint -> (kind, roman, script) for every supported script."""
+    table = {}
+    for script, base in SCRIPT_BLOCKS.items():
+        for kind, mapping in (("vowel", _VOWELS), ("consonant", _CONSONANTS),
+                              ("matra", _MATRAS), ("sign", _SIGNS)):
+            for offset, roman in mapping.items():
+                table[base + offset] = (kind, roman, script)
+        table[base + _VIRAMA] = ("virama", "", script)
+        table[base + _NUKTA] = ("nukta", "", script)
+        for digit in range(10):
+            table[base + 0x66 + digit] = ("digit", str(digit), script)
+    for codepoint, roman in _EXTRA_FINALS.items():
+        script = next(s for s, b in SCRIPT_BLOCKS.items() if b <= codepoint < b + 0x80)
+        table[codepoint] = ("final", roman, script)
+    return table
+
+
+_TABLE = _build_table()
+
+_INDIC_RE = re.compile("[" + "".join(
+    f"\\u{base:04x}-\\u{base + 0x7F:04x}" for base in SCRIPT_BLOCKS.values()
+) + "]")
+
+
+def contains_indic_script(text: str) -> bool:
+    """Check if text contains any supported Indic script."""
+    return bool(text) and _INDIC_RE.search(text) is not None
+
+
+def transliterate(text: str) -> str:
+    """
+    Romanize Indic-script text; Latin text and punctuation pass through unchanged.
+
+    Args:
+        text: Input text in any mix of supported scripts
+
+    Returns:
+        Lowercase-friendly Latin romanization
+    """
+    if not contains_indic_script(text):
+        return text
+
+    for conjunct, replacement in _CONJUNCTS.items():
+        text = text.replace(conjunct, replacement)
+
+    out: List[str] = []
+    pending_schwa = False  # consonant emitted, inherent 'a' not yet decided
+    last_script = None
+
+    def flush(word_end: bool):
+        nonlocal pending_schwa
+        if pending_schwa and not (word_end and last_script in _SCHWA_DELETION):
+            out.append("a")
+        pending_schwa = False
+
+    for ch in text:
+        entry = _TABLE.get(ord(ch))
+        if entry is None:
+            flush(word_end=True)
+            out.append(ch)
+            continue
+
+        kind, roman, script = entry
+        if kind == "consonant":
+            flush(word_end=False)
+            out.append(roman)
+            pending_schwa = True
+        elif kind == "matra":
+            out.append(roman)
+            pending_schwa = False
+        elif kind == "virama":
+            pending_schwa = False
+        elif kind == "nukta":
+            if out and out[-1] in _NUKTA_FORMS:
+                out[-1] = _NUKTA_FORMS[out[-1]]
+        elif kind == "sign":
+            flush(word_end=False)
+            out.append(roman)
+        else:  # vowel, digit, final
+            flush(word_end=False)
+            out.append(roman)
+        last_script = script
+
+    flush(word_end=True)
+    return "".join(out)
+
+
+# Spelling normalisation applied before building a skeleton, so that the
+# romanization of a spoken name and the catalog spelling converge
+_PHONETIC_RULES = [
+    (re.compile(r"^[aeiou]+"), "A"),  # a leading vowel sound is kept as a single marker
+    (re.compile(r"c(?=[eiy])"), "s"),
+    (re.compile(r"ck|c|q"), "k"),
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"x"), "ks"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"z"), "j"),
+    (re.compile(r"([kgtdbpjs])h"), r"\1"),
+    (re.compile(r"[aeiouy]"), ""),
+    (re.compile(r"(.)\1+"), r"\1"),
+]
+
+_NON_LETTER_RE = re.compile(r"[^a-z]+")
+
+
+def phonetic_key(word: str) -> str:
+    """
+    Consonant skeleton of a Latin (or romanized) word.
+
+    "Paracetamol" and "pairaasitaamol" both become "prstml"; a leading vowel
+    is kept as "a" ("Ibuprofen" and "aaibuprophen" -> "abprfn").
+    """
+    key = _NON_LETTER_RE.sub("", transliterate(word).lower()
+                             .replace("ä", "a").replace("ö", "o").replace("ü", "u").replace("ß", "s"))
+    for pattern, replacement in _PHONETIC_RULES:
+        key = pattern.sub(replacement, key)
+    return key.lower()
+
+
+def phonetic_tokens(text: str, min_length: int = 3) -> List[str]:
+    """Phonetic keys of the words in a text, skipping very short ones."""
+    keys = []
+    for word in re.split(r"[\s,;/()\-]+", transliterate(text or "")):
+        key = phonetic_key(word)
+        if len(key) >= min_length:
+            keys.append(key)
+    return keys
+
+
+def detect_script(text: str) -> Optional[str]:
+    """Name of the first supported Indic script found in text, if any."""
+    for ch in text or "":
+        entry = _TABLE.get(ord(ch))
+        if entry:
+            return entry[2]
+    return None
+
+
+# Export
+__all__ = [
+    'transliterate',
+    'contains_indic_script',
+    'detect_script',
+    'phonetic_key',
+    'phonetic_tokens',
+    'SCRIPT_BLOCKS'
+]
@@ -0,0 +1,152 @@
+"""
+Startup Warm-up for SwasthyaSarthi.
+Loads the slow components in background threads when a worker starts,
+instead of on the first request that needs them:
+
+- ocr: EasyOCR reader (model load, first prescription upload)
+- dataset_matcher: products Excel parsing and indexes (first medicine match)
+- intent_classifier: local intent model (first routed chat)
+- graph: LangGraph compilation and agent imports (first chat)
+- gemini: Gemini client configuration
+
+Components warm concurrently; GET /ready reports each one's state so load
+balancers only route to warm workers. A component that fails is reported
+and still counts as settled (it is retried lazily on first use, as before),
+so one broken optional dependency does not keep a worker out of rotation.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Configuration
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+# Comma-separated components to warm (all by default)
+WARMUP_COMPONENTS = os.getenv("WARMUP_COMPONENTS", "")
+
+# Component states
+PENDING, WARMING, READY, FAILED, SKIPPED = "pending", "warming", "ready", "failed", "skipped"
+
+
+def _warm_ocr():
+    from backend.services.ocr_service import get_ocr_service
+    get_ocr_service()
+
+
+def _warm_dataset_matcher():
+    from backend.services.dataset_matcher import get_dataset_matcher
+    get_dataset_matcher()
+
+
+def _warm_intent_classifier():
+    from agents.intent_classifier import get_intent_classifier
+    if get_intent_classifier() is None:
+        raise RuntimeError("classifier unavailable")
+
+
+def _warm_graph():
+    from orchestration.graph import app_graph  # noqa: F401 - compiled on import
+
+
+def _warm_gemini():
+    from backend.services import gemini_service
+    gemini_service._configure_genai()
+    if not gemini_service._genai_configured:
+        # No API key: agents use their rule-based paths, nothing to warm
+        return SKIPPED
+
+
+# Warm-up functions by component; one returning SKIPPED reports it as such
+COMPONENTS: Dict[str, Callable[[], Optional[str]]] = {
+    "ocr": _warm_ocr,
+    "dataset_matcher": _warm_dataset_matcher,
+    "intent_classifier": _warm_intent_classifier,
+    "graph": _warm_graph,
+    "gemini": _warm_gemini,
+}
+
+
+class WarmupState:
+    """Per-component warm-up status."""
+
+    def __init__(self, components: Optional[Dict[str, Callable]] = None, enabled: bool = WARMUP_ENABLED):
+        """
+        Initialize the state.
+
+        Args:
+            components: Warm-up functions by name (COMPONENTS, filtered by WARMUP_COMPONENTS)
+            enabled: False reports the worker ready at once (components load lazily)
+        """
+        if components is None:
+            selected = [c.strip() for c in WARMUP_COMPONENTS.split(",") if c.strip()]
+            components = {name: fn for name, fn in COMPONENTS.items() if not selected or name in selected}
+        self.components = components
+        self.enabled = enabled
+        self.started_at: Optional[float] = None
+        self._status = {name: {"state": PENDING if enabled else SKIPPED} for name in components}
+        self._lock = threading.Lock()
+
+    def _warm(self, name: str):
+        """Warm one component (runs in a worker thread)."""
+        with self._lock:
+            self._status[name]["state"] = WARMING
+        start = time.perf_counter()
+        try:
+            state = self.components[name]() or READY
+            error = None
+        except Exception as e:
+            state, error = FAILED, str(e)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self._status[name] = {"state": state, "ms": round(elapsed_ms, 1)}
+            if error:
+                self._status[name]["error"] = error
+        print(f"[Warmup] {name}: {state} in {elapsed_ms:.0f}ms" + (f" ({error})" if error else ""))
+
+    async def run(self):
+        """Warm all components concurrently in threads."""
+        if not self.enabled:
+            return
+        self.started_at = time.time()
+        await asyncio.gather(*(asyncio.to_thread(self._warm, name) for name in self.components))
+        print("[Warmup] Complete")
+
+    def is_ready(self) -> bool:
+        """Whether every component has settled (ready, failed or skipped)."""
+        with self._lock:
+            return all(s["state"] not in (PENDING, WARMING) for s in self._status.values())
+
+    def status(self) -> Dict[str, Any]:
+        """Readiness and per-component state / warm-up time."""
+        with self._lock:
+            components = {name: dict(s) for name, s in self._status.items()}
+        return {
+            "ready": self.is_ready(),
+            "enabled": self.enabled,
+            "started_at": self.started_at,
+            "components": components,
+        }
+
+
+# Global instance
+_warmup: Optional[WarmupState] = None
+
+
+def get_warmup() -> WarmupState:
+    """Get or create the warm-up state instance."""
+    global _warmup
+    if _warmup is None:
+        _warmup = WarmupState()
+    return _warmup
+
+
+# Export
+__all__ = [
+    'WarmupState',
+    'get_warmup',
+    'COMPONENTS',
+    'WARMUP_ENABLED'
+]
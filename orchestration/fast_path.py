@@ -0,0 +1,63 @@
+"""
+Fast Path - Answers simple intents without entering the LangGraph workflow.
+
+Listing medicines, order history, profile and general chat (greetings,
+thanks, help) are answered entirely by the router handlers, so running them
+through app_graph only adds state construction, graph scheduling and a
+checkpoint write. When the routing decision needs no LLM call, these intents
+are dispatched straight to the same router handlers, giving the same
+responses. Everything else (orders, prescriptions, refills, ambiguous
+messages) still enters the graph, carrying the routing decision made here
+(state key "local_routing") so the router node does not compute it again.
+"""
+from typing import Optional, Tuple
+from agents.router_agent import route_without_llm, dispatch_intent
+
+# Intents fully answered by the router with no follow-up agents
+FAST_PATH_INTENTS = {"SHOW_MEDICINES", "ORDER_HISTORY", "SHOW_PROFILE", "GENERAL_CHAT"}
+
+
+def try_fast_path(user_input: str, user_id: str = "default", user_email: str = "",
+                  user_language: str = "en") -> Tuple[Optional[dict], Optional[dict]]:
+    """
+    Answer a message without the graph if its intent allows it.
+
+    Args:
+        user_input: User message
+        user_id: User identifier
+        user_email: User email
+        user_language: Language code ("en", "hi", "mr")
+
+    Returns:
+        (result state with the keys the graph result is read with, or None if
+        the message has to go through app_graph; local routing decision for
+        the graph input - {} when the LLM router is needed, None if not made)
+    """
+    if not user_input:
+        return None, None
+
+    routing = route_without_llm(user_input) or {}
+    if not routing or routing["intent"] not in FAST_PATH_INTENTS:
+        return None, routing
+
+    intent = routing["intent"]
+    state = {
+        "user_input": user_input,
+        "user_id": user_id,
+        "user_email": user_email,
+        "user_language": user_language,
+        "intent_type": intent,
+        "current_intent": intent,
+        "recommended_medicines": [],
+        "final_response": "",
+        "requires_confirmation": False,
+        "pending_order_details": None,
+        "agent_trace": []
+    }
+    state = dispatch_intent(state, intent)
+    if not state.get("final_response"):
+        return None, routing
+
+    state["agent_trace"].append({"agent": "fast_path", "intent": intent})
+    print(f"[Fast Path] Answered {intent} without the graph")
+    return state, routing
@@ -6,12 +6,17 @@ LangGraph Workflow - With Router Agent:
 4. Execution Agent - Order processing
 5. Refill Trigger Agent - Medication refill reminders
 6. Prescription Agent - Prescription OCR & medicine extraction
+
+Router and pharmacist have async variants, so app_graph.ainvoke awaits their
+Gemini calls instead of blocking a thread; the other nodes are sync and run
+in an executor under ainvoke.
 """
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
+from langchain_core.runnables import RunnableLambda
 from agents.state_schema import AgentState
-from agents.router_agent import router_agent
-from agents.pharmacist_agent import pharmacist_agent
+from agents.router_agent import router_agent, arouter_agent
+from agents.pharmacist_agent import pharmacist_agent, apharmacist_agent
 from agents.safety_agent import safety_agent
 from agents.execution_agent import execution_agent
 from agents.refill_trigger_agent import refill_trigger_agent
@@ -80,9 +85,9 @@ def should_route_to_refill(state: AgentState) -> str:
 workflow = StateGraph(AgentState)
 
 # Add all agent nodes
-workflow.add_node("router", router_agent)
+workflow.add_node("router", RunnableLambda(router_agent, afunc=arouter_agent, name="router"))
 workflow.add_node("prescription", prescription_agent)
-workflow.add_node("pharmacist", pharmacist_agent)
+workflow.add_node("pharmacist", RunnableLambda(pharmacist_agent, afunc=apharmacist_agent, name="pharmacist"))
 workflow.add_node("safety", safety_agent)
 workflow.add_node("execution", execution_agent)
 workflow.add_node("refill", refill_trigger_agent)
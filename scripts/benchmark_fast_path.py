@@ -0,0 +1,137 @@
+"""
+Latency comparison of the /chat fast path against the full LangGraph run.
+
+For each sample message the fast path (orchestration.fast_path.try_fast_path)
+and app_graph.invoke are timed on the same input, their responses are compared,
+and median / p95 latencies are reported per message and overall. Messages the fast path declines are
+listed separately since they always go through the graph.
+
+The inventory and patient tools call the API, so start the backend first:
+    uvicorn backend.main:app --port 8000
+
+Usage:
+    python scripts/benchmark_fast_path.py [--runs 20] [--language en] [--output FILE]
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestration.fast_path import try_fast_path  # noqa: E402
+from orchestration.graph import app_graph  # noqa: E402
+
+SAMPLE_MESSAGES = [
+    "hello",
+    "thanks a lot",
+    "what can you do",
+    "show medicines",
+    "list medicines",
+    "my orders",
+    "order history",
+    "my profile",
+    "I need paracetamol",
+    "refill reminder",
+]
+
+
+def _graph_state(message: str, language: str) -> dict:
+    """Initial state as built by the /chat endpoint."""
+    return {
+        "user_input": message,
+        "user_id": "default",
+        "user_email": "",
+        "user_phone": None,
+        "user_address": None,
+        "user_language": language,
+        "detected_language": language,
+        "session_id": "",
+        "intent_type": "GENERAL_CHAT",
+        "current_intent": "GENERAL_CHAT",
+        "identified_symptoms": [],
+        "possible_conditions": [],
+        "medical_advice": "",
+        "recommended_medicines": [],
+        "structured_order": {},
+        "safety_result": {},
+        "final_response": "",
+        "is_proactive": False,
+        "refill_alerts": [],
+        "requires_confirmation": False,
+        "confirmation_message": "",
+        "user_confirmed": None,
+        "pending_order_details": None,
+        "agent_trace": [],
+        "is_order_request": True,
+        "info_product": "",
+        "info_response": "",
+        "metadata": {"interaction_mode": "chat", "source": "benchmark"}
+    }
+
+
+def _time_ms(fn, runs: int):
+    timings, result = [], None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.array(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fast path against the LangGraph workflow")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--output", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    lines = []
+
+    def emit(line: str = ""):
+        print(line)
+        lines.append(line)
+
+    fast_all, graph_all, declined = [], [], []
+    emit(f"# fast path vs app_graph.invoke, runs={args.runs} language={args.language}")
+    emit(f"{'message':24s} {'fast p50':>9s} {'fast p95':>9s} {'graph p50':>10s} {'graph p95':>10s} "
+         f"{'speedup':>8s}  same")
+    for message in SAMPLE_MESSAGES:
+        if try_fast_path(message, user_language=args.language)[0] is None:
+            declined.append(message)
+            continue
+
+        fast, fast_result = _time_ms(
+            lambda: try_fast_path(message, user_language=args.language)[0], args.runs)
+        graph, graph_result = _time_ms(
+            lambda: app_graph.invoke(
+                _graph_state(message, args.language),
+                config={"configurable": {"thread_id": str(uuid.uuid4())}}),
+            args.runs)
+
+        same = fast_result["final_response"] == graph_result.get("final_response")
+        fast_all.extend(fast)
+        graph_all.extend(graph)
+        emit(f"{message[:24]:24s} {np.median(fast):7.2f}ms {np.percentile(fast, 95):7.2f}ms "
+             f"{np.median(graph):8.2f}ms {np.percentile(graph, 95):8.2f}ms "
+             f"{np.median(graph) / max(np.median(fast), 1e-6):7.1f}x  {'yes' if same else 'NO'}")
+
+    if fast_all:
+        emit("\nOverall (ms):     p50      p95")
+        emit(f"  fast path   {np.percentile(fast_all, 50):8.2f} {np.percentile(fast_all, 95):8.2f}")
+        emit(f"  graph       {np.percentile(graph_all, 50):8.2f} {np.percentile(graph_all, 95):8.2f}")
+    if declined:
+        emit(f"\nSent to the graph (not fast-path intents): {', '.join(declined)}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
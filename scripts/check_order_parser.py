@@ -0,0 +1,58 @@
+"""
+Regression check of the local order parser.
+
+Messages whose quantity is stated must parse to that quantity without an
+LLM; messages where a number may be something else (the verb "दो", a
+duration or a dose) must either keep the default of 1 or defer to Gemini
+(None). Answering "need nurofen for 5 days" with 5 packs asks the user to
+confirm an order they never placed. Exits non-zero on any failure.
+
+Usage:
+    python scripts/check_order_parser.py
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.order_parser import parse_order_locally  # noqa: E402
+
+# (message, expected quantity, or None when the LLM must parse it)
+CASES = [
+    # "दो" / "do" as the verb "give"
+    ("मुझे नूरोफेन दो", 1),
+    ("नूरोफेन दे दो", 1),
+    ("do you have nurofen", 1),
+    ("नूरोफेन के दो पत्ते दो", 2),
+    ("मुझे दो नूरोफेन चाहिए", None),
+    # Stated quantities
+    ("need 2 nurofen", 2),
+    ("2 strips nurofen for 5 days", 2),
+    ("paracetamol x2", 2),
+    ("need nurofen 200 mg", 1),
+    # Durations and doses are not quantities
+    ("need nurofen for 5 days", None),
+    ("nurofen 5 din ke liye", None),
+    ("nurofen 2 times a day", None),
+    ("nurofen 1 tablet daily", None),
+    ("nurofen दिन में 2 बार", None),
+    # Several bare numbers
+    ("need 2 nurofen 3", None),
+]
+
+
+def main():
+    failures = 0
+    for message, expected in CASES:
+        order = parse_order_locally(message)
+        quantity = order["quantity"] if order else None
+        ok = quantity == expected
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {str(quantity):>4s} '{message}' (expected {expected})")
+
+    print(f"{failures} failure(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
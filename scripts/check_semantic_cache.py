@@ -0,0 +1,62 @@
+"""
+Regression check of the semantic cache guards.
+
+Stores an answer per query and looks up near-duplicates through a fresh
+SemanticCache: pairs that ask the same thing must hit, pairs that differ in
+a medicine, strength or aspect must never share an answer (serving "dolo 650"
+information for "dolo 500" is a wrong-medicine answer). Exits non-zero on any
+failure.
+
+Usage:
+    python scripts/check_semantic_cache.py
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.semantic_cache import SemanticCache  # noqa: E402
+
+# (stored query, lookup query) pairs that may share an answer
+SAME = [
+    ("what is paracetamol used for", "paracetamol used for what?"),
+    ("what is the use of dolo 650", "dolo 650 what is the use"),
+    ("what is the use of dolo 650", "what is the use of dolo 650?"),
+    ("price of crocin 500 mg", "crocin 500mg price"),
+]
+
+# Pairs that must not share an answer
+DIFFERENT = [
+    # Strength only
+    ("what is the use of dolo 650", "what is the use of dolo 500"),
+    ("what is the use of dolo 650", "what is the use of dolo 250"),
+    ("price of crocin 500 mg", "price of crocin 650 mg"),
+    ("vitamin d3 1000 iu dose", "vitamin d3 2000 iu dose"),
+    ("डोलो ६५० क्या है", "डोलो ५०० क्या है"),
+    # Short brand names
+    ("what is dolo used for", "what is zifi used for"),
+    # Aspect
+    ("price of paracetamol", "side effects of paracetamol"),
+    # Extra content word
+    ("what is paracetamol used for", "what is paracetamol syrup used for"),
+]
+
+
+def main():
+    failures = 0
+    for expected_hit, pairs in ((True, SAME), (False, DIFFERENT)):
+        for stored, lookup in pairs:
+            # Threshold 0 isolates the guards from the similarity cut-off
+            cache = SemanticCache(max_entries=4, threshold=0.0)
+            cache.set("ctx", stored, f"answer for {stored}")
+            hit = cache.get("ctx", lookup) is not None
+            ok = hit == expected_hit
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {'hit ' if hit else 'miss'} '{stored}' / '{lookup}'")
+
+    print(f"{failures} failure(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Quality-vs-size evaluation of the vision image preprocessing.
+
+For every sample prescription image and every setting (max side x JPEG
+quality, grayscale or color) the image is preprocessed as before a Gemini
+vision call and the script reports, averaged over the images:
+- upload size and reduction against the original bytes
+- PSNR (dB) of the preprocessed image against the original rotated,
+  converted and resized the same way, i.e. the loss added by JPEG encoding
+- with --gemini: analyze_prescription_image latency, and agreement of the
+  detected medicine names with the ones found on the original upload
+  (Jaccard similarity; 1.0 = same medicines)
+
+Usage:
+    python scripts/eval_image_preprocessing.py --images samples/prescriptions \\
+        [--sizes 1024,1536,2048] [--qualities 60,75,85] [--color] [--gemini]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageOps
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services import image_preprocess  # noqa: E402
+from backend.services.image_preprocess import flatten_alpha, preprocess_image  # noqa: E402
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def psnr(reference: np.ndarray, test: np.ndarray) -> float:
+    mse = np.mean((reference.astype(np.float64) - test.astype(np.float64)) ** 2)
+    return float("inf") if mse == 0 else float(10 * np.log10(255.0 ** 2 / mse))
+
+
+def encoding_psnr(original: bytes, processed: bytes, grayscale: bool) -> float:
+    """PSNR of the processed image against the lossless-resized original."""
+    test = Image.open(io.BytesIO(processed))
+    reference = ImageOps.exif_transpose(Image.open(io.BytesIO(original)))
+    reference = flatten_alpha(reference).convert("L" if grayscale else "RGB").resize(test.size, Image.LANCZOS)
+    return psnr(np.asarray(reference), np.asarray(test.convert(reference.mode)))
+
+
+def medicine_names(result: dict) -> set:
+    return {str(m.get("name", "")).strip().lower() for m in result.get("detected_medicines", []) if m.get("name")}
+
+
+def jaccard(a: set, b: set) -> float:
+    return 1.0 if not a and not b else len(a & b) / len(a | b)
+
+
+def analyze(image_data: bytes) -> tuple:
+    """Gemini extraction of already prepared bytes: (medicine names, seconds)."""
+    from backend.services.gemini_service import analyze_prescription_image
+    start = time.perf_counter()
+    result = analyze_prescription_image(image_data)
+    return medicine_names(result), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate vision image preprocessing")
+    parser.add_argument("--images", required=True, help="Directory of sample prescription images")
+    parser.add_argument("--sizes", default="1024,1536,2048", help="Comma-separated max sides")
+    parser.add_argument("--qualities", default="60,75,85", help="Comma-separated JPEG qualities")
+    parser.add_argument("--color", action="store_true", help="Also evaluate color JPEGs")
+    parser.add_argument("--gemini", action="store_true", help="Compare Gemini extraction (uses API quota)")
+    args = parser.parse_args()
+
+    paths = sorted(os.path.join(args.images, f) for f in os.listdir(args.images)
+                   if f.lower().endswith(IMAGE_EXTENSIONS))
+    if not paths:
+        sys.exit(f"No images in {args.images}")
+    images = {path: open(path, "rb").read() for path in paths}
+
+    settings = [(side, quality, gray)
+                for gray in ([True, False] if args.color else [True])
+                for side in (int(s) for s in args.sizes.split(","))
+                for quality in (int(q) for q in args.qualities.split(","))]
+
+    baseline = {}
+    if args.gemini:
+        # Settings are applied here, so the service must send the bytes as given
+        image_preprocess.VISION_PREPROCESS = False
+        for path, data in images.items():
+            baseline[path] = analyze(data)
+        print(f"original: {np.mean([len(d) for d in images.values()]) / 1024:.0f}KB mean, "
+              f"Gemini p50 {np.median([t for _, t in baseline.values()]):.2f}s")
+
+    header = f"{'side':>5s} {'q':>3s} {'mode':>5s} {'KB':>7s} {'saved':>6s} {'PSNR':>6s}"
+    print(header + (f" {'p50 s':>6s} {'agree':>6s}" if args.gemini else ""))
+    for side, quality, gray in settings:
+        sizes, saved, fidelity, latencies, agreement = [], [], [], [], []
+        for path, data in images.items():
+            processed, _, info = preprocess_image(data, max_side=side, quality=quality, grayscale=gray)
+            sizes.append(info.get("bytes", len(processed)) / 1024)
+            saved.append(1 - len(processed) / len(data))
+            fidelity.append(encoding_psnr(data, processed, gray))
+            if args.gemini:
+                names, seconds = analyze(processed)
+                latencies.append(seconds)
+                agreement.append(jaccard(names, baseline[path][0]))
+
+        line = (f"{side:5d} {quality:3d} {'gray' if gray else 'color':>5s} {np.mean(sizes):7.0f} "
+                f"{np.mean(saved):6.1%} {np.mean(fidelity):6.1f}")
+        if args.gemini:
+            line += f" {np.median(latencies):6.2f} {np.mean(agreement):6.2f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
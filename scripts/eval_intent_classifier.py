@@ -0,0 +1,112 @@
+"""
+Offline evaluation of the local intent classifier.
+
+Runs k-fold cross-validation over labelled messages (by default the router's
+traffic log, where labels come from the LLM), training on the INTENT_KEYWORDS
+seeds plus the other folds. Without traffic the seeds themselves are
+cross-validated. Reports:
+- accuracy of the classifier on every message
+- LLM-call reduction: share of messages that would reach the LLM step
+  (i.e. not caught by the explicit keyword override) and are instead
+  answered locally at the confidence threshold
+- accuracy of those local answers, next to the keyword-only baseline
+
+Usage:
+    python scripts/eval_intent_classifier.py [--data traffic.jsonl] [--threshold 0.7] [--folds 5] [--save]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.intent_classifier import (  # noqa: E402
+    IntentClassifier, seed_examples, load_traffic, train_intent_classifier,
+    INTENT_CONFIDENCE_THRESHOLD, MAX_TRAFFIC_EXAMPLES, TRAFFIC_LOG_PATH
+)
+from agents.intent_matcher import best_intent  # noqa: E402
+
+
+def _rule_based(text: str) -> str:
+    hit = best_intent(text, "router")
+    return hit.label if hit else "MEDICINE_ORDER"
+
+
+def cross_validate(texts, labels, folds: int, include_seeds: bool = True, seed: int = 0):
+    """Out-of-fold (predicted label, confidence) for every example."""
+    seed_texts, seed_labels = seed_examples() if include_seeds else ([], [])
+    order = np.random.RandomState(seed).permutation(len(texts))
+    predictions = [None] * len(texts)
+    confidences = np.zeros(len(texts))
+
+    for fold in range(folds):
+        test = order[fold::folds]
+        test_set = set(test.tolist())
+        train_texts = seed_texts + [texts[i] for i in order if i not in test_set]
+        train_labels = seed_labels + [labels[i] for i in order if i not in test_set]
+
+        model = IntentClassifier().fit(train_texts, train_labels)
+        probs = model.predict_proba([texts[i] for i in test])
+        for row, i in enumerate(test):
+            best = int(np.argmax(probs[row]))
+            predictions[i] = model.labels[best]
+            confidences[i] = probs[row, best]
+    return predictions, confidences
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the local intent classifier")
+    parser.add_argument("--data", default=TRAFFIC_LOG_PATH, help="JSONL file with text/intent records")
+    parser.add_argument("--threshold", type=float, default=INTENT_CONFIDENCE_THRESHOLD)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--save", action="store_true", help="Retrain on all data and save the weights")
+    args = parser.parse_args()
+
+    texts, labels = load_traffic(args.data, limit=MAX_TRAFFIC_EXAMPLES)
+    include_seeds = bool(texts)
+    if not texts:
+        print(f"No labelled traffic in {args.data}; cross-validating on the keyword seeds only.")
+        texts, labels = seed_examples()
+    folds = max(2, min(args.folds, len(texts)))
+
+    predictions, confidences = cross_validate(texts, labels, folds, include_seeds=include_seeds)
+    labels_arr = np.array(labels)
+    correct = np.array(predictions) == labels_arr
+
+    # Messages caught by the explicit override never reach the LLM
+    reaches_llm = np.array([best_intent(t, "router_explicit") is None for t in texts])
+    local = reaches_llm & (confidences >= args.threshold)
+    baseline = np.array([_rule_based(t) for t in texts]) == labels_arr
+
+    print(f"Examples:                  {len(texts)} ({folds}-fold)")
+    print(f"Classifier accuracy:       {correct.mean():.1%}")
+    print(f"Keyword baseline accuracy: {baseline.mean():.1%}")
+    print(f"Reaching LLM step:         {reaches_llm.sum()}")
+    if reaches_llm.any():
+        print(f"LLM-call reduction @{args.threshold:.2f}: {local.sum() / reaches_llm.sum():.1%} "
+              f"({local.sum()} of {reaches_llm.sum()} answered locally)")
+    if local.any():
+        print(f"Accuracy of local answers: {correct[local].mean():.1%}")
+
+    print("\nThreshold sweep (messages reaching the LLM step):")
+    print("  threshold  reduction  local-accuracy")
+    for threshold in (0.4, 0.5, 0.6, 0.7, 0.8, 0.9):
+        answered = reaches_llm & (confidences >= threshold)
+        reduction = answered.sum() / max(reaches_llm.sum(), 1)
+        accuracy = correct[answered].mean() if answered.any() else float("nan")
+        print(f"  {threshold:9.2f}  {reduction:9.1%}  {accuracy:14.1%}")
+
+    print("\nPer-intent accuracy:")
+    for intent in sorted(set(labels)):
+        mask = labels_arr == intent
+        print(f"  {intent:20s} {correct[mask].mean():6.1%}  (n={mask.sum()})")
+
+    if args.save:
+        train_intent_classifier(include_traffic=True, save=True)
+        print("\nSaved retrained weights.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Import-time audit of the backend (worker cold start).
+
+Imports a module in fresh interpreters with `python -X importtime`, and
+reports the median total import time and the packages that cost the most
+(self time of all their modules, summed per top-level package, so e.g.
+`pandas` includes pandas.core.* however deep it was pulled in).
+
+A uvicorn worker pays this on every start, so it bounds how fast new
+workers come up when autoscaling. Compare before/after by running it on
+both builds:
+    git stash / git checkout <commit>
+    python scripts/import_time_audit.py --output benchmarks/importtime_backend_main.txt
+
+Usage:
+    python scripts/import_time_audit.py [--module backend.main] [--runs 5] [--top 25] [--output FILE]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# "import time:       self [us] |  cumulative | imported package"
+LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def run_once(module: str) -> dict:
+    """Import `module` in a fresh interpreter; self microseconds per top-level package."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        errors = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"import {module} failed: {errors[-1] if errors else 'unknown error'}")
+
+    packages = defaultdict(int)
+    for line in proc.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            self_us, _, _, name = match.groups()
+            packages[name.split(".")[0]] += int(self_us)
+    return packages
+
+
+def audit(module: str, runs: int) -> tuple:
+    """Median total (ms) and median ms per top-level package over `runs`."""
+    totals, per_module = [], defaultdict(list)
+    for _ in range(runs):
+        packages = run_once(module)
+        totals.append(sum(packages.values()) / 1000)
+        for name, us in packages.items():
+            per_module[name].append(us / 1000)
+    medians = {name: float(np.median(samples)) for name, samples in per_module.items()}
+    return float(np.median(totals)), medians
+
+
+def format_report(module: str, runs: int, total: float, medians: dict, top: int) -> str:
+    lines = [
+        f"# python -X importtime audit of `{module}`",
+        f"# {datetime.now().isoformat(timespec='seconds')}  python {sys.version.split()[0]}  runs={runs}",
+        f"total_ms {total:.1f}",
+        "",
+        f"{'ms':>9s}  {'share':>6s}  package",
+    ]
+    for name, ms in sorted(medians.items(), key=lambda kv: kv[1], reverse=True)[:top]:
+        lines.append(f"{ms:9.1f}  {ms / total:6.1%}  {name}")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time audit")
+    parser.add_argument("--module", default="backend.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--output", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    total, medians = audit(args.module, args.runs)
+    report = format_report(args.module, args.runs, total, medians, args.top)
+    print(report, end="")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Load test for concurrent /chat requests.
+
+Fires batches of simultaneous chat messages at a running backend and reports,
+per concurrency level, throughput, latency percentiles and errors. Messages
+are chosen to reach Gemini (orders without a catalog product, open questions),
+so the result shows how many chats can be in flight at once.
+
+Compare before/after by running it against both builds, e.g.:
+    git stash / git checkout <commit>; uvicorn backend.main:app --port 8000
+    python scripts/load_test_chat.py --levels 10,40,80,160
+
+To benchmark offline (no API key, no quota, repeatable latencies), start
+the backend against the mock LLM backend:
+    LLM_BACKEND=mock MOCK_LLM_LATENCY=lognormal:0.8,0.4 MOCK_LLM_ERROR_RATE=0.02 \
+        uvicorn backend.main:app --port 8000
+
+With sync endpoints every in-flight Gemini call holds one of the 40
+threadpool threads, so latency grows in steps once concurrency passes 40;
+with the async endpoints it stays near the single-request latency.
+
+Usage:
+    python scripts/load_test_chat.py [--url http://localhost:8000] [--levels 10,40,80] [--rounds 3]
+"""
+import argparse
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+SAMPLE_MESSAGES = [
+    "I need something for a bad headache",
+    "my mother has a cold and cough, what should she take",
+    "what can I take for acidity after meals",
+    "can you suggest a good multivitamin for elderly people",
+    "I want medicine for joint pain",
+    "is there anything for dry eyes",
+]
+
+
+def _send(url: str, message: str, timeout: float):
+    start = time.perf_counter()
+    try:
+        res = requests.post(
+            f"{url}/chat",
+            params={"message": message, "user_id": "loadtest", "session_id": uuid.uuid4().hex},
+            timeout=timeout
+        )
+        ok = res.status_code == 200 and bool(res.json().get("text"))
+    except requests.RequestException:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def run_level(url: str, concurrency: int, rounds: int, timeout: float) -> dict:
+    """Send `rounds` batches of `concurrency` simultaneous requests."""
+    latencies, errors = [], 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(rounds):
+            messages = [SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)] for i in range(concurrency)]
+            for latency, ok in pool.map(lambda m: _send(url, m, timeout), messages):
+                latencies.append(latency)
+                errors += 0 if ok else 1
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50": float(np.percentile(latencies, 50)),
+        "p95": float(np.percentile(latencies, 95)),
+        "max": float(np.max(latencies)),
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent /chat load test")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--levels", default="10,40,80,160", help="Comma-separated concurrency levels")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    # Warm up (model clients, catalog, classifier)
+    _send(args.url, SAMPLE_MESSAGES[0], args.timeout)
+
+    print(f"{'conc':>5s} {'reqs':>5s} {'req/s':>7s} {'p50 s':>7s} {'p95 s':>7s} {'max s':>7s} {'errors':>6s}")
+    for level in (int(x) for x in args.levels.split(",")):
+        r = run_level(args.url, level, args.rounds, args.timeout)
+        print(f"{r['concurrency']:5d} {r['requests']:5d} {r['throughput']:7.2f} "
+              f"{r['p50']:7.2f} {r['p95']:7.2f} {r['max']:7.2f} {r['errors']:6d}")
+
+
+if __name__ == "__main__":
+    main()
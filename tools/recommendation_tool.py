@@ -5,14 +5,48 @@ Uses products-export.xlsx to find similar products when out of stock or prescrip
 Demo: "If out of stock, system suggests similar product from products-export.xlsx"
 """
 import pandas as pd
+import numpy as np
 import os
-from difflib import SequenceMatcher
+import re
+from collections import Counter
 from typing import List, Dict, Optional
-from tools.inventory_tool import get_all_medicines
+from sqlalchemy import func
+from backend.database import SessionLocal
+from backend.models import Medicine, ProductAlternative
+from backend.services.stock_index import get_stock_index
+from backend.services.catalog_preprocessor import preprocess_catalog, parse_product, cluster_key, UNCLUSTERED
 
 # Cache for products data
 _products_cache = None
 
+# Cache for the precomputed feature matrix (built once per process)
+_feature_index = None
+
+# Character n-gram sizes used for name similarity
+NGRAM_RANGE = (3, 4)
+
+# Weight of name n-grams vs dosage-form/strength features in the cosine score
+NAME_WEIGHT = 0.6
+FEATURE_WEIGHT = 0.4
+
+# Minimum cosine similarity for a product to be suggested
+MIN_SIMILARITY = 0.2
+
+# Number of neighbours stored per product in the product_alternatives table
+ALTERNATIVES_TOP_K = 10
+
+# Scores reported for substitutes from the same ingredient/form cluster
+SAME_STRENGTH_SCORE = 1.0
+SAME_CLUSTER_SCORE = 0.9
+
+# The products export uses "product name"/"package size"/"descriptions"
+_COLUMN_ALIASES = {
+    "product name": "name",
+    "package size": "package_size",
+    "descriptions": "description",
+    "product id": "product_id",
+}
+
 def _load_products_data() -> pd.DataFrame:
     """Load and cache products data from Excel file."""
     global _products_cache
@@ -24,16 +58,14 @@ def _load_products_data() -> pd.DataFrame:
     
     try:
         df = pd.read_excel(products_path)
+        df = df.rename(columns=_COLUMN_ALIASES)
+        df = preprocess_catalog(df)
         _products_cache = df
         return df
     except Exception as e:
         print(f"[Recommendation Tool] Warning: Could not load products data: {e}")
         return pd.DataFrame()
 
-def _calculate_similarity(str1: str, str2: str) -> float:
-    """Calculate similarity ratio between two strings."""
-    return SequenceMatcher(None, str1.lower(), str2.lower()).ratio()
-
 def _extract_key_features(product_name: str) -> List[str]:
     """Extract key features from product name for better matching."""
     name_lower = product_name.lower()
@@ -52,7 +84,6 @@ def _extract_key_features(product_name: str) -> List[str]:
         features.append("spray")
     
     # Package sizes (common patterns)
-    import re
     size_match = re.search(r'(\d+)\s*(mg|g|ml)', name_lower)
     if size_match:
         features.append(f"{size_match.group(1)}{size_match.group(2)}")
@@ -64,9 +95,234 @@ def _extract_key_features(product_name: str) -> List[str]:
     
     return features
 
+def _extract_terms(product_name: str) -> Dict[str, Dict[str, int]]:
+    """
+    Turn a product name into sparse term counts for the two feature blocks.
+    
+    Returns:
+        {"name": {ngram: count}, "feature": {form/strength tag: count}}
+    """
+    features = _extract_key_features(product_name)
+    clean_name = features[-1]
+    
+    ngrams = Counter()
+    padded = f" {' '.join(clean_name.split())} "
+    for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+        for i in range(len(padded) - n + 1):
+            ngrams["c:" + padded[i:i + n]] += 1
+    
+    tags = Counter(f"f:{feat}" for feat in features[:-1])
+    return {"name": dict(ngrams), "feature": dict(tags)}
+
+
+class _FeatureIndex:
+    """
+    Precomputed TF-IDF feature matrix over the products catalog.
+    
+    Each product is a sparse row made of two L2-normalised blocks
+    (name n-grams and dosage-form/strength tags) scaled so that the dot
+    product of two rows is NAME_WEIGHT * name_cosine + FEATURE_WEIGHT * tag_cosine.
+    The matrix is kept in COO form (row ids, term ids, weights) so a
+    matrix-vector product is a single np.bincount.
+    
+    Rows also carry the ingredient/form cluster and strength parsed by the
+    catalog preprocessor, so same-ingredient substitutes are a mask lookup.
+    """
+    
+    def __init__(self, products_df: pd.DataFrame):
+        if "cluster_id" not in products_df.columns:
+            products_df = preprocess_catalog(products_df)
+        names = products_df.get("name", pd.Series(dtype=str)).fillna("").astype(str).str.strip()
+        keep = (names != "").to_numpy()
+        df = products_df[keep]
+        
+        self.names = names[keep].tolist()
+        self.names_lower = np.array([n.lower() for n in self.names], dtype=object)
+        self.product_ids = df["product_id"].tolist() if "product_id" in df.columns else [None] * len(self.names)
+        self.package_sizes = [str(v) for v in df.get("package_size", pd.Series([""] * len(df))).tolist()]
+        self.descriptions = [str(v) for v in df.get("description", pd.Series([""] * len(df))).tolist()]
+        self._row_by_name = {name: i for i, name in enumerate(self.names_lower)}
+        
+        self.cluster_ids = df["cluster_id"].to_numpy(dtype=np.int32)
+        self.strengths = np.array([s if isinstance(s, str) else None for s in df["strength"]], dtype=object)
+        self._cluster_by_key = {}
+        self._cluster_by_ingredient = {}
+        for ingredient, form, cid in zip(df["active_ingredient"], df["dosage_form"], self.cluster_ids):
+            if cid != UNCLUSTERED:
+                self._cluster_by_key.setdefault(
+                    cluster_key({"active_ingredient": ingredient, "dosage_form": form if isinstance(form, str) else None}),
+                    int(cid)
+                )
+                self._cluster_by_ingredient.setdefault(ingredient, int(cid))
+        
+        row_terms = [_extract_terms(name) for name in self.names]
+        
+        # Vocabulary and document frequencies across both blocks
+        self.vocab: Dict[str, int] = {}
+        doc_freq = Counter()
+        for terms in row_terms:
+            for block in terms.values():
+                doc_freq.update(block.keys())
+        for term in sorted(doc_freq):
+            self.vocab[term] = len(self.vocab)
+        
+        n_docs = max(len(self.names), 1)
+        self.idf = np.zeros(len(self.vocab), dtype=np.float32)
+        for term, idx in self.vocab.items():
+            self.idf[idx] = np.log((1 + n_docs) / (1 + doc_freq[term])) + 1.0
+        
+        self._row_by_product_id = {pid: i for i, pid in enumerate(self.product_ids) if pid is not None}
+        self.in_stock = None  # Bitmap aligned with rows, see track_stock()
+        
+        rows, cols, data = [], [], []
+        for row, terms in enumerate(row_terms):
+            term_ids, weights = self._weigh(terms)
+            rows.extend([row] * len(term_ids))
+            cols.extend(term_ids)
+            data.extend(weights)
+        
+        self.rows = np.asarray(rows, dtype=np.int32)
+        self.cols = np.asarray(cols, dtype=np.int32)
+        self.data = np.asarray(data, dtype=np.float32)
+        self.n_rows = len(self.names)
+    
+    def _weigh(self, terms: Dict[str, Dict[str, int]]):
+        """TF-IDF weigh and normalise both blocks of a term dictionary."""
+        term_ids, weights = [], []
+        for block, scale in (("name", NAME_WEIGHT), ("feature", FEATURE_WEIGHT)):
+            ids = [self.vocab[t] for t in terms[block] if t in self.vocab]
+            if not ids:
+                continue
+            tf = np.array([terms[block][t] for t in terms[block] if t in self.vocab], dtype=np.float32)
+            w = tf * self.idf[ids]
+            w *= np.sqrt(scale) / np.linalg.norm(w)
+            term_ids.extend(ids)
+            weights.extend(w.tolist())
+        return term_ids, weights
+    
+    def track_stock(self, stock_index):
+        """Build the in-stock bitmap once and keep it updated from stock changes."""
+        in_stock = stock_index.snapshot()
+        self.in_stock = np.fromiter((pid in in_stock for pid in self.product_ids), dtype=bool, count=self.n_rows)
+        stock_index.subscribe(self._on_stock_change)
+    
+    def _on_stock_change(self, changes: Dict[int, bool]):
+        for pid, in_stock in changes.items():
+            row = self._row_by_product_id.get(pid)
+            if row is not None:
+                self.in_stock[row] = in_stock
+    
+    def query_vector(self, product_name: str) -> np.ndarray:
+        """Dense query vector over the vocabulary for a product name."""
+        vec = np.zeros(len(self.vocab), dtype=np.float32)
+        row = self._row_by_name.get(product_name.lower().strip())
+        if row is not None:
+            mask = self.rows == row
+            vec[self.cols[mask]] = self.data[mask]
+            return vec
+        term_ids, weights = self._weigh(_extract_terms(product_name))
+        vec[term_ids] = weights
+        return vec
+    
+    def cluster_of(self, product_name: str):
+        """
+        Cluster id and strength of a product name.
+        
+        Catalog names use their precomputed cluster; free-text names are
+        parsed and mapped onto an existing cluster if one matches. A name
+        without a dosage form ("Paracetamol 500 mg") matches on ingredient.
+        """
+        row = self._row_by_name.get(product_name.lower().strip())
+        if row is not None:
+            return int(self.cluster_ids[row]), self.strengths[row]
+        parsed = parse_product(product_name)
+        if parsed["dosage_form"] is None:
+            cid = self._cluster_by_ingredient.get(parsed["active_ingredient"], UNCLUSTERED)
+        else:
+            cid = self._cluster_by_key.get(cluster_key(parsed), UNCLUSTERED)
+        return cid, parsed["strength"]
+    
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Cosine scores of every catalog row against a query vector."""
+        return np.bincount(self.rows, weights=self.data * query[self.cols], minlength=self.n_rows)
+    
+    def top_k(self, scores: np.ndarray, candidates: np.ndarray, k: int) -> np.ndarray:
+        """Row indices of the k best-scoring candidates, best first."""
+        masked = np.where(candidates, scores, -np.inf)
+        k = min(k, int(candidates.sum()))
+        if k <= 0:
+            return np.array([], dtype=np.int64)
+        top = np.argpartition(-masked, k - 1)[:k]
+        return top[np.argsort(-masked[top], kind="stable")]
+
+
+def _get_feature_index() -> Optional[_FeatureIndex]:
+    """Build the feature index on first use and reuse it afterwards."""
+    global _feature_index
+    if _feature_index is not None:
+        return _feature_index
+    
+    products_df = _load_products_data()
+    if products_df.empty:
+        return None
+    
+    _feature_index = _FeatureIndex(products_df)
+    _feature_index.track_stock(get_stock_index())
+    print(f"[Recommendation Tool] Built feature index: {_feature_index.n_rows} products, {len(_feature_index.vocab)} terms")
+    return _feature_index
+
+def _cluster_alternatives(product_name: str, reason: str = "out_of_stock", max_suggestions: int = 3) -> List[Dict]:
+    """
+    In-stock products with the same active ingredient and dosage form.
+    
+    Same-strength substitutes come first, then the rest of the cluster
+    ordered by name similarity.
+    """
+    alternatives = []
+    
+    try:
+        index = _get_feature_index()
+        if index is None:
+            return alternatives
+        
+        cluster_id, strength = index.cluster_of(product_name)
+        if cluster_id == UNCLUSTERED:
+            return alternatives
+        
+        candidates = index.in_stock & (index.cluster_ids == cluster_id) & (index.names_lower != product_name.lower().strip())
+        rows = np.nonzero(candidates)[0]
+        if len(rows) == 0:
+            return alternatives
+        
+        same_strength = index.strengths[rows] == strength if strength else np.zeros(len(rows), dtype=bool)
+        name_scores = index.scores(index.query_vector(product_name))[rows]
+        order = np.lexsort((-name_scores, ~same_strength))
+        
+        for i in order[:max_suggestions]:
+            row = rows[i]
+            alternatives.append({
+                "name": index.names[row],
+                "similarity_score": SAME_STRENGTH_SCORE if same_strength[i] else SAME_CLUSTER_SCORE,
+                "package_size": index.package_sizes[row],
+                "description": index.descriptions[row],
+                "reason": reason,
+                "match_type": "same_ingredient"
+            })
+        
+        print(f"[Recommendation Tool] Found {len(alternatives)} same-ingredient alternatives for '{product_name}'")
+        
+    except Exception as e:
+        print(f"[Recommendation Tool] Error finding cluster alternatives: {e}")
+    
+    return alternatives
+
 def find_alternatives(product_name: str, reason: str = "out_of_stock", max_suggestions: int = 3) -> List[Dict]:
     """
-    Find alternative medicines based on similarity to the requested product.
+    Find alternative medicines for the requested product.
+    
+    Products with the same active ingredient and dosage form are suggested
+    first; name/feature similarity is only used when the product has no
+    in-stock cluster mates.
     
     Args:
         product_name: The original product name
@@ -76,62 +332,33 @@ def find_alternatives(product_name: str, reason: str = "out_of_stock", max_sugge
     Returns:
         List of alternative products with similarity scores
     """
+    return _cluster_alternatives(product_name, reason, max_suggestions) or \
+        _similar_alternatives(product_name, reason, max_suggestions)
+
+def _similar_alternatives(product_name: str, reason: str = "out_of_stock", max_suggestions: int = 3) -> List[Dict]:
+    """Find alternatives by name/feature similarity across the full catalog."""
     alternatives = []
     
     try:
-        # Load products data
-        products_df = _load_products_data()
-        if products_df.empty:
+        index = _get_feature_index()
+        if index is None:
             return alternatives
         
-        # Get current inventory to check availability
-        inventory_medicines = get_all_medicines()
-        inventory_names = {med.get("name", "").lower() for med in inventory_medicines}
+        # Candidate mask: in stock and not the requested product itself
+        candidates = index.in_stock & (index.names_lower != product_name.lower().strip())
         
-        # Extract features from requested product
-        requested_features = _extract_key_features(product_name)
+        scores = index.scores(index.query_vector(product_name))
+        candidates &= scores > MIN_SIMILARITY
         
-        candidates = []
-        
-        for _, row in products_df.iterrows():
-            candidate_name = str(row.get("name", "")).strip()
-            if not candidate_name:
-                continue
-            
-            # Skip if it's the same product
-            if candidate_name.lower() == product_name.lower():
-                continue
-            
-            # Check if this product is available in inventory
-            if candidate_name.lower() not in inventory_names:
-                continue
-            
-            # Calculate similarity
-            name_similarity = _calculate_similarity(product_name, candidate_name)
-            
-            # Feature-based similarity
-            candidate_features = _extract_key_features(candidate_name)
-            feature_similarity = 0
-            for req_feat in requested_features:
-                for cand_feat in candidate_features:
-                    feat_sim = _calculate_similarity(req_feat, cand_feat)
-                    feature_similarity = max(feature_similarity, feat_sim)
-            
-            # Combined score (weighted average)
-            combined_score = (name_similarity * 0.6) + (feature_similarity * 0.4)
-            
-            if combined_score > 0.3:  # Minimum threshold
-                candidates.append({
-                    "name": candidate_name,
-                    "similarity_score": round(combined_score, 3),
-                    "package_size": str(row.get("package_size", "")),
-                    "description": str(row.get("description", "")),
-                    "reason": reason
-                })
-        
-        # Sort by similarity score and return top suggestions
-        candidates.sort(key=lambda x: x["similarity_score"], reverse=True)
-        alternatives = candidates[:max_suggestions]
+        for row in index.top_k(scores, candidates, max_suggestions):
+            alternatives.append({
+                "name": index.names[row],
+                "similarity_score": round(float(scores[row]), 3),
+                "package_size": index.package_sizes[row],
+                "description": index.descriptions[row],
+                "reason": reason,
+                "match_type": "similar"
+            })
         
         print(f"[Recommendation Tool] Found {len(alternatives)} alternatives for '{product_name}' (reason: {reason})")
         
@@ -140,6 +367,146 @@ def find_alternatives(product_name: str, reason: str = "out_of_stock", max_sugge
     
     return alternatives
 
+def _load_catalog_from_db(db) -> pd.DataFrame:
+    """Load the sellable catalog (medicines table) in the feature index layout."""
+    medicines = db.query(Medicine).filter(Medicine.product_id.isnot(None)).all()
+    return pd.DataFrame([{
+        "product_id": m.product_id,
+        "name": m.name,
+        "package_size": m.package_size,
+        "description": m.description
+    } for m in medicines])
+
+def refresh_product_alternatives(full: bool = False, top_k: int = ALTERNATIVES_TOP_K) -> Dict:
+    """
+    Precompute the top-k similar products for every SKU into product_alternatives.
+    
+    Stock is deliberately ignored here - availability is applied at lookup time,
+    so the table only needs refreshing when the catalog changes.
+    
+    Args:
+        full: Recompute every product instead of only the ones affected by new SKUs
+        top_k: Number of neighbours to store per product
+    
+    Returns:
+        dict: Summary of the refresh
+    """
+    summary = {
+        "products": 0,
+        "recomputed": 0,
+        "rows_written": 0,
+        "errors": []
+    }
+    
+    db = SessionLocal()
+    try:
+        catalog = _load_catalog_from_db(db)
+        if catalog.empty:
+            return summary
+        
+        index = _FeatureIndex(catalog)
+        summary["products"] = index.n_rows
+        
+        # Existing neighbour lists: product_id -> (count, weakest stored score)
+        stored = {
+            pid: (count, min_score)
+            for pid, count, min_score in db.query(
+                ProductAlternative.product_id,
+                func.count(ProductAlternative.id),
+                func.min(ProductAlternative.similarity_score)
+            ).group_by(ProductAlternative.product_id).all()
+        }
+        
+        if full or not stored:
+            to_compute = set(range(index.n_rows))
+            db.query(ProductAlternative).delete(synchronize_session=False)
+        else:
+            # New SKUs need their own lists, and may also displace the weakest
+            # neighbour of existing products (cosine similarity is symmetric)
+            new_rows = [r for r in range(index.n_rows) if index.product_ids[r] not in stored]
+            to_compute = set(new_rows)
+            counts = np.array([stored.get(pid, (0, 0.0))[0] for pid in index.product_ids])
+            weakest = np.array([stored.get(pid, (0, 0.0))[1] for pid in index.product_ids])
+            for row in new_rows:
+                scores = index.scores(index.query_vector(index.names[row]))
+                affected = ((counts < top_k) | (scores > weakest)) & (scores > MIN_SIMILARITY)
+                to_compute.update(int(r) for r in np.nonzero(affected)[0])
+            
+            if to_compute:
+                recompute_ids = [index.product_ids[r] for r in to_compute]
+                db.query(ProductAlternative).filter(
+                    ProductAlternative.product_id.in_(recompute_ids)
+                ).delete(synchronize_session=False)
+        
+        for row in sorted(to_compute):
+            # Keep a full top-k regardless of MIN_SIMILARITY so every product has
+            # rows; the threshold is applied at lookup time
+            scores = index.scores(index.query_vector(index.names[row]))
+            candidates = np.ones(index.n_rows, dtype=bool)
+            candidates[row] = False
+            
+            for rank, other in enumerate(index.top_k(scores, candidates, top_k), 1):
+                db.add(ProductAlternative(
+                    product_id=int(index.product_ids[row]),
+                    product_name=index.names[row],
+                    alternative_product_id=int(index.product_ids[other]),
+                    alternative_name=index.names[other],
+                    rank=rank,
+                    similarity_score=round(float(scores[other]), 3)
+                ))
+                summary["rows_written"] += 1
+        
+        db.commit()
+        summary["recomputed"] = len(to_compute)
+        print(f"[Recommendation Tool] Refreshed alternatives for {summary['recomputed']} products ({summary['rows_written']} rows)")
+        
+    except Exception as e:
+        db.rollback()
+        summary["errors"].append(str(e))
+        print(f"[Recommendation Tool] Error refreshing alternatives: {e}")
+    finally:
+        db.close()
+    
+    return summary
+
+def _lookup_alternatives(product_name: str, reason: str = "out_of_stock", max_suggestions: int = 3) -> Optional[List[Dict]]:
+    """
+    Read precomputed alternatives, keeping only those currently in stock.
+    
+    Returns:
+        List of alternatives, or None if the product has no precomputed neighbours
+    """
+    db = SessionLocal()
+    try:
+        has_neighbours = db.query(ProductAlternative.id).filter(
+            ProductAlternative.product_name == product_name
+        ).first()
+        if not has_neighbours:
+            return None
+        
+        rows = db.query(ProductAlternative, Medicine).join(
+            Medicine, Medicine.product_id == ProductAlternative.alternative_product_id
+        ).filter(
+            ProductAlternative.product_name == product_name,
+            ProductAlternative.similarity_score > MIN_SIMILARITY,
+            Medicine.stock > 0
+        ).order_by(ProductAlternative.rank).limit(max_suggestions).all()
+        
+        return [{
+            "name": med.name,
+            "similarity_score": alt.similarity_score,
+            "package_size": str(med.package_size or ""),
+            "description": str(med.description or ""),
+            "reason": reason,
+            "match_type": "similar"
+        } for alt, med in rows]
+        
+    except Exception as e:
+        print(f"[Recommendation Tool] Error reading precomputed alternatives: {e}")
+        return None
+    finally:
+        db.close()
+
 def get_alternative_recommendations(product_name: str, reason: str = "out_of_stock", 
                                   user_language: str = "en") -> Dict:
     """
@@ -153,7 +520,13 @@ def get_alternative_recommendations(product_name: str, reason: str = "out_of_sto
     Returns:
         Dictionary with alternatives and formatted message
     """
-    alternatives = find_alternatives(product_name, reason)
+    # Same active ingredient and form beats any string similarity
+    alternatives = _cluster_alternatives(product_name, reason)
+    if not alternatives:
+        alternatives = _lookup_alternatives(product_name, reason)
+    if alternatives is None:
+        # Not precomputed yet (e.g. free-text name) - score on the fly
+        alternatives = _similar_alternatives(product_name, reason)
     
     if not alternatives:
         return {
@@ -232,6 +605,12 @@ def _get_no_alternatives_message(language: str, product_name: str, reason: str)
     
     return messages.get(language, messages["en"])
 
+# Background task function (can be called periodically)
+def run_alternatives_refresh(full: bool = False):
+    """Refresh the product_alternatives table - can be scheduled to run periodically."""
+    print("[Recommendation Tool] Running product alternatives refresh...")
+    return refresh_product_alternatives(full=full)
+
 # Test function
 if __name__ == "__main__":
     # Test the recommendation tool